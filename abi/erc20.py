@@ -1,4 +1,15 @@
 import json
+import os
 
-with open("abi/ERC20.json", "r") as file:
-    ERC20_ABI = json.load(file)
+_ABI_FILES = {"ERC20_ABI": os.path.join(os.path.dirname(os.path.abspath(__file__)), "ERC20.json")}
+
+
+def __getattr__(name: str):
+    # ABI читается с диска при первом обращении к ERC20_ABI, а не при импорте модуля,
+    # и путь не зависит от текущей рабочей директории
+    if name not in _ABI_FILES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with open(_ABI_FILES[name], "r") as file:
+        value = json.load(file)
+    globals()[name] = value
+    return value
@@ -1,11 +1,12 @@
-from modules.crosscurve_arbitrage import get_all_routes, get_profitable_route
-from settings.crosscurve import tokens
-from utils.mnemonic_convert import memo_txt_to_pk_txt
+# Подсистемы (web3, eth_account, логирование в файл) импортируются в пунктах меню, которые их используют,
+# чтобы меню и короткие задачи из cron запускались без их загрузки
+from settings.crosscurve import tokens, SIZE_SEARCH_MAX, SIZE_SEARCH_MIN
 from utils.other import get_logo, read_file, filter_tokens
-from utils.w3 import get_balance_in_one_network, get_balance_in_all_network
 
 
 def crosscurve_arbitrage_settings_menu():
+    from utils.logs import setup_logging
+    setup_logging()
     swap_only_plus = bool(int(input("Искать только плюсовые роуты? 1-да 0-нет: ")))
     if swap_only_plus:
         swap_plus_size = float(input("Минимальный профит с роута (более чем N $): "))
@@ -36,10 +37,14 @@ def account_menu() -> list:
             1. Импротировать аккаунты из mnemonic.txt
             2. Импортировать аккаунты из pk.txt
             3. CrossCurve арбитраж
+            4. CrossCurve арбитраж — режим наблюдения
+            5. Импортировать несколько аккаунтов из каждой сид фразы в mnemonic.txt
+            6. CrossCurve арбитраж — подбор оптимальной суммы свапа
             """)
         choice = input("-> ")
 
         if choice == '1':
+            from utils.mnemonic_convert import memo_txt_to_pk_txt
             memo_txt_to_pk_txt()
             print("Сид фразы конвертированы в приватные ключи и добавлены в pk.txt")
             acc_list = read_file("settings/pk.txt")
@@ -50,28 +55,80 @@ def account_menu() -> list:
             print(f"Обнаружено {len(acc_list)} аккаунтов")
             return acc_list
         elif choice == '3':
+            from modules.arbitrage_graph import find_arbitrage_cycles, print_cycle
+            from modules.crosscurve_arbitrage import TopRoutes, stream_routes
             print("Настройка арбитража")
             arbitrage_settings = crosscurve_arbitrage_settings_menu()
-            all_routes = get_all_routes(arbitrage_settings.get("filtered_tokens"),
-                                        arbitrage_settings.get("swap_only_plus"),
-                                        arbitrage_settings.get("swap_plus_size"),
-                                        arbitrage_settings.get("max_swap_loss"), arbitrage_settings.get("slippage"),
-                                        arbitrage_settings.get("amount"))
+            quotes = []
+            top = TopRoutes()
             print("Все роуты, подходящие под запрос")
-            for route in all_routes:
+            for route in stream_routes(arbitrage_settings.get("filtered_tokens"),
+                                       arbitrage_settings.get("swap_only_plus"),
+                                       arbitrage_settings.get("swap_plus_size"),
+                                       arbitrage_settings.get("max_swap_loss"), arbitrage_settings.get("slippage"),
+                                       arbitrage_settings.get("amount"), top=top, quotes=quotes):
                 print(
-                    f"{route.get("from_chain")} {route.get("from_token")} -> {route.get("to_chain")} {route.get("to_token")} | {route.get("amount_in")} : {route.get("amount_out")}")
+                    f"{route.get('from_chain')} {route.get('from_token')} -> {route.get('to_chain')} {route.get('to_token')} | {route.get('amount_in')} : {route.get('amount_out')}")
             print("---------------------------------------------------------------------")
             print("Самый выгодный роут")
-            profitable = get_profitable_route(all_routes)
-            print(
-                f"{profitable.get("from_chain")} {profitable.get("from_token")} -> {profitable.get("to_chain")} {profitable.get("to_token")} | {profitable.get("amount_in")} : {profitable.get("amount_out")} | PROFIT = {profitable.get("profit")}")
+            profitable = top.best()
+            if profitable is None:
+                print("Подходящих роутов не найдено")
+            else:
+                print(
+                    f"{profitable.get('from_chain')} {profitable.get('from_token')} -> {profitable.get('to_chain')} {profitable.get('to_token')} | {profitable.get('amount_in')} : {profitable.get('amount_out')} | PROFIT = {profitable.get('profit')}")
+            print("---------------------------------------------------------------------")
+            print("Прибыльные петли из нескольких свапов")
+            for cycle in find_arbitrage_cycles(quotes, amount=arbitrage_settings.get("amount"), top=10):
+                print_cycle(cycle)
+        elif choice == '4':
+            from modules.arbitrage_watcher import ArbitrageWatcher
+            print("Настройка арбитража")
+            arbitrage_settings = crosscurve_arbitrage_settings_menu()
+            watcher = ArbitrageWatcher(arbitrage_settings.get("filtered_tokens"), arbitrage_settings.get("amount"),
+                                       arbitrage_settings.get("swap_only_plus"),
+                                       arbitrage_settings.get("swap_plus_size"),
+                                       arbitrage_settings.get("max_swap_loss"), arbitrage_settings.get("slippage"))
+            print("Наблюдение запущено, для остановки нажмите Ctrl+C")
+            try:
+                watcher.run()
+            except KeyboardInterrupt:
+                print(f"Наблюдение остановлено после {watcher.cycles} циклов")
+            choice = None
+        elif choice == '5':
+            from utils.hd_wallet import ETHEREUM_BASE_PATH
+            from utils.mnemonic_convert import memo_txt_to_pk_txt
+            count = int(input("Сколько аккаунтов вывести из каждой сид фразы: "))
+            base_path = input(f"Путь деривации (Enter — {ETHEREUM_BASE_PATH}): ").strip() or ETHEREUM_BASE_PATH
+            memo_txt_to_pk_txt(accounts_per_mnemonic=count, base_path=base_path)
+            print(f"Из каждой сид фразы выведено {count} аккаунтов ({base_path}/0..{count - 1}), добавлены в pk.txt")
+            acc_list = read_file("settings/pk.txt")
+            print(f"Обнаружено {len(acc_list)} аккаунтов")
+            return acc_list
+        elif choice == '6':
+            from modules.crosscurve_arbitrage import get_all_routes
+            from modules.size_optimizer import optimize_pairs, print_size_result, promising_pairs
+            print("Настройка арбитража")
+            arbitrage_settings = crosscurve_arbitrage_settings_menu()
+            min_amount = float(input(f"Минимальная сумма свапа (Enter — {SIZE_SEARCH_MIN}): ") or SIZE_SEARCH_MIN)
+            max_amount = float(input(f"Максимальная сумма свапа (Enter — {SIZE_SEARCH_MAX}): ") or SIZE_SEARCH_MAX)
+            quotes = []
+            get_all_routes(arbitrage_settings.get("filtered_tokens"), arbitrage_settings.get("swap_only_plus"),
+                           arbitrage_settings.get("swap_plus_size"), arbitrage_settings.get("max_swap_loss"),
+                           arbitrage_settings.get("slippage"), arbitrage_settings.get("amount"), quotes=quotes)
+            pairs = promising_pairs(arbitrage_settings.get("filtered_tokens"), quotes)
+            print(f"Подбор суммы для {len(pairs)} самых выгодных пар")
+            for result in optimize_pairs(pairs, arbitrage_settings.get("slippage"), min_amount, max_amount):
+                print_size_result(result)
         else:
             print("Неправильный ввод!")
             choice = None
 
 
 def action_menu(accs: list):
+    from utils.logs import setup_logging
+    from utils.w3 import get_balance_in_one_network, get_balance_in_all_network, print_balances_multicall
+    setup_logging()
     while True:
         choice = None
         while not choice:
@@ -79,12 +136,15 @@ def action_menu(accs: list):
                 """
                 1. Получить нативные балансы аккаунтов в определенной сети
                 2. Получить нативные балансы в всех сетях
+                3. Получить нативные балансы и балансы стейблкоинов во всех сетях (Multicall)
                 """)
             choice = input("-> ")
             if choice == '1':
                 get_balance_in_one_network(accs)
             elif choice == '2':
                 get_balance_in_all_network(accs)
+            elif choice == '3':
+                print_balances_multicall(accs)
             else:
                 print("Неправильный ввод!")
                 choice = None
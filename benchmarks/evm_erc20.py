@@ -0,0 +1,94 @@
+OPCODES = {
+    "STOP": 0x00, "ADD": 0x01, "SUB": 0x03, "LT": 0x10, "GT": 0x11, "EQ": 0x14, "ISZERO": 0x15,
+    "SHR": 0x1c, "SHA3": 0x20, "CALLER": 0x33, "CALLDATALOAD": 0x35, "CODECOPY": 0x39,
+    "POP": 0x50, "MLOAD": 0x51, "MSTORE": 0x52, "SLOAD": 0x54, "SSTORE": 0x55, "JUMP": 0x56,
+    "JUMPI": 0x57, "JUMPDEST": 0x5b, "DUP1": 0x80, "DUP2": 0x81, "DUP3": 0x82, "DUP4": 0x83,
+    "SWAP1": 0x90, "SWAP2": 0x91, "RETURN": 0xf3, "REVERT": 0xfd,
+}
+
+
+def assemble(program: list) -> bytes:
+    # Два прохода: первый считает смещения меток, второй собирает байткод
+    labels, size = {}, 0
+    for item in program:
+        if isinstance(item, str) and item.startswith(":"):
+            labels[item[1:]] = size
+            size += 1
+        elif isinstance(item, tuple):
+            size += 1 + (2 if isinstance(item[1], str) else item[0])
+        else:
+            size += 1
+    code = bytearray()
+    for item in program:
+        if isinstance(item, str) and item.startswith(":"):
+            code.append(OPCODES["JUMPDEST"])
+        elif isinstance(item, tuple):
+            width, value = item
+            if isinstance(value, str):
+                width, value = 2, labels[value]
+            code.append(0x5f + width)
+            code += value.to_bytes(width, "big")
+        else:
+            code.append(OPCODES[item])
+    return bytes(code)
+
+
+def push(value: int):
+    return ((max(value.bit_length(), 1) + 7) // 8, value)
+
+
+def erc20_runtime(decimals: int) -> bytes:
+    """
+    Байткод минимального ERC-20 без событий: decimals, balanceOf, transfer, approve, allowance.
+    Баланс адреса хранится в слоте с номером, равным адресу, allowance — в keccak(owner, spender).
+
+    :param decimals: Значение decimals().
+    :return: Runtime байткод.
+    """
+    def ret_top():  # вернуть верхнее значение стека как uint256
+        return [push(0), "MSTORE", push(32), push(0), "RETURN"]
+    return assemble([
+        push(0), "CALLDATALOAD", push(224), "SHR",
+        "DUP1", push(0x313ce567), "EQ", (2, "decimals"), "JUMPI",
+        "DUP1", push(0x70a08231), "EQ", (2, "balanceOf"), "JUMPI",
+        "DUP1", push(0xa9059cbb), "EQ", (2, "transfer"), "JUMPI",
+        "DUP1", push(0x095ea7b3), "EQ", (2, "approve"), "JUMPI",
+        "DUP1", push(0xdd62ed3e), "EQ", (2, "allowance"), "JUMPI",
+        push(0), push(0), "REVERT",
+        ":decimals", push(decimals), *ret_top(),
+        ":balanceOf", push(4), "CALLDATALOAD", "SLOAD", *ret_top(),
+        ":transfer",
+        push(36), "CALLDATALOAD",               # amt
+        "CALLER", "SLOAD",                      # bal amt
+        "DUP2", "DUP2", "LT", (2, "fail"), "JUMPI",  # bal < amt -> revert
+        "SUB", "CALLER", "SSTORE",              # balances[caller] = bal - amt
+        push(36), "CALLDATALOAD",
+        push(4), "CALLDATALOAD", "SLOAD", "ADD",
+        push(4), "CALLDATALOAD", "SSTORE",      # balances[to] += amt
+        push(1), *ret_top(),
+        ":approve",
+        "CALLER", push(0), "MSTORE", push(4), "CALLDATALOAD", push(32), "MSTORE",
+        push(36), "CALLDATALOAD", push(64), push(0), "SHA3", "SSTORE",
+        push(1), *ret_top(),
+        ":allowance",
+        push(4), "CALLDATALOAD", push(0), "MSTORE", push(36), "CALLDATALOAD", push(32), "MSTORE",
+        push(64), push(0), "SHA3", "SLOAD", *ret_top(),
+        ":fail", push(0), push(0), "REVERT",
+    ])
+
+
+def erc20_initcode(decimals: int, supply: int) -> bytes:
+    """
+    :param decimals: Значение decimals().
+    :param supply: Эмиссия, начисляется создателю контракта.
+    :return: Байткод развертывания.
+    """
+    runtime = erc20_runtime(decimals)
+    # конструктор: balances[msg.sender] = supply, затем вернуть runtime
+    prefix_len = None
+    for _ in range(2):
+        body = assemble([push(supply), "CALLER", "SSTORE",
+                         push(len(runtime)), "DUP1", push(prefix_len or 0), push(0), "CODECOPY",
+                         push(0), "RETURN"])
+        prefix_len = len(body)
+    return body + runtime
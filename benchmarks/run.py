@@ -0,0 +1,247 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from eth_account import Account
+from web3 import Web3
+
+from benchmarks.stand_ins import CrossCurveStub, LocalChain
+from settings import crosscurve
+from settings.chains import Chain, chains
+
+LOCAL_CHAIN = "local"
+
+
+def percentiles(samples: list) -> dict:
+    """
+    Сводка по выборке длительностей.
+
+    :param samples: Список значений в секундах.
+    :return: Словарь count/mean/p50/p90/p99/max в миллисекундах.
+    """
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def at(share):
+        return ordered[min(len(ordered) - 1, int(share * len(ordered)))] * 1000
+
+    return {"count": len(ordered), "mean": statistics.fmean(ordered) * 1000, "p50": at(0.5), "p90": at(0.9),
+            "p99": at(0.99), "max": ordered[-1] * 1000}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_keys(count: int, seed: int) -> list:
+    return ["0x" + Web3.keccak(text=f"benchmark-{seed}-{i}").hex()[-64:] for i in range(count)]
+
+
+def setup(args) -> tuple:
+    # Все сетевые вызовы идут в локальные заглушки: CrossCurve API и EVM с развернутыми ERC-20
+    node = LocalChain(latency=args.rpc_latency).start()
+    stub = CrossCurveStub(latency=args.api_latency, throttle_rate=args.throttle_rate,
+                          retry_after=args.retry_after, seed=args.seed).start()
+    import modules.crosscurve_arbitrage as arbitrage
+    arbitrage.CROSSCURVE_API_URL = stub.url
+    logging.getLogger().setLevel(logging.WARNING)  # логи сканирования не должны влиять на замеры
+
+    from utils.token_meta import token_metadata
+    token_metadata.path = None  # кеш decimals только в памяти, файл в cache/ не трогаем
+
+    chains[LOCAL_CHAIN] = Chain(LOCAL_CHAIN, node.chain_id, node.url, "ETH")
+    token_list = [{"chain": LOCAL_CHAIN, "ticker": f"TKN{i}", "address": node.deploy_erc20(6).lower()}
+                  for i in range(args.tokens)]
+    return node, stub, chains[LOCAL_CHAIN], token_list
+
+
+def bench_scan(args, stub: CrossCurveStub, token_list: list) -> dict:
+    from modules.crosscurve_arbitrage import get_all_routes, stream_routes
+    from utils.quote_cache import quote_cache
+
+    walls, requests_total = [], 0
+    stub.reset_stats()
+    for _ in range(args.iterations):
+        quote_cache.clear()  # каждая итерация — холодное сканирование
+        started = time.perf_counter()
+        routes = get_all_routes(token_list, False, 0, 10 ** 9, crosscurve.SLIPPAGE, args.amount)
+        walls.append(time.perf_counter() - started)
+    requests_total = stub.requests
+
+    first_routes = []  # сколько ждать первый роут при потоковом сканировании
+    for _ in range(args.iterations):
+        quote_cache.clear()
+        started = time.perf_counter()
+        for _route in stream_routes(token_list, False, 0, 10 ** 9, crosscurve.SLIPPAGE, args.amount, ndjson=None):
+            first_routes.append(time.perf_counter() - started)
+            break
+    pairs = args.tokens * (args.tokens - 1)
+    return {"pairs": pairs, "routes": len(routes), "scan": percentiles(walls),
+            "stream_first_route": percentiles(first_routes),
+            "api_request": percentiles(stub.latencies), "api_requests": requests_total,
+            "requests_per_sec": requests_total / sum(walls), "pairs_per_sec": pairs * args.iterations / sum(walls)}
+
+
+def bench_balances(args, node: LocalChain, chain: Chain, token_list: list) -> dict:
+    from classes.account import AccountStore
+    from utils.w3 import get_balances_multicall, get_native_balances
+
+    keys = make_keys(args.accounts, args.seed)
+    addresses = AccountStore.from_private_keys(keys).addresses
+    node.fund(addresses[:10], wei=10 ** 16, token=Web3.to_checksum_address(token_list[0]["address"]),
+              token_amount=10 ** 6)
+    result = {"accounts": args.accounts}
+    for name, scan in (("multicall", lambda: get_balances_multicall(keys, [LOCAL_CHAIN], token_list)),
+                       ("native_batch", lambda: get_native_balances(chain, addresses))):
+        walls = []
+        node.reset_stats()
+        for _ in range(args.iterations):
+            started = time.perf_counter()
+            scan()
+            walls.append(time.perf_counter() - started)
+        result[name] = {"scan": percentiles(walls), "http_requests": node.requests, "rpc_calls": node.calls,
+                        "requests_per_sec": node.requests / sum(walls),
+                        "accounts_per_sec": args.accounts * args.iterations / sum(walls)}
+    return result
+
+
+def bench_client(args, node: LocalChain, chain: Chain, token_list: list) -> dict:
+    from classes.client import Client
+    from modules.batch_transfer import NATIVE, run_transfers
+
+    sender_keys = make_keys(args.senders, args.seed + 1)
+    senders = [Account.from_key(key).address for key in sender_keys]
+    token = Web3.to_checksum_address(token_list[0]["address"])
+    node.fund(senders, wei=10 ** 20, token=token, token_amount=10 ** 12)
+    recipients = [Account.from_key(key).address for key in make_keys(args.transactions, args.seed + 2)]
+    result = {"transactions": args.transactions, "senders": args.senders}
+
+    client = Client(chain, sender_keys[0])
+    for name, send in (("send_eth", lambda to: client.send_eth(to, 0.0001)),
+                       ("transfer_token", lambda to: client.transfer_token(token, to, 0.01))):
+        latencies = []
+        node.reset_stats()
+        started = time.perf_counter()
+        for to in recipients:
+            sent = time.perf_counter()
+            send(to)
+            latencies.append(time.perf_counter() - sent)
+        wall = time.perf_counter() - started
+        result[name] = {"transaction": percentiles(latencies), "http_requests": node.requests,
+                        "tx_per_sec": len(recipients) / wall}
+
+    jobs = [(sender_keys[i % len(sender_keys)], to, NATIVE, 0.0001) for i, to in enumerate(recipients)]
+    node.reset_stats()
+    started = time.perf_counter()
+    report = run_transfers(jobs, chain)
+    wall = time.perf_counter() - started
+    result["batch_transfer"] = {"wall_ms": wall * 1000, "sent": sum(row["status"] == "sent" for row in report),
+                                "http_requests": node.requests, "tx_per_sec": len(jobs) / wall}
+    return result
+
+
+def bench_graph(args) -> dict:
+    from modules.arbitrage_graph import build_quote_graph, find_arbitrage_cycles
+
+    # Почти полный граф, как у get_all_routes: курс каждой пары чуть ниже 1 (комиссия) с шумом,
+    # плюс несколько заложенных прибыльных петель, которые поиск обязан найти
+    rnd = random.Random(args.seed)
+    count = args.graph_tokens
+    rates = {(u, v): 0.999 * (1 + rnd.gauss(0, 0.0005)) for u in range(count) for v in range(count) if u != v}
+    planted = [tuple(rnd.sample(range(count), hops)) for hops in (2, 3, 4)]
+    for cycle in planted:
+        for i in range(len(cycle)):
+            rates[(cycle[i], cycle[(i + 1) % len(cycle)])] = 1.001
+    quotes = [{"from_chain": LOCAL_CHAIN, "from_token": f"TKN{u}", "to_chain": LOCAL_CHAIN, "to_token": f"TKN{v}",
+               "amount_in": args.amount, "amount_out": args.amount * rate} for (u, v), rate in rates.items()]
+
+    builds, searches = [], []
+    for _ in range(args.iterations):
+        started = time.perf_counter()
+        build_quote_graph(quotes)
+        builds.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        cycles = find_arbitrage_cycles(quotes, amount=args.amount)
+        searches.append(time.perf_counter() - started)
+    found = {frozenset(name for _, name in cycle["path"]) for cycle in cycles}
+    return {"tokens": count, "quotes": len(quotes), "cycles": len(cycles),
+            "planted_found": sum(frozenset(f"TKN{u}" for u in cycle) in found for cycle in planted),
+            "planted": len(planted), "build_graph": percentiles(builds), "find_cycles": percentiles(searches)}
+
+
+def compare(current: dict, baseline: dict, prefix: str = ""):
+    # Печатает изменение всех числовых метрик относительно прошлого запуска
+    for key, value in current.items():
+        other = baseline.get(key) if isinstance(baseline, dict) else None
+        if isinstance(value, dict):
+            compare(value, other or {}, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)) and isinstance(other, (int, float)) and other:
+            print(f"{prefix}{key}: {other:.3f} -> {value:.3f} ({(value - other) / other * 100:+.1f}%)")
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Офлайн бенчмарки сканирования, балансов, отправки транзакций и поиска петель")
+    parser.add_argument("--scenarios", default="scan,balances,client,graph", help="список через запятую")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--tokens", type=int, default=8, help="токенов в сканировании (пар — N * (N - 1))")
+    parser.add_argument("--amount", type=float, default=1000)
+    parser.add_argument("--graph-tokens", type=int, default=200, help="вершин в графе котировок сценария graph")
+    parser.add_argument("--accounts", type=int, default=500, help="аккаунтов в сканировании балансов")
+    parser.add_argument("--senders", type=int, default=4)
+    parser.add_argument("--transactions", type=int, default=100)
+    parser.add_argument("--api-latency", type=float, default=0.05, help="средняя задержка CrossCurve API, с")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--retry-after", type=float, default=0)
+    parser.add_argument("--rpc-latency", type=float, default=0.0, help="задержка RPC запроса, с")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--metrics", action="store_true", help="включить сбор метрик и сохранить их в результат")
+    parser.add_argument("--output", help="путь к JSON результату (по умолчанию benchmarks/results/)")
+    parser.add_argument("--compare", help="JSON результат прошлого запуска для сравнения")
+    args = parser.parse_args(argv)
+
+    from utils.metrics import metrics
+    metrics.enabled = args.metrics
+    node, stub, chain, token_list = setup(args)
+    results = {"commit": git_commit(), "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+               "python": platform.python_version(), "params": vars(args), "results": {}}
+    scenarios = {"scan": lambda: bench_scan(args, stub, token_list),
+                 "balances": lambda: bench_balances(args, node, chain, token_list),
+                 "client": lambda: bench_client(args, node, chain, token_list),
+                 "graph": lambda: bench_graph(args)}
+    try:
+        for name in args.scenarios.split(","):
+            print(f"Сценарий {name}...")
+            results["results"][name] = scenarios[name.strip()]()
+    finally:
+        stub.stop()
+        node.stop()
+    if args.metrics:
+        results["metrics"] = metrics.snapshot()
+
+    output = args.output or os.path.join("benchmarks", "results",
+                                         f"{time.strftime('%Y%m%d-%H%M%S')}-{results['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent=1)
+    print(json.dumps(results["results"], indent=1))
+    print(f"Результат сохранен в {output}")
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results["results"], json.load(file)["results"])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from eth_abi import decode, encode
+from web3 import Web3
+from web3.providers.eth_tester import EthereumTesterProvider
+
+from benchmarks.evm_erc20 import erc20_initcode
+from settings.chains import MULTICALL3_ADDRESS
+from utils.multicall import AGGREGATE3_SELECTOR, BALANCE_OF_SELECTOR, GET_ETH_BALANCE_SELECTOR
+
+DECIMALS_SELECTOR = Web3.keccak(text="decimals()")[:4]
+
+
+class _Server:
+    """
+    Общая часть заглушек: HTTP сервер в фоновом потоке, учет запросов и задержек.
+    """
+
+    def __init__(self, handler):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.server.stand_in = self
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.requests = 0
+        self.latencies = []  # время обработки запросов сервером, с
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.requests = 0
+            self.latencies = []
+
+    def _record(self, started: float):
+        with self._stats_lock:
+            self.requests += 1
+            self.latencies.append(time.perf_counter() - started)
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, payload, headers: dict = None):
+        data = Web3.to_json(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        return json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+
+class _ScanHandler(_JSONHandler):
+    def do_POST(self):
+        stand_in = self.server.stand_in
+        started = time.perf_counter()
+        body = self._read_json()
+        if self.path.rstrip("/") != "/routing/scan":
+            self._reply(404, {"error": "not found"})
+        elif stand_in.rng.random() < stand_in.throttle_rate:
+            self._reply(429, {"error": "Too Many Requests"}, {"Retry-After": str(stand_in.retry_after)})
+        else:
+            stand_in.sleep()
+            self._reply(200, stand_in.quote(body))
+        stand_in._record(started)
+
+
+class CrossCurveStub(_Server):
+    def __init__(self, latency: float = 0.05, jitter: float = 0.5, throttle_rate: float = 0.0,
+                 retry_after: float = 0, depth: float = 10 ** 12, seed: int = 0):
+        """
+        Локальная заглушка POST /routing/scan CrossCurve API. Курс пары детерминированно зависит
+        от пары (±0.5%), а с ростом суммы падает, как при ограниченной глубине пула.
+
+        :param latency: Средняя задержка ответа, с.
+        :param jitter: Разброс задержки: она равномерно распределена в latency * (1 ± jitter).
+        :param throttle_rate: Доля запросов, на которые отвечаем 429.
+        :param retry_after: Значение заголовка Retry-After в ответах 429, с.
+        :param depth: Глубина пула в минимальных единицах токена (10 ** 12 — миллион токенов с 6 decimals).
+        :param seed: Зерно генератора случайных чисел.
+        """
+        super().__init__(_ScanHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.depth = depth
+        self.rng = random.Random(seed)
+
+    def sleep(self):
+        if self.latency > 0:
+            time.sleep(self.latency * (1 + self.jitter * (2 * self.rng.random() - 1)))
+
+    @staticmethod
+    def rate(params: dict) -> float:
+        key = f"{params['chainIdIn']}:{params['tokenIn']}:{params['chainIdOut']}:{params['tokenOut']}".lower()
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return 1 + (int.from_bytes(digest, "big") / 2 ** 64 - 0.5) / 100
+
+    def quote(self, body: dict) -> list:
+        params = body["params"]
+        amount_in = float(params["amountIn"])
+        amount_out = amount_in * self.rate(params) * self.depth / (self.depth + amount_in)
+        return [{"amountOutWithoutSlippage": str(int(amount_out)),
+                 "route": [{"type": "stub", "chainIdIn": params["chainIdIn"], "chainIdOut": params["chainIdOut"]}]}]
+
+
+class _RPCHandler(_JSONHandler):
+    def do_POST(self):
+        stand_in = self.server.stand_in
+        started = time.perf_counter()
+        body = self._read_json()
+        stand_in.sleep()
+        if isinstance(body, list):
+            self._reply(200, [stand_in.handle(request) for request in body])
+        else:
+            self._reply(200, stand_in.handle(body))
+        stand_in._record(started)
+
+
+class LocalChain(_Server):
+    def __init__(self, latency: float = 0.0):
+        """
+        Локальная EVM (eth-tester) за JSON-RPC сервером с поддержкой batch запросов.
+        Multicall3 эмулируется на стороне сервера: eth_call на MULTICALL3_ADDRESS с aggregate3
+        раскладывается на отдельные вызовы, так как байткод Multicall3 в eth-tester не развернут.
+        Чтения decimals и balanceOf у развернутых здесь токенов отдаются прямо из состояния:
+        eth_call в py-evm занимает десятки миллисекунд и иначе замер показывал бы скорость py-evm,
+        а не клиента.
+
+        :param latency: Задержка каждого HTTP запроса, с.
+        """
+        super().__init__(_RPCHandler)
+        self.latency = latency
+        self.web3 = Web3(EthereumTesterProvider())
+        self.chain_id = self.web3.eth.chain_id
+        self.calls = 0
+        self.tokens = {}  # адрес токена в нижнем регистре -> decimals
+        self._tester = self.web3.provider.ethereum_tester
+        self._request = self.web3.provider.request_func(self.web3, self.web3.middleware_onion)
+        self._lock = threading.Lock()  # eth-tester не потокобезопасен
+        self._multicall = MULTICALL3_ADDRESS.lower()
+
+    def sleep(self):
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def reset_stats(self):
+        super().reset_stats()
+        self.calls = 0
+
+    def _call(self, method: str, params: list):
+        with self._lock:
+            self.calls += 1
+            response = self._request(method, params)
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response["result"]
+
+    def _static_call(self, target: str, calldata: bytes, block):
+        # Быстрый путь для чтений, результат которых известен без исполнения EVM; None — исполнять в EVM
+        target = target.lower()
+        selector = calldata[:4]
+        if target == self._multicall and selector == GET_ETH_BALANCE_SELECTOR:
+            with self._lock:
+                self.calls += 1
+                return encode(["uint256"], [self._tester.get_balance(Web3.to_checksum_address(calldata[-20:]),
+                                                                     block)])
+        if target in self.tokens and selector == DECIMALS_SELECTOR:
+            with self._lock:
+                self.calls += 1
+            return encode(["uint256"], [self.tokens[target]])
+        if target in self.tokens and selector == BALANCE_OF_SELECTOR:
+            with self._lock:
+                self.calls += 1
+                value = self._tester.get_storage_at(Web3.to_checksum_address(target),
+                                                    hex(int.from_bytes(calldata[4:36], "big")), block)
+            return Web3.to_bytes(hexstr=value).rjust(32, b"\0")
+        return None
+
+    def _aggregate3(self, data: bytes, block) -> bytes:
+        results = []
+        for target, allow_failure, calldata in decode(["(address,bool,bytes)[]"], data[4:])[0]:
+            try:
+                result = self._static_call(target, calldata, block)
+                if result is None:
+                    result = self._call("eth_call", [{"to": Web3.to_checksum_address(target),
+                                                      "data": "0x" + calldata.hex()}, block])
+                results.append((True, bytes(result)))
+            except Exception:
+                if not allow_failure:
+                    raise
+                results.append((False, b""))
+        return encode(["(bool,bytes)[]"], [results])
+
+    def handle(self, request: dict) -> dict:
+        method, params = request["method"], request.get("params", [])
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            if method == "eth_call" and params[0].get("to", "").lower() == self._multicall:
+                data = Web3.to_bytes(hexstr=params[0]["data"])
+                if data[:4] != AGGREGATE3_SELECTOR:
+                    raise ValueError("only aggregate3 is emulated")
+                response["result"] = self._aggregate3(data, params[1] if len(params) > 1 else "latest")
+            elif method == "eth_call" and params[0].get("to"):
+                block = params[1] if len(params) > 1 else "latest"
+                result = self._static_call(params[0]["to"], Web3.to_bytes(hexstr=params[0].get("data", "0x")), block)
+                response["result"] = "0x" + result.hex() if result is not None else self._call(method, params)
+            else:
+                response["result"] = self._call(method, params)
+        except Exception as e:
+            response["error"] = {"code": -32000, "message": str(e)}
+        return response
+
+    def deploy_erc20(self, decimals: int = 6, supply: int = 10 ** 30) -> str:
+        """
+        Разворачивает минимальный ERC-20 (decimals, balanceOf, transfer, approve, allowance),
+        весь supply начисляется первому аккаунту eth-tester.
+
+        :return: Адрес контракта.
+        """
+        with self._lock:
+            tx_hash = self.web3.eth.send_transaction({"from": self.web3.eth.accounts[0],
+                                                      "data": erc20_initcode(decimals, supply)})
+            address = self.web3.eth.get_transaction_receipt(tx_hash)["contractAddress"]
+        self.tokens[address.lower()] = decimals
+        return address
+
+    def fund(self, addresses: list, wei: int = 0, token: str = None, token_amount: int = 0):
+        """
+        Пополняет адреса нативной монетой и/или токеном с первого аккаунта eth-tester.
+        """
+        funder = self.web3.eth.accounts[0]
+        transfer = Web3.keccak(text="transfer(address,uint256)")[:4]
+        with self._lock:
+            for address in addresses:
+                if wei:
+                    self.web3.eth.send_transaction({"from": funder, "to": address, "value": wei})
+                if token and token_amount:
+                    data = transfer + encode(["address", "uint256"], [address, token_amount])
+                    self.web3.eth.send_transaction({"from": funder, "to": token, "data": data})
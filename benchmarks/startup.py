@@ -0,0 +1,117 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Точка входа -> модуль, который она импортирует. menu — то, что грузится до показа меню app.py
+ENTRY_POINTS = {
+    "menu": "app",
+    "import_keys": "utils.mnemonic_convert",
+    "balances": "utils.w3",
+    "arbitrage": "modules.crosscurve_arbitrage",
+    "client": "classes.client",
+}
+
+# Бюджет времени импорта в миллисекундах (без запуска самого интерпретатора)
+IMPORT_BUDGETS_MS = {"menu": 50}
+
+# Тяжелые зависимости, которых не должно быть в процессе после импорта точки входа
+HEAVY_MODULES = ("web3", "eth_account")
+
+_PROBE = """
+import json, sys
+import {module}
+print(json.dumps(sorted(name for name in {heavy} if name in sys.modules)))
+"""
+
+
+def parse_importtime(stderr: str, module: str) -> tuple:
+    """
+    Разбирает вывод python -X importtime.
+
+    :param stderr: stderr процесса.
+    :param module: Модуль точки входа.
+    :return: (время импорта модуля с зависимостями в мс, список (прямая зависимость, cumulative мс)).
+    """
+    children = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2  # отступ показывает глубину вложенности импорта
+        if depth == 1:
+            children.append((name.strip(), int(cumulative) / 1000))
+        elif depth == 0:
+            if name.strip() == module:
+                return int(cumulative) / 1000, children
+            children = []  # зависимости предыдущего модуля верхнего уровня (site, json пробы)
+    return 0.0, []
+
+
+def measure(module: str, runs: int) -> dict:
+    """
+    Импортирует модуль в свежем интерпретаторе runs раз. Процесс запускается во временной директории,
+    чтобы заметить побочные эффекты импорта (созданные файлы) и зависимость от рабочей директории.
+
+    :param module: Имя модуля.
+    :param runs: Количество запусков.
+    :return: Медианы времени процесса и импорта, тяжелые модули, созданные файлы и самые долгие импорты.
+    """
+    env = dict(os.environ, PYTHONPATH=REPO + os.pathsep + os.environ.get("PYTHONPATH", ""),
+               PYTHONDONTWRITEBYTECODE="1")
+    walls, imports, heaviest, heavy, created = [], [], [], [], []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as cwd:
+            started = time.perf_counter()
+            process = subprocess.run([sys.executable, "-X", "importtime", "-W", "ignore", "-c",
+                                      _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                     cwd=cwd, env=env, capture_output=True, text=True)
+            walls.append(time.perf_counter() - started)
+            if process.returncode != 0:
+                return {"module": module, "error": process.stderr.strip().splitlines()[-1]}
+            created = sorted(os.listdir(cwd))
+        total, children = parse_importtime(process.stderr, module)
+        imports.append(total)
+        heaviest = sorted(children, key=lambda item: -item[1])[:5]
+        heavy = json.loads(process.stdout)
+    return {"module": module, "wall_ms": statistics.median(walls) * 1000, "import_ms": statistics.median(imports),
+            "heavy_modules": heavy, "created_files": created,
+            "heaviest": [{"module": name, "ms": ms} for name, ms in heaviest]}
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Время запуска: импорт каждой точки входа в свежем процессе")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--entries", default=",".join(ENTRY_POINTS), help="список через запятую")
+    parser.add_argument("--output", help="путь к JSON результату")
+    args = parser.parse_args(argv)
+
+    baseline = measure("sys", args.runs)  # сам интерпретатор без импортов проекта
+    results = {"python_ms": baseline["wall_ms"], "entries": {}}
+    over_budget = []
+    for name in args.entries.split(","):
+        result = measure(ENTRY_POINTS[name.strip()], args.runs)
+        budget = IMPORT_BUDGETS_MS.get(name)
+        if budget is not None and "import_ms" in result:
+            result["budget_ms"] = budget
+            if result["import_ms"] > budget or result["heavy_modules"] or result["created_files"]:
+                over_budget.append(name)
+        results["entries"][name] = result
+    print(json.dumps(results, indent=1))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=1)
+    if over_budget:
+        print(f"Превышен бюджет запуска: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+from eth_keys import keys
+
+
+class AccountHandle:
+    __slots__ = ("store", "index")
+
+    def __init__(self, store: "AccountStore", index: int):
+        """
+        Легкая ссылка на аккаунт в AccountStore: не держит подключений и не создает объектов eth_account.
+
+        :param store: Хранилище аккаунтов.
+        :param index: Номер аккаунта в хранилище.
+        """
+        self.store = store
+        self.index = index
+
+    @property
+    def address(self) -> str:
+        return self.store.addresses[self.index]
+
+    @property
+    def key(self) -> bytes:
+        return self.store.key(self.index)
+
+    def __repr__(self) -> str:
+        return f"AccountHandle(address={self.address})"
+
+
+class AccountStore:
+    __slots__ = ("addresses", "_keys")
+
+    def __init__(self):
+        """
+        Компактное хранилище аккаунтов: адреса в списке и приватные ключи в одном bytearray
+        (по 32 байта на аккаунт). Адрес выводится из ключа один раз при добавлении.
+        """
+        self.addresses = []
+        self._keys = bytearray()
+
+    @classmethod
+    def from_private_keys(cls, private_keys: list) -> "AccountStore":
+        """
+        Создает хранилище из списка приватных ключей.
+
+        :param private_keys: Приватные ключи в шестнадцатеричном формате (с или без префикса '0x').
+        :return: Заполненное хранилище.
+        """
+        store = cls()
+        for private_key in private_keys:
+            store.add(private_key)
+        return store
+
+    def add(self, private_key: str) -> AccountHandle:
+        """
+        Добавляет аккаунт.
+
+        :param private_key: Приватный ключ в шестнадцатеричном формате (с или без префикса '0x').
+        :return: Ссылка на добавленный аккаунт.
+        """
+        key = bytes.fromhex(private_key[2:] if private_key.startswith('0x') else private_key)
+        self.addresses.append(keys.PrivateKey(key).public_key.to_checksum_address())
+        self._keys += key
+        return AccountHandle(self, len(self.addresses) - 1)
+
+    def key(self, index: int) -> bytes:
+        """
+        Возвращает приватный ключ аккаунта.
+
+        :param index: Номер аккаунта.
+        :return: Приватный ключ (32 байта).
+        """
+        return bytes(self._keys[index * 32:(index + 1) * 32])
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    def __getitem__(self, index: int) -> AccountHandle:
+        if not -len(self.addresses) <= index < len(self.addresses):
+            raise IndexError("account index out of range")
+        return AccountHandle(self, index % len(self.addresses))
+
+    def __iter__(self):
+        return (AccountHandle(self, index) for index in range(len(self.addresses)))
@@ -1,28 +1,56 @@
+from eth_account import Account
 from hexbytes import HexBytes
-from web3 import Web3
 
+from classes.account import AccountHandle
 from settings.chains import Chain
+from settings.fees import FEE_URGENCY
+from utils.erc20 import (DECIMALS_CALL, call_uint, checksum, decode_uint, encode_allowance, encode_approve,
+                         encode_balance_of, encode_transfer)
+from utils.fees import fee_oracle
+from utils.metrics import metrics
+from utils.nonce import nonce_manager
+from utils.providers import batch_request, get_connection
+from utils.receipts import receipt_tracker
+from utils.token_meta import token_metadata
+
+
+def _to_int(value) -> int:
+    # Batch ответы приходят hex строками, последовательный запасной путь — уже числами
+    return int(value, 16) if isinstance(value, str) else int(value)
 
 
 class Client:
-    def __init__(self, chain: Chain, private_key: str):
+    def __init__(self, chain: Chain, private_key):
         """
         Инициализирует клиента с подключением к RPC и настройкой аккаунта на основе приватного ключа.
 
         :param chain: обьект класса Chain
-        :param private_key: Приватный ключ в шестнадцатеричном формате (с или без префикса '0x').
+        :param private_key: Приватный ключ в шестнадцатеричном формате (с или без префикса '0x')
+            или AccountHandle из AccountStore.
         :raises ConnectionError: Если не удается подключиться к RPC.
         """
         self.chain = chain
         self.rpc = self.chain.rpc
-        self.connection = Web3(Web3.HTTPProvider(self.rpc))
-
-        if not self.connection.is_connected():
-            raise ConnectionError(f"Failed to connect to the RPC at {self.rpc}")
-
-        self.private_key = bytes.fromhex(private_key[2:] if private_key.startswith('0x') else private_key)
-        self.account = self.connection.eth.account.from_key(self.private_key)
-        self.public_key = self.account.address
+        self.connection = get_connection(self.chain)  # Общее подключение, проверяется один раз на сеть
+
+        if isinstance(private_key, AccountHandle):
+            # Адрес уже выведен хранилищем, объект eth_account создается только при первой подписи
+            self.private_key = private_key.key
+            self.public_key = private_key.address
+            self._account = None
+        else:
+            self.private_key = bytes.fromhex(private_key[2:] if private_key.startswith('0x') else private_key)
+            self._account = Account.from_key(self.private_key)
+            self.public_key = self._account.address
+
+    @property
+    def account(self):
+        """
+        Объект eth_account для подписи, создается при первой подписи.
+        """
+        if self._account is None:
+            self._account = Account.from_key(self.private_key)
+        return self._account
 
     def __str__(self) -> str:
         """
@@ -49,17 +77,11 @@ class Client:
         """
         self.chain = chain
         self.rpc = self.chain.rpc
-        self.connection = Web3(Web3.HTTPProvider(self.rpc))
-
-        # Проверка подключения к новой сети
-        if not self.connection.is_connected():
-            raise ConnectionError(f"Failed to connect to the RPC at {self.rpc}")
-
-        # Перезагрузка данных учетной записи с новым RPC
-        self.account = self.connection.eth.account.from_key(self.private_key)
-        self.public_key = self.account.address
+        # Берем общее подключение из реестра; аккаунт от сети не зависит, поэтому заново не создается
+        self.connection = get_connection(self.chain)
         return f"Switched to network {chain.name}"
 
+    @metrics.timed("client_call_seconds")
     def get_transaction_receipt(self, transaction_hash: HexBytes) -> dict:
         """
         Получает информацию о транзакции на основе её хеша.
@@ -69,16 +91,44 @@ class Client:
         """
         return self.connection.eth.get_transaction_receipt(transaction_hash)
 
+    def track_transaction(self, transaction_hash: HexBytes, callback=None, timeout: float = None):
+        """
+        Ставит транзакцию в общий трекер квитанций сети: квитанции всех ожидающих транзакций
+        запрашиваются batch запросами раз в блок.
+
+        :param transaction_hash: Хеш транзакции.
+        :param callback: Функция, которая вызывается со словарем {"tx_hash", "status", "receipt"}.
+        :param timeout: Таймаут ожидания в секундах. По умолчанию — settings.receipts.RECEIPT_TIMEOUT.
+        :return: Future с тем же словарем.
+        """
+        return receipt_tracker.track(self.chain, transaction_hash, callback, timeout, address=self.public_key)
+
+    @metrics.timed("client_call_seconds")
     def send_transaction(self, transaction: dict) -> HexBytes:
         """
         Подписывает и отправляет транзакцию в сеть, возвращая её хеш.
+        Если отправка не удалась, выданный менеджером nonce возвращается ему; nonce, заданный
+        вызывающим кодом, менеджер не трогает.
 
         :param transaction: Словарь с данными транзакции.
         :return: Хеш отправленной транзакции.
         """
         signed_transaction = self.account.sign_transaction(transaction)
-        return self.connection.eth.send_raw_transaction(signed_transaction.rawTransaction)
-
+        reserved = 'nonce' in transaction and nonce_manager.is_reserved(self.chain.id, self.public_key,
+                                                                         transaction['nonce'])
+        try:
+            tx_hash = self.connection.eth.send_raw_transaction(signed_transaction.rawTransaction)
+        except Exception as e:
+            if reserved:
+                nonce_manager.fail(self.connection, self.chain.id, self.public_key, transaction['nonce'])
+            if "underpriced" in str(e).lower():
+                fee_oracle.invalidate(self.chain.id)  # комиссия устарела — следующая транзакция получит свежую
+            raise
+        if reserved:
+            nonce_manager.sent(self.chain.id, self.public_key, transaction['nonce'])
+        return tx_hash
+
+    @metrics.timed("client_call_seconds")
     def get_balance(self, address: str = None) -> float:
         """
         Получает баланс аккаунта в ETH.
@@ -91,6 +141,7 @@ class Client:
         balance_wei = self.connection.eth.get_balance(address)
         return self.connection.from_wei(balance_wei, 'ether')
 
+    @metrics.timed("client_call_seconds")
     def get_nonce(self, address: str = None) -> int:
         """
         Получает текущий nonce для учетной записи.
@@ -102,6 +153,7 @@ class Client:
             address = self.public_key
         return self.connection.eth.get_transaction_count(address)
 
+    @metrics.timed("client_call_seconds")
     def approve(self, token_address: str, spender: str, amount: float) -> HexBytes:
         """
         Выполняет approve транзакцию, позволяя spender расходовать до amount токенов от имени владельца.
@@ -111,60 +163,18 @@ class Client:
         :param amount: Количество токенов для одобрения (в формате float).
         :return: Хеш транзакции.
         """
-        # ABI для метода approve и метода decimals
-        abi = [
-            {
-                "constant": False,
-                "inputs": [
-                    {"name": "_spender", "type": "address"},
-                    {"name": "_value", "type": "uint256"}
-                ],
-                "name": "approve",
-                "outputs": [{"name": "", "type": "bool"}],
-                "type": "function"
-            },
-            {
-                "constant": True,
-                "inputs": [],
-                "name": "decimals",
-                "outputs": [{"name": "", "type": "uint8"}],
-                "type": "function"
-            }
-        ]
-
-        # Создание объекта контракта
-        contract = self.connection.eth.contract(address=Web3.to_checksum_address(token_address), abi=abi)
-
-        # Получение количества знаков после запятой (decimals)
-        decimals = contract.functions.decimals().call()
-
-        # Приведение amount к минимальным единицам токена
-        scaled_amount = int(amount * (10 ** decimals))
-
-        # Nonce для транзакции
-        nonce = self.get_nonce()
-
-        # Оценка газа для транзакции
-        estimated_gas = contract.functions.approve(Web3.to_checksum_address(spender), scaled_amount).estimate_gas({
-            'from': self.public_key
-        })
-
-        # Получение текущей цены газа
-        gas_price = self.connection.eth.gas_price
-
-        # Создание транзакции для вызова метода approve
-        transaction = contract.functions.approve(Web3.to_checksum_address(spender), scaled_amount).build_transaction({
-            'from': self.public_key,
-            'nonce': nonce,
-            'gas': estimated_gas,
-            'gasPrice': gas_price,
-            'chainId': self.chain.id
-        })
+        # decimals, nonce, оценка газа и цена газа запрашиваются одним batch запросом
+        transaction = self.prepare_transactions([{
+            "action": "approve",
+            "token_address": token_address,
+            "to": spender,
+            "amount": amount
+        }])[0]
 
         # Подписывание и отправка транзакции
-        signed_transaction = self.account.sign_transaction(transaction)
-        return self.connection.eth.send_raw_transaction(signed_transaction.rawTransaction)
+        return self.send_transaction(transaction)
 
+    @metrics.timed("client_call_seconds")
     def get_allowance(self, token_address: str, spender: str = None) -> float:
         """
         Получает текущий лимит токенов, одобренный для конкретного spender(для клиента если не указывать).
@@ -175,38 +185,19 @@ class Client:
         """
         if not spender:
             spender = self.public_key
-        abi = [
-            {
-                "constant": True,
-                "inputs": [
-                    {"name": "_owner", "type": "address"},
-                    {"name": "_spender", "type": "address"}
-                ],
-                "name": "allowance",
-                "outputs": [{"name": "remaining", "type": "uint256"}],
-                "type": "function"
-            },
-            {
-                "constant": True,
-                "inputs": [],
-                "name": "decimals",
-                "outputs": [{"name": "", "type": "uint8"}],
-                "type": "function"
-            }
-        ]
-
-        # Создание объекта контракта
-        contract = self.connection.eth.contract(address=Web3.to_checksum_address(token_address), abi=abi)
-
-        # Получение количества знаков после запятой (decimals)
-        decimals = contract.functions.decimals().call()
+        token_address = checksum(token_address)
+
+        # Получение количества знаков после запятой (decimals), из сети только при первом обращении
+        decimals = token_metadata.get_decimals(self.chain.id, token_address,
+                                               lambda: call_uint(self.connection, token_address, DECIMALS_CALL))
 
         # Получение текущего лимита
-        allowance = contract.functions.allowance(self.public_key, Web3.to_checksum_address(spender)).call()
+        allowance = call_uint(self.connection, token_address, encode_allowance(self.public_key, checksum(spender)))
 
         # Приведение лимита к формату float
         return allowance / (10 ** decimals)
 
+    @metrics.timed("client_call_seconds")
     def get_token_balance(self, token_address: str, spender: str = None) -> float:
         """
         Получает баланс токенов для текущего пользователя.
@@ -217,35 +208,19 @@ class Client:
         """
         if not spender:
             spender = self.public_key
-        abi = [
-            {
-                "constant": True,
-                "inputs": [{"name": "_owner", "type": "address"}],
-                "name": "balanceOf",
-                "outputs": [{"name": "balance", "type": "uint256"}],
-                "type": "function"
-            },
-            {
-                "constant": True,
-                "inputs": [],
-                "name": "decimals",
-                "outputs": [{"name": "", "type": "uint8"}],
-                "type": "function"
-            }
-        ]
-
-        # Создание объекта контракта
-        contract = self.connection.eth.contract(address=Web3.to_checksum_address(token_address), abi=abi)
-
-        # Получение количества знаков после запятой (decimals)
-        decimals = contract.functions.decimals().call()
+        token_address = checksum(token_address)
+
+        # Получение количества знаков после запятой (decimals), из сети только при первом обращении
+        decimals = token_metadata.get_decimals(self.chain.id, token_address,
+                                               lambda: call_uint(self.connection, token_address, DECIMALS_CALL))
 
         # Получение баланса
-        balance = contract.functions.balanceOf(spender).call()
+        balance = call_uint(self.connection, token_address, encode_balance_of(checksum(spender)))
 
         # Приведение баланса к формату float
         return balance / (10 ** decimals)
 
+    @metrics.timed("client_call_seconds")
     def send_eth(self, to_address: str, amount: float) -> HexBytes:
         """
         Отправляет ETH на указанный адрес.
@@ -254,26 +229,17 @@ class Client:
         :param amount: Сумма для отправки в ETH.
         :return: Хеш транзакции.
         """
-        # Приведение amount к минимальным единицам (wei)
-        value = self.connection.to_wei(amount, 'ether')
-
-        # Nonce для транзакции
-        nonce = self.get_nonce()
-
-        # Создание транзакции
-        transaction = {
-            'to': Web3.to_checksum_address(to_address),
-            'value': value,
-            'gas': 21000,  # фиксированное значение для обычных ETH транзакций
-            'gasPrice': self.connection.eth.gas_price,
-            'nonce': nonce,
-            'chainId': self.chain.id
-        }
+        # Nonce и цена газа запрашиваются одним batch запросом, газ фиксирован (21000)
+        transaction = self.prepare_transactions([{
+            "action": "send_eth",
+            "to": to_address,
+            "amount": amount
+        }])[0]
 
         # Подписывание и отправка транзакции
-        signed_transaction = self.account.sign_transaction(transaction)
-        return self.connection.eth.send_raw_transaction(signed_transaction.rawTransaction)
+        return self.send_transaction(transaction)
 
+    @metrics.timed("client_call_seconds")
     def transfer_token(self, token_address: str, to_address: str, amount: float) -> HexBytes:
         """
         Отправляет ERC-20 токены на указанный адрес.
@@ -283,57 +249,112 @@ class Client:
         :param amount: Сумма для отправки в формате float.
         :return: Хеш транзакции.
         """
-        abi = [
-            {
-                "constant": False,
-                "inputs": [
-                    {"name": "_to", "type": "address"},
-                    {"name": "_value", "type": "uint256"}
-                ],
-                "name": "transfer",
-                "outputs": [{"name": "", "type": "bool"}],
-                "type": "function"
-            },
-            {
-                "constant": True,
-                "inputs": [],
-                "name": "decimals",
-                "outputs": [{"name": "", "type": "uint8"}],
-                "type": "function"
-            }
-        ]
-
-        # Создание объекта контракта
-        contract = self.connection.eth.contract(address=Web3.to_checksum_address(token_address), abi=abi)
-
-        # Получение количества знаков после запятой (decimals)
-        decimals = contract.functions.decimals().call()
-
-        # Приведение amount к минимальным единицам токена
-        scaled_amount = int(amount * (10 ** decimals))
-
-        # Nonce для транзакции
-        nonce = self.get_nonce()
-
-        # Оценка газа для транзакции
-        estimated_gas = contract.functions.transfer(Web3.to_checksum_address(to_address), scaled_amount).estimate_gas({
-            'from': self.public_key
-        })
-
-        # Получение текущей цены газа
-        gas_price = self.connection.eth.gas_price
-
-        # Создание транзакции
-        transaction = contract.functions.transfer(Web3.to_checksum_address(to_address),
-                                                  scaled_amount).build_transaction({
-            'from': self.public_key,
-            'nonce': nonce,
-            'gas': estimated_gas,
-            'gasPrice': gas_price,
-            'chainId': self.chain.id
-        })
+        # decimals, nonce, оценка газа и цена газа запрашиваются одним batch запросом
+        transaction = self.prepare_transactions([{
+            "action": "transfer",
+            "token_address": token_address,
+            "to": to_address,
+            "amount": amount
+        }])[0]
 
         # Подписывание и отправка транзакции
-        signed_transaction = self.account.sign_transaction(transaction)
-        return self.connection.eth.send_raw_transaction(signed_transaction.rawTransaction)
+        return self.send_transaction(transaction)
+
+    @metrics.timed("client_call_seconds")
+    def get_decimals(self, token_addresses: list) -> list:
+        """
+        Получает decimals для списка токенов. Неизвестные кешу токены запрашиваются одним batch запросом.
 
+        :param token_addresses: Список адресов смарт-контрактов токенов (ERC-20).
+        :return: Список decimals в том же порядке.
+        """
+        token_addresses = [checksum(address) for address in token_addresses]
+        missing = [address for address in dict.fromkeys(token_addresses)
+                   if (token_metadata.get(self.chain.id, address) or {}).get("decimals") is None]
+        if missing:
+            results = batch_request(self.connection, [
+                ("eth_call", [{"to": address, "data": DECIMALS_CALL}, "latest"]) for address in missing
+            ])
+            for address, raw in zip(missing, results):
+                token_metadata.get_decimals(self.chain.id, address, lambda raw=raw: decode_uint(raw))
+        return [token_metadata.get(self.chain.id, address)["decimals"] for address in token_addresses]
+
+    @metrics.timed("client_call_seconds")
+    def prepare_transactions(self, actions: list, urgency: str = FEE_URGENCY) -> list:
+        """
+        Готовит неподписанные транзакции для списка действий аккаунта. Nonce и оценки газа
+        запрашиваются одним JSON-RPC batch запросом, комиссия берется из общего для сети fee_oracle.
+
+        :param actions: Список словарей вида {"action": "approve" | "transfer" | "send_eth",
+            "token_address": адрес токена (кроме send_eth), "to": получатель или spender, "amount": float}.
+        :param urgency: Уровень срочности комиссии (ключ settings.fees.FEE_PRIORITY_PERCENTILES).
+        :return: Список транзакций, готовых к подписи, с последовательными nonce.
+        """
+        token_addresses = [action["token_address"] for action in actions if action["action"] != "send_eth"]
+        decimals = dict(zip(map(checksum, token_addresses), self.get_decimals(token_addresses)))
+
+        transactions = []
+        for action in actions:
+            to_address = checksum(action["to"])
+            if action["action"] == "send_eth":
+                transactions.append({
+                    'to': to_address,
+                    'value': self.connection.to_wei(action["amount"], 'ether'),
+                    'gas': 21000  # фиксированное значение для обычных ETH транзакций
+                })
+            elif action["action"] in ("approve", "transfer"):
+                token_address = checksum(action["token_address"])
+                # Приведение amount к минимальным единицам токена
+                scaled_amount = int(action["amount"] * (10 ** decimals[token_address]))
+                encode = encode_approve if action["action"] == "approve" else encode_transfer
+                transactions.append({
+                    'to': token_address,
+                    'value': 0,
+                    'data': encode(to_address, scaled_amount)
+                })
+            else:
+                raise ValueError(f"Unknown action {action['action']}")
+        return self._fill_transactions(transactions, urgency)
+
+    @metrics.timed("client_call_seconds")
+    def send_transactions(self, transactions: list) -> list:
+        """
+        Подписывает и отправляет подготовленные транзакции по очереди.
+
+        :param transactions: Список транзакций из prepare_transactions.
+        :return: Список хешей транзакций.
+        """
+        return [self.send_transaction(transaction) for transaction in transactions]
+
+    def _fill_transactions(self, transactions: list, urgency: str = FEE_URGENCY) -> list:
+        # Комиссия — из памяти оракула (обновляется раз в FEE_TTL на сеть);
+        # оценки газа и (один раз на аккаунт) pending nonce — один batch запрос
+        fees = fee_oracle.fees(self.connection, self.chain.id, urgency)
+        calls = []
+        seeded = nonce_manager.is_seeded(self.chain.id, self.public_key)
+        if not seeded:
+            calls.append(("eth_getTransactionCount", [self.public_key, "pending"]))
+        for transaction in transactions:
+            if 'gas' not in transaction:
+                calls.append(("eth_estimateGas", [{
+                    "from": self.public_key,
+                    "to": transaction["to"],
+                    "value": hex(transaction["value"]),
+                    "data": transaction.get("data", "0x")
+                }]))
+        results = batch_request(self.connection, calls)
+        if not seeded:
+            nonce_manager.seed(self.chain.id, self.public_key, _to_int(results[0]))
+        estimates = iter(results[0 if seeded else 1:])
+        # Nonce выдаются локально, поэтому можно отправлять транзакции подряд, не дожидаясь майнинга
+        nonce = nonce_manager.reserve(self.connection, self.chain.id, self.public_key, len(transactions))
+        for index, transaction in enumerate(transactions):
+            if 'gas' not in transaction:
+                transaction['gas'] = _to_int(next(estimates))
+            transaction.update({
+                'from': self.public_key,
+                'nonce': nonce + index,
+                'chainId': self.chain.id,
+                **fees
+            })
+        return transactions
@@ -0,0 +1,135 @@
+import math
+
+from settings.crosscurve import CYCLE_TOP_EDGES, MAX_CYCLE_HOPS
+
+
+def build_quote_graph(quotes: list) -> tuple:
+    """
+    Строит взвешенный ориентированный граф из котировок: вершина — (сеть, тикер),
+    вес ребра — −log(amount_out / amount_in). Отрицательный цикл в таком графе — прибыльная петля.
+
+    :param quotes: Список котировок (словари из get_swap_quote).
+    :return: Кортеж (список вершин, список ребер (u, v, вес, котировка)) с индексами вершин.
+    """
+    nodes, index = [], {}
+    best = {}  # (u, v) -> (курс, котировка) с лучшим курсом
+    for quote in quotes:
+        if not quote or quote["amount_in"] <= 0 or quote["amount_out"] <= 0:
+            continue
+        source = (quote["from_chain"], quote["from_token"])
+        target = (quote["to_chain"], quote["to_token"])
+        u = index.get(source)
+        if u is None:
+            u = index[source] = len(nodes)
+            nodes.append(source)
+        v = index.get(target)
+        if v is None:
+            v = index[target] = len(nodes)
+            nodes.append(target)
+        rate = quote["amount_out"] / quote["amount_in"]
+        current = best.get((u, v))
+        if current is None or rate > current[0]:
+            best[(u, v)] = (rate, quote)
+    edges = [(u, v, -math.log(rate), quote) for (u, v), (rate, quote) in best.items()]
+    return nodes, edges
+
+
+def print_cycle(cycle: dict):
+    path = " -> ".join(f"{chain} {ticker}" for chain, ticker in cycle["path"])
+    print(f"{path} | {cycle['amount_in']} : {cycle['amount_out']:.6f} | PROFIT = {cycle['profit']:.6f}")
+
+
+def _walk(vertex: int, hops: int, layers: list, predecessors: list) -> dict:
+    # Цепочка предков вершины из раунда hops: вершина -> расстояние в своем раунде.
+    # Обрывается на повторе, поэтому отрезок цепочки от любой ее вершины до начала — простой путь
+    walk = {}
+    while vertex is not None and vertex not in walk:
+        walk[vertex] = layers[hops][vertex] if hops else 0.0
+        vertex = predecessors[hops][vertex] if hops else None
+        hops -= 1
+    return walk
+
+
+def _close(walk: dict, vertex: int) -> tuple:
+    # Петля из отрезка цепочки предков от vertex до ее начала и замыкающего ребра обратно в vertex
+    cycle = []
+    for current in walk:
+        cycle.append(current)
+        if current == vertex:
+            break
+    cycle.reverse()  # предки идут в обратном порядке
+    start = cycle.index(min(cycle))  # нормализуем поворот, чтобы один цикл не попал в результат дважды
+    return tuple(cycle[start:] + cycle[:start])
+
+
+def find_arbitrage_cycles(quotes: list, max_hops: int = MAX_CYCLE_HOPS, amount: float = None,
+                          top: int = None, top_edges: int = CYCLE_TOP_EDGES) -> list:
+    """
+    Ищет прибыльные петли длиной до max_hops переходов (отрицательные циклы) одним проходом Беллмана — Форда
+    с виртуальным источником и ограничением числа раундов. В каждом раунде релаксируются только ребра вершин,
+    обновленных в прошлом раунде, а предки запоминаются по раундам, поэтому петли выделяются по цепочке
+    предков: каждое ребро, которое возвращается в цепочку предков своей вершины с выигрышем, замыкает петлю.
+    Перед поиском у каждой вершины остаются только top_edges ребер с лучшим курсом.
+    Поиск эвристический: у вершины хранится лучшее расстояние за все раунды и один предок на раунд,
+    поэтому петля, все вершины которой достигаются более выгодными путями через другие вершины,
+    может не попасть в результат.
+
+    :param quotes: Список котировок (словари из get_swap_quote).
+    :param max_hops: Максимальная длина петли.
+    :param amount: Сумма, для которой считается ожидаемый профит. По умолчанию — amount_in котировок.
+    :param top: Сколько лучших петель вернуть. None — все найденные.
+    :param top_edges: Сколько ребер с лучшим курсом оставить у каждой вершины. None — все.
+    :return: Список петель по убыванию профита: словари {"path", "hops", "rate", "amount_in", "amount_out",
+        "profit", "legs"}, где path — список (сеть, тикер) с повтором первой вершины в конце.
+    """
+    nodes, edges = build_quote_graph(quotes)
+    if not edges:
+        return []
+    outgoing = [{} for _ in nodes]  # outgoing[u][v] — (вес, котировка)
+    for u, v, w, quote in edges:
+        outgoing[u][v] = (w, quote)
+    adjacency = [sorted((w, v) for v, (w, _quote) in out.items())[:top_edges or None] for out in outgoing]
+
+    # Виртуальный источник с ребрами нулевого веса во все вершины: в первом раунде срабатывают только
+    # ребра с курсом > 1. layer — расстояния вершин, обновленных в последнем раунде
+    distance = [0.0] * len(nodes)
+    layer = dict.fromkeys(range(len(nodes)), 0.0)
+    layers, predecessors = [None], [None]  # layers[k][v], predecessors[k][v] — расстояние и предок v в раунде k
+    cycles = set()
+    for hops in range(1, max_hops + 1):
+        updated, parents = {}, {}
+        for u, base in layer.items():
+            walk = _walk(u, hops - 1, layers, predecessors)
+            for w, v in adjacency[u]:
+                candidate = base + w
+                # Ребро, возвращающееся в цепочку предков с выигрышем, замыкает прибыльную петлю, даже если
+                # расстояние до v не улучшается — так петли, перекрытые более выгодным путем, не теряются
+                if v in walk and candidate < walk[v] - 1e-12:
+                    cycles.add(_close(walk, v))
+                if candidate < distance[v] - 1e-12:
+                    distance[v] = updated[v] = candidate
+                    parents[v] = u
+        if not updated:
+            break
+        layers.append(updated)
+        predecessors.append(parents)
+        layer = updated
+
+    if amount is None:
+        amount = quotes[0]["amount_in"] if quotes else 0
+    results = []
+    for cycle in cycles:
+        legs = [outgoing[cycle[i]][cycle[(i + 1) % len(cycle)]] for i in range(len(cycle))]
+        total_weight = sum(w for w, _ in legs)
+        rate = math.exp(-total_weight)
+        results.append({
+            "path": [nodes[vertex] for vertex in cycle] + [nodes[cycle[0]]],
+            "hops": len(cycle),
+            "rate": rate,
+            "amount_in": amount,
+            "amount_out": amount * rate,
+            "profit": amount * (rate - 1),
+            "legs": [quote for _, quote in legs]
+        })
+    results.sort(key=lambda item: item["profit"], reverse=True)
+    return results[:top] if top else results
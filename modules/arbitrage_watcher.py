@@ -0,0 +1,145 @@
+import logging
+import time
+from datetime import date
+
+from modules.crosscurve_arbitrage import get_pairs, iter_quotes, route_passes_filter
+from modules.quote_scheduler import QuoteScheduler
+from settings.crosscurve import (API_CONCURRENCY, MAX_SWAP_LOSS, QUOTE_MIN_BATCH, QUOTES_PER_MINUTE, RPC_CONCURRENCY,
+                                 SLIPPAGE, SWAP_ONLY_IN_PLUS, SWAP_PER_DAY, SWAP_PLUS_SIZE, SWAP_TIME_SLEEP,
+                                 WATCH_COLD_PAIRS, WATCH_HOT_PAIRS)
+from utils.concurrency import ConcurrencyLimits
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def print_route(route: dict):
+    print(
+        f"{route.get('from_chain')} {route.get('from_token')} -> {route.get('to_chain')} {route.get('to_token')} | "
+        f"{route.get('amount_in')} : {route.get('amount_out')} | PROFIT = {route.get('profit')}")
+
+
+def pair_key(pair: tuple) -> tuple:
+    """
+    Ключ пары, не зависящий от объектов токенов.
+
+    :param pair: Кортеж (token_in, chain_in, token_out, chain_out).
+    :return: Кортеж (chain id in, адрес in, chain id out, адрес out).
+    """
+    token_in, chain_in, token_out, chain_out = pair
+    return chain_in.id, token_in["address"].lower(), chain_out.id, token_out["address"].lower()
+
+
+class ArbitrageWatcher:
+    def __init__(self, tokens: list, amount: float, swap_only_in_plus: bool = SWAP_ONLY_IN_PLUS,
+                 swap_plus_size: float = SWAP_PLUS_SIZE, max_swap_loss: float = MAX_SWAP_LOSS,
+                 slippage: float = SLIPPAGE, sleep: float = SWAP_TIME_SLEEP, routes_per_day: int = SWAP_PER_DAY,
+                 hot_pairs: int = WATCH_HOT_PAIRS, cold_pairs: int = WATCH_COLD_PAIRS,
+                 quotes_per_minute: float = QUOTES_PER_MINUTE, on_route=print_route):
+        """
+        Режим наблюдения: периодически перекотирует пары и сообщает о роутах, прошедших порог профита.
+        Если задан quotes_per_minute, пары выбирает QuoteScheduler в пределах бюджета котировок, а циклы
+        идут по мере накопления бюджета. Иначе первый цикл проверяет все пары, дальше каждый цикл
+        (раз в sleep секунд) перекотирует hot_pairs пар, ближе всего подошедших к профиту,
+        и очередные cold_pairs остальных пар по кругу.
+
+        :param tokens: Список токенов для работы.
+        :param amount: Сумма свапа (в $).
+        :param sleep: Пауза между циклами в секундах.
+        :param routes_per_day: Максимум сообщений о роутах в сутки.
+        :param hot_pairs: Сколько лучших пар перекотировать каждый цикл.
+        :param cold_pairs: Сколько остальных пар перекотировать каждый цикл.
+        :param quotes_per_minute: Бюджет котировок в минуту. None — фиксированная схема hot/cold.
+        :param on_route: Функция, которая вызывается с каждым найденным роутом.
+        """
+        self.pairs = get_pairs(tokens)
+        self.amount = amount
+        self.swap_only_in_plus = swap_only_in_plus
+        self.swap_plus_size = swap_plus_size
+        self.max_swap_loss = max_swap_loss
+        self.slippage = slippage
+        self.sleep = sleep
+        self.routes_per_day = routes_per_day
+        self.hot_pairs = hot_pairs
+        self.cold_pairs = cold_pairs
+        self.on_route = on_route
+        self.limits = ConcurrencyLimits(API_CONCURRENCY, RPC_CONCURRENCY)
+        self.scheduler = QuoteScheduler(self.pairs, pair_key, quotes_per_minute) if quotes_per_minute else None
+
+        self.last_quotes = {}  # ключ пары -> последняя котировка
+        self.passing = set()  # ключи пар, которые проходили порог в последней котировке
+        self.cycles = 0
+        self._cold_cursor = 0
+        self._day = date.today()
+        self._emitted_today = 0
+
+    def select_pairs(self) -> list:
+        """
+        Выбирает пары для следующего цикла.
+
+        :return: Список пар.
+        """
+        if self.scheduler is not None:
+            return self.scheduler.next_batch()
+        if not self.last_quotes:
+            return list(self.pairs)
+        ranked = sorted((pair for pair in self.pairs if pair_key(pair) in self.last_quotes),
+                        key=lambda pair: self.last_quotes[pair_key(pair)]["profit"], reverse=True)
+        hot = ranked[:self.hot_pairs]
+        hot_keys = {pair_key(pair) for pair in hot}
+        rest = [pair for pair in self.pairs if pair_key(pair) not in hot_keys]
+        cold = []
+        if rest:
+            start = self._cold_cursor % len(rest)
+            cold = (rest[start:] + rest[:start])[:self.cold_pairs]
+            self._cold_cursor = start + len(cold)
+        return hot + cold
+
+    def _emit(self, route: dict):
+        if date.today() != self._day:
+            self._day = date.today()
+            self._emitted_today = 0
+        if self._emitted_today >= self.routes_per_day:
+            logger.info(f"Daily route limit {self.routes_per_day} reached, skipping "
+                        f"{route['from_chain']} {route['from_token']} -> {route['to_chain']} {route['to_token']}")
+            return
+        self._emitted_today += 1
+        self.on_route(route)
+
+    def run_cycle(self) -> list:
+        """
+        Выполняет один цикл перекотировки. Роут сообщается сразу после получения котировки,
+        если пара только что пересекла порог.
+
+        :return: Список роутов, прошедших порог в этом цикле.
+        """
+        found = []
+        for pair, route in iter_quotes(self.select_pairs(), self.slippage, self.amount, self.limits):
+            if self.scheduler is not None:
+                self.scheduler.record(pair, route)
+            if route is None:
+                continue
+            key = pair_key(pair)
+            self.last_quotes[key] = route
+            if route_passes_filter(route, self.swap_only_in_plus, self.swap_plus_size, self.max_swap_loss):
+                found.append(route)
+                if key not in self.passing:  # О стоящем на месте роуте не сообщаем повторно
+                    self.passing.add(key)
+                    self._emit(route)
+            else:
+                self.passing.discard(key)
+        self.cycles += 1
+        logger.info(f"Watcher cycle {self.cycles}: {len(found)} routes over threshold")
+        metrics.write()  # файлы метрик обновляются каждый цикл, а не только при выходе
+        return found
+
+    def run(self, cycles: int = None):
+        """
+        Запускает наблюдение. Останавливается после cycles циклов или по Ctrl+C.
+
+        :param cycles: Количество циклов. None — бесконечно.
+        """
+        while cycles is None or self.cycles < cycles:
+            self.run_cycle()
+            if cycles is None or self.cycles < cycles:
+                time.sleep(self.scheduler.wait_time(QUOTE_MIN_BATCH) if self.scheduler is not None else self.sleep)
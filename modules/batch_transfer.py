@@ -0,0 +1,163 @@
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from eth_account import Account
+
+from classes.account import AccountHandle
+from classes.client import Client
+from settings.accounts import BROADCAST_IN_FLIGHT, SIGN_IN_PROCESS_MIN, SIGN_WORKERS
+from settings.chains import Chain
+from utils.nonce import nonce_manager
+from utils.receipts import receipt_tracker
+
+logger = logging.getLogger(__name__)
+
+NATIVE = "native"  # asset для перевода нативной монеты сети
+
+
+class TransferJob:
+    __slots__ = ("chain", "sender", "to", "asset", "amount")
+
+    def __init__(self, chain: Chain, sender, to: str, asset: str, amount: float):
+        """
+        Один перевод в пакетной рассылке.
+
+        :param chain: обьект класса Chain
+        :param sender: Приватный ключ отправителя или AccountHandle.
+        :param to: Адрес получателя.
+        :param asset: "native" или адрес смарт-контракта токена (ERC-20).
+        :param amount: Сумма в формате float.
+        """
+        self.chain = chain
+        self.sender = sender
+        self.to = to
+        self.asset = asset
+        self.amount = amount
+
+
+def _sign(transaction: dict, private_key: bytes) -> bytes:
+    # Функция верхнего уровня, чтобы ее можно было выполнять в пуле процессов
+    return bytes(Account.sign_transaction(transaction, private_key).rawTransaction)
+
+
+def _sender_address(sender, derived: dict) -> str:
+    # Адрес отправителя; ключи с префиксом 0x и без него дают один адрес, поэтому группируем по адресу.
+    # derived — кеш ключ -> адрес, чтобы не выводить адрес повторно для каждого задания отправителя
+    if isinstance(sender, AccountHandle):
+        return sender.address
+    if sender not in derived:
+        derived[sender] = Account.from_key(sender).address
+    return derived[sender]
+
+
+def run_transfers(jobs: list, chain: Chain = None, sign_workers: int = SIGN_WORKERS,
+                  max_in_flight: int = BROADCAST_IN_FLIGHT, wait: bool = False) -> list:
+    """
+    Пакетная рассылка и сбор средств. Транзакции каждого отправителя готовятся одним batch запросом,
+    подписываются параллельно в пуле процессов и отправляются конкурентно с ограничением
+    числа одновременных отправок на сеть. Транзакции одного отправителя уходят по порядку nonce.
+
+    :param jobs: Список TransferJob или кортежей (from, to, asset, amount), где from — приватный ключ
+        или AccountHandle, asset — "native" или адрес токена.
+    :param chain: Сеть для заданий в виде кортежей.
+    :param sign_workers: Количество процессов для подписи. None — по числу ядер.
+    :param max_in_flight: Максимум одновременных отправок в одну сеть.
+    :param wait: Дождаться квитанций отправленных транзакций через трекер квитанций. При таймауте
+        счетчик nonce отправителя сверяется с сетью и пересинхронизируется, если транзакции выпали.
+    :return: Отчет: список словарей {"job", "chain", "from", "to", "asset", "amount", "status", "tx_hash", "error"}
+        в порядке заданий. status — "sent" или "failed"; с wait — "confirmed", "failed" или "timeout".
+    """
+    jobs = [job if isinstance(job, TransferJob) else TransferJob(chain, *job) for job in jobs]
+    report = [{"job": index, "chain": job.chain.name, "from": None, "to": job.to, "asset": job.asset,
+               "amount": job.amount, "status": "pending", "tx_hash": None, "error": None}
+              for index, job in enumerate(jobs)]
+
+    # Группируем задания по (сеть, адрес отправителя): у каждой группы своя последовательность nonce
+    groups, derived = {}, {}
+    for index, job in enumerate(jobs):
+        try:
+            address = _sender_address(job.sender, derived)
+        except Exception as e:
+            report[index].update(status="failed", error=f"sender: {e}")  # некорректный приватный ключ
+            continue
+        report[index]["from"] = address
+        groups.setdefault((job.chain, address), []).append(index)
+
+    def prepare(group):
+        (job_chain, _), indexes = group
+        actions = []
+        for index in indexes:
+            job = jobs[index]
+            if job.asset == NATIVE:
+                actions.append({"action": "send_eth", "to": job.to, "amount": job.amount})
+            else:
+                actions.append({"action": "transfer", "token_address": job.asset, "to": job.to, "amount": job.amount})
+        client = None
+        try:
+            # AccountHandle передаем как есть, без повторной деривации. Ошибка подключения к сети
+            # отмечает проваленными только задания этой группы, а не весь пакет
+            client = Client(job_chain, jobs[indexes[0]].sender)
+            return client, indexes, client.prepare_transactions(actions)
+        except Exception as e:
+            for index in indexes:
+                report[index].update(status="failed", error=f"prepare: {e}")
+            return client, indexes, None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(groups), max_in_flight))) as executor:
+        prepared = [item for item in executor.map(prepare, groups.items()) if item[2] is not None]
+
+    # Подпись — CPU работа, для больших пакетов выносим ее в пул процессов
+    sign_tasks = [(transaction, client.private_key) for client, _, transactions in prepared
+                  for transaction in transactions]
+    if len(sign_tasks) >= SIGN_IN_PROCESS_MIN and sign_workers != 1:
+        with ProcessPoolExecutor(max_workers=sign_workers) as executor:
+            signed = list(executor.map(_sign, *zip(*sign_tasks), chunksize=max(1, len(sign_tasks) // 64)))
+    else:
+        signed = [_sign(transaction, private_key) for transaction, private_key in sign_tasks]
+
+    semaphores = {}
+    for client, _, _ in prepared:
+        semaphores.setdefault(client.chain, threading.BoundedSemaphore(max_in_flight))
+
+    raw_transactions = iter(signed)
+    broadcasts = [(client, indexes, transactions, [next(raw_transactions) for _ in transactions])
+                  for client, indexes, transactions in prepared]
+
+    def broadcast(item):
+        client, indexes, transactions, raws = item
+        for index, transaction, raw in zip(indexes, transactions, raws):
+            if report[index]["status"] == "failed":
+                continue
+            try:
+                with semaphores[client.chain]:
+                    tx_hash = client.connection.eth.send_raw_transaction(raw)
+                nonce_manager.sent(client.chain.id, client.public_key, transaction['nonce'])
+                report[index].update(status="sent", tx_hash=tx_hash.hex())
+            except Exception as e:
+                logger.warning(f"Broadcast of job {index} from {client.public_key} failed: {e}")
+                report[index].update(status="failed", error=f"broadcast: {e}")
+                # Следующие транзакции отправителя без этой nonce не пройдут — отменяем их и возвращаем
+                # все их nonce менеджеру
+                later = indexes[indexes.index(index) + 1:]
+                for skipped in later:
+                    report[skipped].update(status="failed", error=f"skipped after failed nonce {transaction['nonce']}")
+                nonce_manager.fail(client.connection, client.chain.id, client.public_key, transaction['nonce'],
+                                   count=len(later) + 1)
+                return
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(broadcasts), max_in_flight * max(1, len(semaphores))))) \
+            as executor:
+        list(executor.map(broadcast, broadcasts))
+
+    if wait:
+        tracked = [(index, receipt_tracker.track(jobs[index].chain, row["tx_hash"], address=row["from"]))
+                   for index, row in enumerate(report) if row["status"] == "sent"]
+        for index, future in tracked:
+            result = future.result()
+            report[index]["status"] = result["status"]
+            if result["status"] != "confirmed":
+                report[index]["error"] = f"receipt: {result['status']}"
+            if result["nonce_gap"]:
+                report[index]["error"] += ", nonce gap resynced"
+    return report
@@ -1,78 +1,143 @@
+import heapq
+import json
+import sys
+import threading
 import time
 import requests
 import logging
-from web3 import Web3
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from settings.chains import chains, Chain
-from abi.erc20 import ERC20_ABI
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,  # Уровень логирования
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',  # Формат сообщения
-    handlers=[
-        logging.StreamHandler(),  # Вывод в консоль
-        logging.FileHandler('swap_routes.log', mode='w')  # Вывод в файл
-    ]
-)
+from settings.crosscurve import (API_CONCURRENCY, CROSSCURVE_API_URL, ROUTES_NDJSON_PATH, RPC_CONCURRENCY, SCAN_WORKERS,
+                                 TOP_ROUTES)
+from settings.rate_limit import BACKOFF_BASE, REQUEST_RETRIES
+from utils.concurrency import ConcurrencyLimits, api_slot, rpc_slot
+from utils.erc20 import DECIMALS_CALL, call_uint, checksum
+from utils.metrics import endpoint_label, metrics
+from utils.providers import get_connection
+from utils.quote_cache import quote_cache
+from utils.rate_limit import backoff_delay, parse_retry_after, rate_limiter
+from utils.token_meta import token_metadata
 
 logger = logging.getLogger(__name__)
 
 
-# Функция для получения decimals с обработкой повторных попыток
-def get_decimals_with_retries(contract, retries=1, delay=1):
+# Ошибка JSON-RPC о превышении лимита запросов (код -32005 или текст ошибки от ноды)
+def _is_rate_limited(error: Exception) -> bool:
+    message = str(error).lower()
+    return "-32005" in message or "rate limit" in message or "too many requests" in message \
+        or "limit exceeded" in message
+
+
+# Функция для получения decimals с обработкой повторных попыток. Повторяются только сетевые ошибки
+# и ответы о превышении лимита: реверт или неверный ответ не-ERC20 контракта повтор не исправит
+def get_decimals_with_retries(w3, token_address, retries=REQUEST_RETRIES, delay=BACKOFF_BASE):
     for attempt in range(retries):
         try:
-            return contract.functions.decimals().call()
+            with metrics.timer("decimals_call_seconds"):
+                return call_uint(w3, token_address, DECIMALS_CALL)
         except requests.exceptions.RequestException as e:
-            logger.warning(f"Request failed: {e}. Retrying in {delay} seconds...")
-            time.sleep(delay)
+            pause = backoff_delay(attempt, delay)
+            logger.warning(f"Request failed: {e}. Retrying in {pause:.2f} seconds...")
+            time.sleep(pause)
         except Exception as e:
-            logger.error(f"Unexpected error: {e}. Retrying in {delay} seconds...")
-            time.sleep(delay)
+            if not _is_rate_limited(e):
+                logger.error(f"Failed to get decimals of {token_address}: {e}, skipping token.")
+                return None
+            pause = backoff_delay(attempt, delay)
+            logger.warning(f"Rate limited: {e}. Retrying in {pause:.2f} seconds...")
+            time.sleep(pause)
     logger.error(f"Failed to get decimals after {retries} attempts, skipping token.")
     return None
 
 
 # Функция для отправки запроса и анализа результата
-def make_request_with_retries(url, params, retries=1, delay=1):
+def make_request_with_retries(url, params, retries=REQUEST_RETRIES, delay=BACKOFF_BASE):
+    endpoint = endpoint_label(url)
     for attempt in range(retries):
-        response = requests.post(url, json=params)
+        rate_limiter.acquire(url)  # Общий для всех потоков лимит запросов к хосту
+        start = time.perf_counter()
+        try:
+            response = requests.post(url, json=params)
+        except requests.exceptions.ConnectionError as e:
+            metrics.inc("api_errors_total", endpoint=endpoint)
+            pause = backoff_delay(attempt, delay)
+            logger.warning(f"Connection failed: {e}. Retrying in {pause:.2f} seconds...")
+            time.sleep(pause)
+            continue
+        metrics.observe("api_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+        metrics.inc("api_requests_total", endpoint=endpoint, status=response.status_code)
         if response.status_code == 200:
+            rate_limiter.on_success(url)
             return response
         elif response.status_code == 429:  # Too Many Requests
-            logger.warning(f"Received 429 Too Many Requests. Retrying in {delay} seconds...")
-            time.sleep(delay)
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            rate_limiter.on_throttle(url, retry_after)
+            metrics.inc("api_throttled_total", endpoint=endpoint)
+            pause = max(retry_after or 0, backoff_delay(attempt, delay))
+            logger.warning(f"Received 429 Too Many Requests. Retrying in {pause:.2f} seconds...")
+            time.sleep(pause)
         else:
             response.raise_for_status()  # Если другой статус, просто выбрасываем исключение
     logger.error(f"Failed to get a successful response after {retries} attempts")
     raise Exception(f"Failed to get a successful response after {retries} attempts")
 
 
-# Функция для отправки запроса и анализа результата
-def check_swap_route(token_in: dict, chain_in: Chain, token_out: dict, chain_out: Chain, swap_only_in_plus: bool,
-                     swap_plus_size: float, max_swap_loss: float, slippage: float, amount: float = 1000):
-    w3_in = Web3(Web3.HTTPProvider(chain_in.rpc))
-    checksum_token_in = w3_in.to_checksum_address(token_in["address"])
-    token_in_contract = w3_in.eth.contract(address=checksum_token_in, abi=ERC20_ABI)
-    decimals_in = get_decimals_with_retries(token_in_contract)
+# Получение decimals из сети, вызывается только при промахе кеша метаданных
+def _fetch_decimals(chain: Chain, token_address: str, limits: ConcurrencyLimits = None):
+    w3 = get_connection(chain, check=False)
+    with rpc_slot(chain, limits):
+        return get_decimals_with_retries(w3, token_address)
+
+
+def _make_route(token_in: dict, chain_in: Chain, token_out: dict, chain_out: Chain, amount: float, amount_out: float,
+                route, estimated: bool = False) -> dict:
+    return {
+        "from_token": token_in["ticker"],
+        "from_chain": chain_in.name,
+        "to_token": token_out["ticker"],
+        "to_chain": chain_out.name,
+        "amount_in": amount,
+        "amount_out": amount_out,
+        "profit": amount_out - amount,
+        "route": route,
+        "estimated": estimated  # True — amount_out пересчитан из котировки другой суммы, route котировался не для amount
+    }
+
+
+# Функция для получения котировки пары без фильтрации по профиту.
+# exact=True — для роутов, которые будут исполняться: котировка из кеша для другой суммы не используется
+def get_swap_quote(token_in: dict, chain_in: Chain, token_out: dict, chain_out: Chain, slippage: float,
+                   amount: float = 1000, limits: ConcurrencyLimits = None, exact: bool = False):
+    checksum_token_in = checksum(token_in["address"])
+    decimals_in = token_metadata.get_decimals(chain_in.id, checksum_token_in,
+                                              lambda: _fetch_decimals(chain_in, checksum_token_in, limits))
 
     if decimals_in is None:
         logger.warning(f"Skipping token {token_in['ticker']} on {chain_in.name} due to missing decimals.")
         return None  # Переход к следующему токену, если не удалось получить decimals
 
-    w3_out = Web3(Web3.HTTPProvider(chain_out.rpc))
-    checksum_token_out = w3_out.to_checksum_address(token_out["address"])
-    token_out_contract = w3_out.eth.contract(address=checksum_token_out, abi=ERC20_ABI)
-    decimals_out = get_decimals_with_retries(token_out_contract)
+    checksum_token_out = checksum(token_out["address"])
+    decimals_out = token_metadata.get_decimals(chain_out.id, checksum_token_out,
+                                               lambda: _fetch_decimals(chain_out, checksum_token_out, limits))
 
     if decimals_out is None:
         logger.warning(f"Skipping token {token_out['ticker']} on {chain_out.name} due to missing decimals.")
         return None  # Переход к следующему токену, если не удалось получить decimals
 
+    # Повторный запрос той же пары и суммы в пределах TTL обслуживается из кеша
+    cache_key = quote_cache.key(chain_in.id, token_in["address"], chain_out.id, token_out["address"], amount, slippage)
+    cached = quote_cache.get(cache_key)
+    if cached is not None and cached["amount_in"] == amount:
+        return _make_route(token_in, chain_in, token_out, chain_out, amount, cached["amount_out"], cached["route"])
+    if cached is not None and not exact:
+        # Сумма из той же корзины: amount_out пересчитываем пропорционально сумме и помечаем роут как оценку
+        amount_out = cached["amount_out"] * amount / cached["amount_in"]
+        return _make_route(token_in, chain_in, token_out, chain_out, amount, amount_out, cached["route"], True)
+
     # Масштабирование amountIn с учетом decimals
     amount_in_scaled = amount * (10 ** decimals_in)
 
-    url = "https://api.crosscurve.fi/routing/scan"
+    url = f"{CROSSCURVE_API_URL}/routing/scan"
     params = {
         "params": {
             "chainIdOut": chain_out.id,
@@ -84,72 +149,228 @@ def check_swap_route(token_in: dict, chain_in: Chain, token_out: dict, chain_out
         "slippage": slippage
     }
 
-    response = make_request_with_retries(url, params)
+    with api_slot(limits):
+        response = make_request_with_retries(url, params)
 
     if response.status_code == 200:
         data = response.json()
         if data and "amountOutWithoutSlippage" in data[0]:
             amount_out_raw = float(data[0]["amountOutWithoutSlippage"])
             amount_out = amount_out_raw / (10 ** decimals_out)  # Масштабируем amountOut обратно
-            if swap_only_in_plus:
-                if amount_out - amount > swap_plus_size:
-                    return {
-                        "from_token": token_in["ticker"],
-                        "from_chain": chain_in.name,
-                        "to_token": token_out["ticker"],
-                        "to_chain": chain_out.name,
-                        "amount_in": amount,
-                        "amount_out": amount_out,
-                        "profit": amount_out - amount,
-                        "route": data[0].get("route")
-                    }
-                logger.info(
-                    f"{chain_in.name} {token_in['ticker']} -> {chain_out.name} {token_out['ticker']} | {amount} : {amount_out}")
-                return None
-            else:
-                if amount_out - amount > -max_swap_loss:
-                    return {
-                        "from_token": token_in["ticker"],
-                        "from_chain": chain_in.name,
-                        "to_token": token_out["ticker"],
-                        "to_chain": chain_out.name,
-                        "amount_in": amount,
-                        "amount_out": amount_out,
-                        "profit": amount_out - amount,
-                        "route": data[0].get("route")
-                    }
-                logger.info(
-                    f"{chain_in.name} {token_in['ticker']} -> {chain_out.name} {token_out['ticker']} | {amount} : {amount_out}")
-                return None
+            quote_cache.set(cache_key, {"amount_in": amount, "amount_out": amount_out, "route": data[0].get("route")})
+            return _make_route(token_in, chain_in, token_out, chain_out, amount, amount_out, data[0].get("route"))
         logger.warning("response data is empty")
         return None
     logger.warning(f"response status != 200")
     return None
 
 
-def get_all_routes(tokens: list, swap_only_in_plus: bool, swap_plus_size: float, max_swap_loss: float, slippage: float,
-                   amount: float) -> list:
-    all_routes = []
+# Проверка котировки на соответствие настройкам профита/потерь
+def route_passes_filter(route: dict, swap_only_in_plus: bool, swap_plus_size: float, max_swap_loss: float) -> bool:
+    if swap_only_in_plus:
+        return route["profit"] > swap_plus_size
+    return route["profit"] > -max_swap_loss
+
+
+# Функция для отправки запроса и анализа результата
+@metrics.timed("check_swap_route_seconds")
+def check_swap_route(token_in: dict, chain_in: Chain, token_out: dict, chain_out: Chain, swap_only_in_plus: bool,
+                     swap_plus_size: float, max_swap_loss: float, slippage: float, amount: float = 1000,
+                     limits: ConcurrencyLimits = None, quotes: list = None):
+    route = get_swap_quote(token_in, chain_in, token_out, chain_out, slippage, amount, limits)
+    if route is None:
+        metrics.inc("routes_checked_total", result="no_quote")
+        return None
+    if quotes is not None:
+        quotes.append(route)  # Все котировки без фильтра нужны для поиска многошаговых петель
+    if route_passes_filter(route, swap_only_in_plus, swap_plus_size, max_swap_loss):
+        metrics.inc("routes_checked_total", result="passed")
+        return route
+    metrics.inc("routes_checked_total", result="filtered")
+    logger.info(
+        f"{chain_in.name} {token_in['ticker']} -> {chain_out.name} {token_out['ticker']} | {amount} : {route['amount_out']}")
+    return None
+
+
+def get_pairs(tokens: list) -> list:
+    """
+    Составляет список всех пар для проверки.
+
+    :param tokens: Список токенов из settings.crosscurve.tokens.
+    :return: Список кортежей (token_in, chain_in, token_out, chain_out).
+    """
+    pairs = []
     for token_in in tokens:
         chain_in = chains[token_in["chain"].lower()]  # Получаем объект Chain для входного токена
         for token_out in tokens:
             chain_out = chains[token_out["chain"].lower()]  # Получаем объект Chain для выходного токена
             if token_in != token_out or chain_in != chain_out:  # Проверка чтобы не делать обмен одного токена на него же
-                result = check_swap_route(token_in, chain_in, token_out, chain_out, swap_only_in_plus, swap_plus_size,
-                                          max_swap_loss, slippage, amount)
-                if result:
-                    # Проверяем, содержит ли результат ключи 'from_token' и 'from_chain'
-                    if isinstance(result, dict) and 'from_token' in result and 'from_chain' in result:
-                        all_routes.append(result)
-                        logger.info(
-                            f"Swap {result['from_token']} on {result['from_chain']} to {result['to_token']} on {result['to_chain']}: "
-                            f"Amount In = {result['amount_in']}, Amount Out = {result['amount_out']:.6f}")
+                pairs.append((token_in, chain_in, token_out, chain_out))
+    return pairs
+
+
+def iter_quotes(pairs: list, slippage: float, amount: float, limits: ConcurrencyLimits = None,
+                workers: int = SCAN_WORKERS):
+    """
+    Параллельно котирует пары и отдает результаты по мере их готовности.
+
+    :param pairs: Список пар из get_pairs.
+    :param limits: Ограничители параллельности. Если не указаны, берутся значения из настроек.
+    :param workers: Размер пула потоков.
+    :return: Генератор кортежей (пара, котировка или None).
+    """
+    if limits is None:
+        limits = ConcurrencyLimits(API_CONCURRENCY, RPC_CONCURRENCY)
+
+    def quote_pair(pair):
+        token_in, chain_in, token_out, chain_out = pair
+        try:
+            return get_swap_quote(token_in, chain_in, token_out, chain_out, slippage, amount, limits)
+        except Exception as e:
+            logger.error(f"{chain_in.name} {token_in['ticker']} -> {chain_out.name} {token_out['ticker']} failed: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(quote_pair, pair): pair for pair in pairs}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def _pair_checker(swap_only_in_plus: bool, swap_plus_size: float, max_swap_loss: float, slippage: float,
+                  amount: float, limits: ConcurrencyLimits, quotes: list = None):
+    def check_pair(pair):
+        token_in, chain_in, token_out, chain_out = pair
+        try:
+            return check_swap_route(token_in, chain_in, token_out, chain_out, swap_only_in_plus, swap_plus_size,
+                                    max_swap_loss, slippage, amount, limits, quotes)
+        except Exception as e:
+            logger.error(f"{chain_in.name} {token_in['ticker']} -> {chain_out.name} {token_out['ticker']} failed: {e}")
+            return None
+    return check_pair
+
+
+def _log_route(route: dict):
+    logger.info(
+        f"Swap {route['from_token']} on {route['from_chain']} to {route['to_token']} on {route['to_chain']}: "
+        f"Amount In = {route['amount_in']}, Amount Out = {route['amount_out']:.6f}")
+
+
+def get_all_routes(tokens: list, swap_only_in_plus: bool, swap_plus_size: float, max_swap_loss: float, slippage: float,
+                   amount: float, api_concurrency: int = API_CONCURRENCY, rpc_concurrency: int = RPC_CONCURRENCY,
+                   workers: int = SCAN_WORKERS, quotes: list = None, pairs: list = None) -> list:
+    """
+    Проверяет все пары (token_in, token_out) параллельно и возвращает подходящие роуты
+    в том же порядке, что и последовательный перебор.
+
+    :param api_concurrency: Максимум одновременных запросов к CrossCurve API.
+    :param rpc_concurrency: Максимум одновременных RPC запросов к одной сети.
+    :param workers: Размер пула потоков, выполняющих проверки пар.
+    :param quotes: Список, в который складываются все полученные котировки, включая отфильтрованные.
+    :param pairs: Пары для проверки (часть get_pairs(tokens), например шард). По умолчанию — все пары токенов.
+    :return: Список словарей с роутами.
+    """
+    limits = ConcurrencyLimits(api_concurrency, rpc_concurrency)
+    check_pair = _pair_checker(swap_only_in_plus, swap_plus_size, max_swap_loss, slippage, amount, limits, quotes)
+
+    all_routes = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(check_pair, get_pairs(tokens) if pairs is None else pairs):  # map сохраняет порядок пар
+            if result:
+                all_routes.append(result)
+                _log_route(result)
     return all_routes
 
 
+class TopRoutes:
+    def __init__(self, size: int = TOP_ROUTES):
+        """
+        K самых прибыльных роутов, поддерживается кучей по мере поступления роутов.
+
+        :param size: Сколько роутов хранить.
+        """
+        self.size = size
+        self._heap = []  # минимальная куча (профит, порядковый номер, роут), на вершине — худший из лучших
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def push(self, route: dict) -> bool:
+        """
+        :param route: Роут.
+        :return: True, если роут вошел в топ.
+        """
+        with self._lock:
+            self._counter += 1
+            item = (route["profit"], self._counter, route)
+            if len(self._heap) < self.size:
+                heapq.heappush(self._heap, item)
+                return True
+            if item[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, item)
+                return True
+            return False
+
+    def best(self):
+        """
+        :return: Самый прибыльный роут или None, если роутов нет.
+        """
+        with self._lock:
+            return max(self._heap)[2] if self._heap else None
+
+    def routes(self) -> list:
+        """
+        :return: Роуты по убыванию профита.
+        """
+        with self._lock:
+            return [route for _, _, route in sorted(self._heap, reverse=True)]
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+def stream_routes(tokens: list, swap_only_in_plus: bool, swap_plus_size: float, max_swap_loss: float,
+                  slippage: float, amount: float, top: TopRoutes = None, ndjson=ROUTES_NDJSON_PATH,
+                  api_concurrency: int = API_CONCURRENCY, rpc_concurrency: int = RPC_CONCURRENCY,
+                  workers: int = SCAN_WORKERS, quotes: list = None):
+    """
+    Проверяет все пары параллельно и отдает подходящие роуты сразу по мере получения котировок,
+    не дожидаясь конца сканирования.
+
+    :param top: TopRoutes, в который попадает каждый найденный роут.
+    :param ndjson: Путь к файлу, "-" для stdout или открытый файл: каждый роут дописывается строкой JSON.
+        None — не писать.
+    :param quotes: Список, в который складываются все полученные котировки, включая отфильтрованные.
+    :return: Генератор роутов в порядке получения.
+    """
+    limits = ConcurrencyLimits(api_concurrency, rpc_concurrency)
+    check_pair = _pair_checker(swap_only_in_plus, swap_plus_size, max_swap_loss, slippage, amount, limits, quotes)
+    if isinstance(ndjson, str):
+        output = sys.stdout if ndjson == "-" else open(ndjson, "a")
+    else:
+        output = ndjson
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(check_pair, pair) for pair in get_pairs(tokens)]
+            try:
+                for future in as_completed(futures):
+                    route = future.result()
+                    if not route:
+                        continue
+                    _log_route(route)
+                    if top is not None:
+                        top.push(route)
+                    if output is not None:
+                        output.write(json.dumps(route, default=str) + "\n")
+                        output.flush()  # читатель на другом конце пайпа видит роут сразу
+                    yield route
+            finally:
+                for future in futures:  # генератор закрыли раньше времени — не котируем оставшиеся пары
+                    future.cancel()
+    finally:
+        if isinstance(ndjson, str) and output is not sys.stdout:
+            output.close()
+
+
 def get_profitable_route(routes: list[dict]):
-    max_profit_route = routes[0]  # Начальная инициализация
-    for i in range(1, len(routes)):  # Начинаем с первого (второго) элемента
-        if routes[i].get("profit") > max_profit_route.get("profit"):
-            max_profit_route = routes[i]
-    return max_profit_route
+    if not routes:
+        return None
+    return max(routes, key=lambda route: route.get("profit"))
@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from settings.accounts import JOB_WORKERS
+
+logger = logging.getLogger(__name__)
+
+BALANCES = "balances"
+TRANSFERS = "transfers"
+ARBITRAGE = "arbitrage"
+ACCOUNT_JOBS = (BALANCES, TRANSFERS)  # задания, которые шардируются по аккаунтам; arbitrage — по парам токенов
+
+_REQUIRED_FIELDS = {BALANCES: (), TRANSFERS: ("chain", "to", "amount"), ARBITRAGE: ("slippage", "amount")}
+
+
+def load_spec(value: str) -> dict:
+    """
+    Читает и проверяет описание задания. Поля:
+    balances — chains (имена сетей, по умолчанию все), tokens;
+    transfers — chain, to, amount, asset ("native" или адрес токена, по умолчанию "native"), wait;
+    arbitrage — slippage, amount, tokens, swap_only_plus, swap_plus_size, max_swap_loss.
+    tokens — список "сеть:тикер" из settings.crosscurve.tokens, по умолчанию все токены.
+
+    :param value: JSON строка или путь к JSON файлу.
+    :return: Словарь задания.
+    :raises ValueError: Если тип задания неизвестен или не хватает обязательных полей.
+    """
+    if value.lstrip().startswith("{"):
+        spec = json.loads(value)
+    else:
+        with open(value, "r") as file:
+            spec = json.load(file)
+    if spec.get("job") not in _REQUIRED_FIELDS:
+        raise ValueError(f"Unknown job {spec.get('job')!r}, expected one of {', '.join(_REQUIRED_FIELDS)}")
+    missing = [field for field in _REQUIRED_FIELDS[spec["job"]] if field not in spec]
+    if missing:
+        raise ValueError(f"Job {spec['job']!r} is missing fields: {', '.join(missing)}")
+    return spec
+
+
+def shard(total: int, index: int, count: int) -> list:
+    """
+    Номера элементов, которые обрабатывает шард. Элементы раскладываются по шардам через один,
+    поэтому разбиение детерминировано и шарды получают почти поровну работы.
+
+    :param total: Количество элементов (аккаунтов или пар).
+    :param index: Номер шарда, от 0 до count - 1.
+    :param count: Количество шардов.
+    :return: Список номеров элементов.
+    """
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {index}/{count}")
+    return list(range(index, total, count))
+
+
+def _select_tokens(spec: dict) -> list:
+    from settings.crosscurve import tokens
+    if not spec.get("tokens"):
+        return tokens
+    wanted = {name.lower() for name in spec["tokens"]}
+    return [token for token in tokens if f"{token['chain']}:{token['ticker']}".lower() in wanted]
+
+
+def _sort_rows(spec: dict, rows: list) -> list:
+    if spec["job"] == ARBITRAGE:
+        return sorted(rows, key=lambda row: -row["profit"])
+    return sorted(rows, key=lambda row: row["account"])  # sorted устойчив: порядок сетей и активов сохраняется
+
+
+def _run_part(spec: dict, items: list, sign_workers: int = None) -> list:
+    # Функция верхнего уровня, чтобы ее можно было выполнять в пуле процессов.
+    # items — пары (номер аккаунта, приватный ключ) или номера пар токенов для arbitrage
+    if spec["job"] == BALANCES:
+        from utils.w3 import get_balances_multicall
+        table = get_balances_multicall([key for _, key in items], spec.get("chains"), _select_tokens(spec))
+        account_index = dict(zip(table.accounts, (index for index, _ in items)))
+        return [{"account": account_index[address], "address": address, "chain": chain_name, "asset": asset,
+                 "balance": value, "error": table.errors.get(chain_name)}
+                for address, chain_name, asset, value in table.rows()]
+
+    if spec["job"] == TRANSFERS:
+        from modules.batch_transfer import NATIVE, run_transfers
+        from settings.chains import chains
+        jobs = [(key, spec["to"], spec.get("asset", NATIVE), spec["amount"]) for _, key in items]
+        report = run_transfers(jobs, chains[spec["chain"].lower()], sign_workers=sign_workers,
+                               wait=spec.get("wait", False))
+        for row in report:
+            row["account"] = items[row.pop("job")][0]
+        return report
+
+    from modules.crosscurve_arbitrage import get_all_routes, get_pairs
+    tokens = _select_tokens(spec)
+    pairs = get_pairs(tokens)
+    return get_all_routes(tokens, spec.get("swap_only_plus", False), spec.get("swap_plus_size", 0),
+                          spec.get("max_swap_loss", 10 ** 9), spec["slippage"], spec["amount"],
+                          pairs=[pairs[index] for index in items])
+
+
+def run_shard(spec: dict, private_keys: list, index: int = 0, count: int = 1, workers: int = JOB_WORKERS) -> dict:
+    """
+    Выполняет свою часть задания: шард index из count, разделенный между процессами-воркерами.
+
+    :param spec: Задание из load_spec.
+    :param private_keys: Полный список приватных ключей (одинаковый на всех машинах).
+    :param index: Номер шарда.
+    :param count: Количество шардов.
+    :param workers: Количество процессов. None — по числу ядер.
+    :return: Результат шарда, который можно объединить с остальными через merge_results.
+    """
+    started = time.time()
+    if spec["job"] in ACCOUNT_JOBS:
+        total = len(private_keys)
+        items = [(number, private_keys[number]) for number in shard(total, index, count)]
+    else:
+        from modules.crosscurve_arbitrage import get_pairs
+        total = len(get_pairs(_select_tokens(spec)))
+        items = shard(total, index, count)
+
+    workers = workers or os.cpu_count() or 1
+    parts = [part for part in (items[worker::workers] for worker in range(workers)) if part]
+    logger.info(f"Shard {index}/{count}: {len(items)} of {total} items in {len(parts)} worker(s)")
+    if len(parts) <= 1:
+        rows = _run_part(spec, items)
+    else:
+        # Подпись транзакций внутри воркера идет в его же процессе, чтобы не плодить вложенные пулы
+        with ProcessPoolExecutor(max_workers=len(parts)) as executor:
+            rows = [row for part in executor.map(_run_part, [spec] * len(parts), parts, [1] * len(parts))
+                    for row in part]
+    return {"spec": spec, "shard_count": count, "shards": [index], "items": len(items), "total_items": total,
+            "rows": _sort_rows(spec, rows), "elapsed": time.time() - started}
+
+
+def _summarize(spec: dict, rows: list) -> dict:
+    if spec["job"] == BALANCES:
+        totals, failed, failed_chains = {}, 0, {}
+        for row in rows:
+            if row.get("error"):
+                failed_chains.setdefault(row["chain"], row["error"])
+            if row["balance"] is None:
+                failed += 1
+                continue
+            chain_totals = totals.setdefault(row["chain"], {})
+            chain_totals[row["asset"]] = chain_totals.get(row["asset"], 0) + row["balance"]
+        return {"totals": totals, "failed": failed, "failed_chains": failed_chains}
+    if spec["job"] == TRANSFERS:
+        statuses = {}
+        for row in rows:
+            statuses[row["status"]] = statuses.get(row["status"], 0) + 1
+        return {"statuses": statuses}
+    return {"routes": len(rows), "best": rows[0] if rows else None}
+
+
+def merge_results(results: list) -> dict:
+    """
+    Объединяет результаты шардов одного задания в общий отчет.
+
+    :param results: Результаты run_shard (или уже объединенные отчеты).
+    :return: Отчет с rows всех шардов, сводкой summary и списком недостающих шардов missing_shards.
+        Для balances summary["failed_chains"] — сети, балансы которых не удалось получить, с текстом ошибки.
+    :raises ValueError: Если результаты относятся к разным заданиям или шарды повторяются.
+    """
+    if not results:
+        raise ValueError("Nothing to merge")
+    spec, count = results[0]["spec"], results[0]["shard_count"]
+    shards = []
+    for result in results:
+        if result["spec"] != spec or result["shard_count"] != count:
+            raise ValueError("Shard results belong to different jobs")
+        shards.extend(result["shards"])
+    duplicates = sorted({index for index in shards if shards.count(index) > 1})
+    if duplicates:
+        raise ValueError(f"Shards merged more than once: {duplicates}")
+
+    rows = _sort_rows(spec, [row for result in results for row in result["rows"]])
+    return {"spec": spec, "shard_count": count, "shards": sorted(shards),
+            "missing_shards": [index for index in range(count) if index not in shards],
+            "items": sum(result["items"] for result in results), "total_items": results[0]["total_items"],
+            "rows": rows, "summary": _summarize(spec, rows),
+            "elapsed": max(result["elapsed"] for result in results)}
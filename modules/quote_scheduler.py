@@ -0,0 +1,167 @@
+import math
+import threading
+import time
+
+from settings.cache import QUOTE_CACHE_TTL
+from settings.crosscurve import (QUOTE_EXPLORE_SHARE, QUOTE_FAILURE_BACKOFF, QUOTE_FAILURE_BACKOFF_MAX, QUOTE_MIN_BATCH,
+                                 QUOTE_STATS_ALPHA, QUOTE_UCB_BONUS, QUOTES_PER_MINUTE)
+
+
+class PairStats:
+    """
+    Статистика котировок одной пары: экспоненциальное среднее и дисперсия относительного профита
+    (amount_out / amount_in - 1).
+    """
+    __slots__ = ("quotes", "failures", "failure_streak", "mean", "variance", "last_profit", "last_quoted",
+                 "next_quote")
+
+    def __init__(self):
+        self.quotes = 0
+        self.failures = 0
+        self.failure_streak = 0  # неудачи подряд, от них растет пауза пары
+        self.mean = 0.0
+        self.variance = 0.0
+        self.last_profit = None
+        self.last_quoted = 0.0
+        self.next_quote = -math.inf  # раньше этого момента пара не котируется
+
+    @property
+    def attempts(self) -> int:
+        return self.quotes + self.failures
+
+    def update(self, spread: float, alpha: float):
+        if self.quotes == 0:
+            self.mean = spread
+        else:
+            delta = spread - self.mean
+            self.mean += alpha * delta
+            self.variance = (1 - alpha) * (self.variance + alpha * delta * delta)
+        self.quotes += 1
+
+
+class QuoteScheduler:
+    def __init__(self, pairs: list, key, quotes_per_minute: float = QUOTES_PER_MINUTE,
+                 explore_share: float = QUOTE_EXPLORE_SHARE, alpha: float = QUOTE_STATS_ALPHA,
+                 bonus: float = QUOTE_UCB_BONUS, ttl: float = QUOTE_CACHE_TTL,
+                 backoff: float = QUOTE_FAILURE_BACKOFF, max_backoff: float = QUOTE_FAILURE_BACKOFF_MAX,
+                 clock=time.monotonic):
+        """
+        Распределяет бюджет котировок в минуту между парами. Большая часть каждой партии достается
+        парам с наибольшим приоритетом (оптимистичная оценка профита по схеме UCB: среднее + разброс +
+        бонус за редкие котировки), остальное — парам, которые дольше всех не котировались.
+        Ни разу не котированные пары идут первыми.
+        Пара не котируется повторно, пока жива ее котировка в кеше (ttl), а после неудачной котировки
+        отдыхает backoff секунд, вдвое дольше после каждой следующей неудачи подряд.
+
+        :param pairs: Список пар.
+        :param key: Функция, возвращающая хешируемый ключ пары.
+        :param quotes_per_minute: Бюджет котировок в минуту. Неиспользованный бюджет копится не больше чем на минуту.
+        :param explore_share: Доля партии для давно не котированных пар.
+        :param alpha: Вес новой котировки в статистике пары.
+        :param bonus: Коэффициент бонуса за редкие котировки (в единицах относительного профита).
+        :param ttl: Сколько секунд после котировки пара не выбирается (время жизни кеша котировок).
+        :param backoff: Пауза пары после первой неудачной котировки в секундах.
+        :param max_backoff: Максимальная пауза пары после неудач подряд.
+        :param clock: Источник времени.
+        """
+        self.pairs = list(pairs)
+        self.key = key
+        self.quotes_per_minute = quotes_per_minute
+        self.explore_share = explore_share
+        self.alpha = alpha
+        self.bonus = bonus
+        self.ttl = ttl
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.stats = {key(pair): PairStats() for pair in self.pairs}
+        self.total_quotes = 0
+        self._lock = threading.Lock()
+        self._tokens = float(quotes_per_minute)  # первая партия сразу получает бюджет минуты
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        rate = self.quotes_per_minute / 60
+        self._tokens = min(float(self.quotes_per_minute), self._tokens + (now - self._updated) * rate)
+        self._updated = now
+
+    def priority(self, stats: PairStats) -> float:
+        if stats.attempts == 0:
+            return math.inf
+        # Неудачные котировки тоже попытки: без них бонус за редкость у непроходимой пары не убывал бы
+        exploration = self.bonus * math.sqrt(math.log(self.total_quotes + 1) / stats.attempts)
+        return stats.mean + math.sqrt(stats.variance) + exploration
+
+    def _ready(self, now: float) -> list:
+        return [pair for pair in self.pairs if self.stats[self.key(pair)].next_quote <= now]
+
+    def wait_time(self, batch: int = QUOTE_MIN_BATCH) -> float:
+        """
+        :param batch: Желаемый размер партии.
+        :return: Сколько секунд ждать, пока накопится бюджет на batch котировок
+            (или пока освободится хотя бы одна пара, если все на паузе).
+        """
+        with self._lock:
+            self._refill()
+            ready = len(self._ready(self._updated))
+            if not ready:
+                resume = min(stats.next_quote for stats in self.stats.values()) if self.stats else self._updated
+                return max(0.0, resume - self._updated)
+            batch = min(batch, self.quotes_per_minute, ready)
+            missing = batch - self._tokens
+            return max(0.0, missing * 60 / self.quotes_per_minute)
+
+    def next_batch(self) -> list:
+        """
+        Выбирает пары на накопленный бюджет и списывает его. Пары на паузе не выбираются.
+
+        :return: Список пар.
+        """
+        with self._lock:
+            self._refill()
+            ready = self._ready(self._updated)
+            size = min(int(self._tokens), len(ready))
+            if size <= 0:
+                return []
+            self._tokens -= size
+            ranked = sorted(ready, key=lambda pair: self.priority(self.stats[self.key(pair)]), reverse=True)
+            unquoted = sum(1 for pair in ranked if self.stats[self.key(pair)].attempts == 0)
+            # Пока есть ни разу не котированные пары, весь бюджет уходит на них
+            exploit = size if unquoted >= size else max(unquoted, size - int(size * self.explore_share))
+            batch = ranked[:exploit]
+            rest = sorted(ranked[exploit:], key=lambda pair: self.stats[self.key(pair)].last_quoted)
+            return batch + rest[:size - exploit]
+
+    def record(self, pair: tuple, route: dict = None):
+        """
+        Учитывает результат котировки пары.
+
+        :param pair: Пара.
+        :param route: Котировка или None, если ее не удалось получить.
+        """
+        with self._lock:
+            stats = self.stats[self.key(pair)]
+            stats.last_quoted = self.clock()
+            self.total_quotes += 1
+            if route is None or not route["amount_in"]:
+                stats.failures += 1
+                stats.failure_streak += 1
+                pause = min(self.backoff * 2 ** (stats.failure_streak - 1), self.max_backoff)
+                stats.next_quote = stats.last_quoted + max(pause, self.ttl)
+                return
+            stats.failure_streak = 0
+            # Раньше истечения ttl котировка пришла бы из кеша и только исказила бы статистику
+            stats.next_quote = stats.last_quoted + self.ttl
+            stats.last_profit = route["profit"]
+            stats.update(route["amount_out"] / route["amount_in"] - 1, self.alpha)
+
+    def snapshot(self, top: int = None) -> list:
+        """
+        :param top: Сколько пар вернуть.
+        :return: Список (ключ пары, приоритет, статистика) по убыванию приоритета.
+        """
+        with self._lock:
+            rows = [(key, self.priority(stats), stats) for key, stats in self.stats.items()]
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows[:top] if top else rows
@@ -0,0 +1,143 @@
+import math
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.crosscurve_arbitrage import get_pairs, get_swap_quote
+from settings.cache import QUOTE_AMOUNT_BUCKET
+from settings.crosscurve import (API_CONCURRENCY, RPC_CONCURRENCY, SCAN_WORKERS, SIZE_SEARCH_BUDGET, SIZE_SEARCH_GRID,
+                                 SIZE_SEARCH_MAX, SIZE_SEARCH_MIN, SIZE_SEARCH_PAIRS)
+from utils.concurrency import ConcurrencyLimits
+
+logger = logging.getLogger(__name__)
+
+GOLDEN_RATIO = (math.sqrt(5) - 1) / 2
+
+
+class _BudgetedQuoter:
+    """
+    Котирует одну пару с запоминанием результатов и жестким лимитом числа котировок.
+    """
+
+    def __init__(self, pair: tuple, slippage: float, budget: int, limits: ConcurrencyLimits = None):
+        self.pair = pair
+        self.slippage = slippage
+        self.budget = budget
+        self.limits = limits
+        self.calls = 0
+        self.routes = {}  # сумма -> котировка (или None)
+
+    @property
+    def exhausted(self) -> bool:
+        return self.calls >= self.budget
+
+    def profit(self, log_amount: float) -> float:
+        amount = round(math.exp(log_amount), 2)
+        if amount not in self.routes:
+            if self.exhausted:
+                return -math.inf
+            self.calls += 1
+            token_in, chain_in, token_out, chain_out = self.pair
+            try:
+                self.routes[amount] = get_swap_quote(token_in, chain_in, token_out, chain_out, self.slippage, amount,
+                                                     self.limits)
+            except Exception as e:
+                logger.error(f"{chain_in.name} {token_in['ticker']} -> {chain_out.name} {token_out['ticker']} "
+                             f"at {amount} failed: {e}")
+                self.routes[amount] = None
+        route = self.routes[amount]
+        return route["profit"] if route is not None else -math.inf
+
+
+def optimize_trade_size(pair: tuple, slippage: float, min_amount: float = SIZE_SEARCH_MIN,
+                        max_amount: float = SIZE_SEARCH_MAX, budget: int = SIZE_SEARCH_BUDGET,
+                        grid: int = SIZE_SEARCH_GRID, limits: ConcurrencyLimits = None):
+    """
+    Ищет сумму свапа с максимальным абсолютным профитом. Сначала пара котируется в grid точках,
+    равномерно распределенных по логарифму суммы, затем интервал вокруг лучшей точки сужается
+    золотым сечением, пока не кончится бюджет или интервал не станет уже корзины кеша котировок.
+
+    :param pair: Кортеж (token_in, chain_in, token_out, chain_out).
+    :param min_amount: Минимальная сумма свапа.
+    :param max_amount: Максимальная сумма свапа.
+    :param budget: Максимум котировок на пару.
+    :param grid: Количество точек грубого перебора.
+    :param limits: Ограничители параллельности.
+    :return: Словарь {"route", "amount", "profit", "curve", "quotes"}, где route — котировка в лучшей точке,
+        curve — список (сумма, профит) по возрастанию суммы. None, если пару не удалось котировать.
+    """
+    quoter = _BudgetedQuoter(pair, slippage, budget, limits)
+    low, high = math.log(min_amount), math.log(max_amount)
+    grid = max(2, min(grid, budget))
+    points = [low + (high - low) * i / (grid - 1) for i in range(grid)]
+    profits = [quoter.profit(x) for x in points]
+    best = max(range(grid), key=profits.__getitem__)
+
+    if profits[best] > -math.inf:
+        # Профит от суммы обычно унимодален: рост до глубины пула, потом потери на проскальзывании
+        a, b = points[max(best - 1, 0)], points[min(best + 1, grid - 1)]
+        tolerance = math.log(1 + QUOTE_AMOUNT_BUCKET)
+        c, d = b - GOLDEN_RATIO * (b - a), a + GOLDEN_RATIO * (b - a)
+        while b - a > tolerance and not quoter.exhausted:
+            if quoter.profit(c) > quoter.profit(d):
+                b, d = d, c
+                c = b - GOLDEN_RATIO * (b - a)
+            else:
+                a, c = c, d
+                d = a + GOLDEN_RATIO * (b - a)
+
+    curve = sorted((amount, route["profit"]) for amount, route in quoter.routes.items() if route is not None)
+    if not curve:
+        return None
+    amount, profit = max(curve, key=lambda point: point[1])
+    return {"route": quoter.routes[amount], "amount": amount, "profit": profit, "curve": curve,
+            "quotes": quoter.calls}
+
+
+def promising_pairs(tokens: list, quotes: list, top: int = SIZE_SEARCH_PAIRS) -> list:
+    """
+    Выбирает пары с наибольшим профитом по результатам обычного сканирования.
+
+    :param tokens: Список токенов, по которым проводилось сканирование.
+    :param quotes: Котировки из get_all_routes (параметр quotes).
+    :param top: Количество пар.
+    :return: Список кортежей (token_in, chain_in, token_out, chain_out).
+    """
+    pairs = {(chain_in.name, token_in["ticker"], chain_out.name, token_out["ticker"]): (token_in, chain_in, token_out,
+                                                                                      chain_out)
+             for token_in, chain_in, token_out, chain_out in get_pairs(tokens)}
+    ranked = sorted((quote for quote in quotes if quote), key=lambda quote: quote["profit"], reverse=True)
+    result = []
+    for quote in ranked:
+        pair = pairs.get((quote["from_chain"], quote["from_token"], quote["to_chain"], quote["to_token"]))
+        if pair is not None:
+            result.append(pair)
+        if len(result) >= top:
+            break
+    return result
+
+
+def optimize_pairs(pairs: list, slippage: float, min_amount: float = SIZE_SEARCH_MIN,
+                   max_amount: float = SIZE_SEARCH_MAX, budget: int = SIZE_SEARCH_BUDGET,
+                   api_concurrency: int = API_CONCURRENCY, rpc_concurrency: int = RPC_CONCURRENCY,
+                   workers: int = SCAN_WORKERS) -> list:
+    """
+    Параллельно подбирает оптимальную сумму для каждой пары.
+
+    :return: Список результатов optimize_trade_size по убыванию профита.
+    """
+    limits = ConcurrencyLimits(api_concurrency, rpc_concurrency)
+
+    def optimize(pair):
+        return optimize_trade_size(pair, slippage, min_amount, max_amount, budget, limits=limits)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = [result for result in executor.map(optimize, pairs) if result is not None]
+    results.sort(key=lambda result: result["profit"], reverse=True)
+    return results
+
+
+def print_size_result(result: dict):
+    route = result["route"]
+    print(f"{route['from_chain']} {route['from_token']} -> {route['to_chain']} {route['to_token']} | "
+          f"лучшая сумма {result['amount']} | PROFIT = {result['profit']:.6f} | котировок {result['quotes']}")
+    print("    " + "  ".join(f"{amount}: {profit:.4f}" for amount, profit in result["curve"]))
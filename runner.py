@@ -0,0 +1,64 @@
+import argparse
+import contextlib
+import json
+import sys
+
+from modules.job_runner import load_spec, merge_results, run_shard
+from settings.accounts import JOB_ACCOUNTS_PATH, JOB_WORKERS
+from utils.logs import setup_logging
+from utils.other import read_file
+
+
+def _write(report: dict, output: str):
+    if output:
+        with open(output, "w") as file:
+            json.dump(report, file, indent=1, default=str)
+    else:
+        json.dump(report, sys.stdout, indent=1, default=str)
+        print()
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Неинтерактивный запуск заданий по списку аккаунтов с шардированием")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="выполнить свой шард задания")
+    run.add_argument("spec", help='JSON файл задания или JSON строка, например {"job": "balances"}')
+    run.add_argument("--accounts", default=JOB_ACCOUNTS_PATH, help="файл с приватными ключами")
+    run.add_argument("--shard-index", type=int, default=0)
+    run.add_argument("--shard-count", type=int, default=1, help="на сколько машин/запусков делится задание")
+    run.add_argument("--workers", type=int, default=JOB_WORKERS, help="процессов на шард (по умолчанию по ядрам)")
+    run.add_argument("--output", help="путь к JSON результату (по умолчанию stdout)")
+
+    merge = commands.add_parser("merge", help="объединить результаты шардов в один отчет")
+    merge.add_argument("results", nargs="+", help="JSON результаты шардов")
+    merge.add_argument("--output", help="путь к JSON отчету (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    setup_logging(path=None)  # несколько процессов не должны перезаписывать общий файл лога
+    if args.command == "run":
+        spec = load_spec(args.spec)
+        private_keys = read_file(args.accounts) if spec["job"] != "arbitrage" else []
+        # stdout отдан под JSON отчет: случайный print внутри задания уходит в stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            report = merge_results([run_shard(spec, private_keys, args.shard_index, args.shard_count, args.workers)])
+    else:
+        results = []
+        for path in args.results:
+            with open(path, "r") as file:
+                results.append(json.load(file))
+        report = merge_results(results)
+    _write(report, args.output)
+    status = 0
+    if report["missing_shards"] and args.command == "merge":
+        print(f"Нет результатов шардов: {report['missing_shards']}", file=sys.stderr)
+        status = 1
+    failed_chains = report["summary"].get("failed_chains")
+    if failed_chains:
+        print(f"Не удалось получить балансы в сетях: {', '.join(failed_chains)}", file=sys.stderr)
+        status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,15 @@
+IMPORT_BATCH_SIZE = 1000 # mnemonics derived and appended to pk.txt per batch
+
+IMPORT_WORKERS = None # processes deriving keys, None = number of CPU cores
+
+PK_INDEX_PATH = "cache/pk_index.sqlite3" # on-disk index of keys already in pk.txt
+
+SIGN_WORKERS = None # processes signing transactions in batch transfers, None = number of CPU cores
+
+BROADCAST_IN_FLIGHT = 16 # max simultaneous sendRawTransaction calls per chain
+
+SIGN_IN_PROCESS_MIN = 64 # smaller batches are signed in the main process
+
+JOB_ACCOUNTS_PATH = "settings/pk.txt" # private keys the headless runner shards
+
+JOB_WORKERS = None # worker processes per shard in runner.py, None = number of CPU cores
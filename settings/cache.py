@@ -0,0 +1,9 @@
+TOKEN_CACHE_PATH = "cache/token_metadata.json" # decimals of tokens, keyed by chain id and address
+
+QUOTE_CACHE_TTL = 30 # seconds a CrossCurve quote is reused
+
+QUOTE_CACHE_SIZE = 10000 # max quotes kept in memory (LRU)
+
+QUOTE_AMOUNT_BUCKET = 0.01 # amounts within 1% of each other share a cached quote
+
+QUOTE_CACHE_PATH = None # e.g. "cache/quotes.sqlite3" to share quotes between processes
@@ -1,54 +1,74 @@
+from utils.endpoints import EndpointPool
+
+
 class Chain:
-    def __init__(self, name: str, chain_id: int, rpc: str, native_token: str):
+    def __init__(self, name: str, chain_id: int, rpc, native_token: str):
         self.name = name
         self.id = chain_id
-        self.rpc = rpc
+        self.endpoints = EndpointPool([rpc] if isinstance(rpc, str) else rpc)  # один URL или список URL
         self.native_token = native_token
 
-    def set_rpc_url(self, url: str) -> bool:
-        self.rpc = url
+    @property
+    def rpc(self) -> str:
+        return self.endpoints.best()  # самый быстрый работающий RPC из пула
+
+    def set_rpc_url(self, url) -> bool:
+        self.endpoints = EndpointPool([url] if isinstance(url, str) else url)
         return True
 
 
+RPC_POOL_SIZE = 16 # keep-alive HTTP connections per chain
+
+RPC_BATCH_SIZE = 100 # max calls per JSON-RPC batch request, public RPCs reject longer batches
+
+RPC_TIMEOUT = 15 # seconds per RPC request
+
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11" # same address on every chain below
+
+MULTICALL_CHUNK_SIZE = 500 # calls per aggregate3, halved automatically if the node rejects it
+
+NATIVE_BALANCE_BATCH_SIZE = 100 # eth_getBalance calls per JSON-RPC batch
+
+
 chains = {
     "ethereum": Chain(
         'ethereum',
         1,
-        "https://eth.llamarpc.com",
+        ["https://eth.llamarpc.com", "https://ethereum-rpc.publicnode.com"],
         "ETH"),
     "bsc": Chain(
         'bsc',
         56,
-        "https://binance.llamarpc.com",
+        ["https://binance.llamarpc.com", "https://bsc-rpc.publicnode.com"],
         "BNB"),
     "arbitrum": Chain(
         'arbitrum',
         42161,
-        "https://arbitrum.llamarpc.com",
+        ["https://arbitrum.llamarpc.com", "https://arbitrum-one-rpc.publicnode.com"],
         "ETH"),
     "base": Chain(
         'base',
         8453,
-        "https://base.drpc.org",
+        ["https://base.drpc.org", "https://base-rpc.publicnode.com"],
         "ETH"),
     "avalanche": Chain(
         'avalance',
         43114,
-        "https://avalanche.drpc.org",
+        ["https://avalanche.drpc.org", "https://avalanche-c-chain-rpc.publicnode.com"],
         "AVAX"),
     "polygon": Chain(
         'polygon',
         137,
-        "https://polygon.llamarpc.com",
+        ["https://polygon.llamarpc.com", "https://polygon-bor-rpc.publicnode.com"],
         "MATIC"),
     "optimism": Chain(
         'optimism',
         10,
-        "https://optimism.llamarpc.com",
+        ["https://optimism.llamarpc.com", "https://optimism-rpc.publicnode.com"],
         "ETH"),
     "gnosis": Chain(
         'gnosis',
         100,
-        "https://gnosis.drpc.org",
+        ["https://gnosis.drpc.org", "https://gnosis-rpc.publicnode.com"],
         "XDAI")
 }
\ No newline at end of file
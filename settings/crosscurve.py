@@ -32,3 +32,47 @@ SWAP_PER_DAY = random.randint(5,10) # or swap_per_day= 10
 SWAP_TIME_SLEEP = random.randint(60, 300) # in seconds
 
 SLIPPAGE = 0.1 # 0.1%
+
+CROSSCURVE_API_URL = "https://api.crosscurve.fi" # base URL of the routing API
+
+API_CONCURRENCY = 8 # max simultaneous requests to CrossCurve API
+
+RPC_CONCURRENCY = 4 # max simultaneous RPC requests per chain
+
+SCAN_WORKERS = 16 # threads used to check pairs in get_all_routes
+
+WATCH_HOT_PAIRS = 20 # pairs closest to profit re-quoted every watcher cycle
+
+WATCH_COLD_PAIRS = 40 # other pairs re-quoted per watcher cycle, in rotation
+
+MAX_CYCLE_HOPS = 4 # longest arbitrage loop searched in the quote graph
+
+CYCLE_TOP_EDGES = 8 # best-rate quotes kept per token before the loop search; None — keep all
+
+SIZE_SEARCH_MIN = 100 # smallest trade size ($) tried by the size optimizer
+
+SIZE_SEARCH_MAX = 100000 # largest trade size ($) tried by the size optimizer
+
+SIZE_SEARCH_BUDGET = 12 # max quote calls spent on one pair
+
+SIZE_SEARCH_GRID = 5 # coarse log-spaced probes before the golden-section refinement
+
+SIZE_SEARCH_PAIRS = 10 # how many of the most profitable pairs are optimized
+
+QUOTES_PER_MINUTE = 120 # quote budget of the watcher; None — fixed hot/cold rotation instead of the scheduler
+
+QUOTE_MIN_BATCH = 10 # watcher waits until at least this many quotes of budget are available
+
+QUOTE_EXPLORE_SHARE = 0.2 # share of every batch spent on the longest-unquoted pairs
+
+QUOTE_STATS_ALPHA = 0.3 # weight of the newest quote in per-pair profit/spread statistics
+
+QUOTE_UCB_BONUS = 0.001 # exploration bonus (relative profit) of rarely quoted pairs
+
+QUOTE_FAILURE_BACKOFF = 60 # seconds a pair rests after a failed quote; doubles with every failure in a row
+
+QUOTE_FAILURE_BACKOFF_MAX = 1800 # upper bound of the failed pair backoff
+
+TOP_ROUTES = 10 # most profitable routes kept while a scan streams in
+
+ROUTES_NDJSON_PATH = None # e.g. "routes.ndjson" or "-" for stdout: append every found route as a JSON line
@@ -0,0 +1,9 @@
+ENDPOINT_EWMA_ALPHA = 0.3 # weight of the newest sample in rolling latency/error scores
+
+ENDPOINT_ERROR_PENALTY = 4 # score multiplier per unit of error rate
+
+ENDPOINT_MAX_FAILURES = 3 # consecutive failures before an endpoint is benched
+
+ENDPOINT_COOLDOWN = 30 # seconds a benched endpoint is skipped
+
+HEDGE_AFTER = None # seconds; duplicate slow read calls to the next endpoint (None = off)
@@ -0,0 +1,11 @@
+FEE_TTL = 12 # seconds a chain's fee estimate is reused (about one block on Ethereum)
+
+FEE_HISTORY_BLOCKS = 10 # blocks of eth_feeHistory used for priority fee percentiles
+
+FEE_URGENCY = "normal" # default urgency level for new transactions
+
+FEE_PRIORITY_PERCENTILES = {"slow": 10, "normal": 50, "fast": 90} # priority fee percentile of recent blocks per urgency
+
+FEE_LEGACY_MULTIPLIERS = {"slow": 1.0, "normal": 1.0, "fast": 1.2} # eth_gasPrice multiplier on chains without EIP-1559
+
+FEE_BASE_MULTIPLIER = 2 # maxFeePerGas = base fee * N + tip, survives N-fold base fee growth before inclusion
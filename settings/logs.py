@@ -0,0 +1,7 @@
+LOG_LEVEL = "INFO" # root logger level once setup_logging() runs
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s" # console and file record format
+
+LOG_FILE_PATH = "swap_routes.log" # None disables the file handler
+
+LOG_FILE_MODE = "w" # "w" truncates the log on the first setup in a process, "a" appends
@@ -0,0 +1,7 @@
+METRICS_ENABLED = False # record call counts, errors and latency histograms of RPC and API calls
+
+METRICS_PROMETHEUS_PATH = "cache/metrics.prom" # Prometheus text exposition file (node_exporter textfile format)
+
+METRICS_JSON_PATH = "cache/metrics.json" # JSON snapshot of the same metrics
+
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10) # latency histogram bounds, seconds
@@ -0,0 +1,15 @@
+RATE_LIMIT_INITIAL = 10 # requests per second per host at start
+
+RATE_LIMIT_MIN = 0.5 # the rate never drops below this after 429s
+
+RATE_LIMIT_MAX = 50 # the rate never grows above this
+
+RATE_LIMIT_BURST = 10 # requests that can go out at once after an idle period
+
+RATE_LIMIT_STEP = 0.5 # rate increase (req/s) per second of successful requests
+
+REQUEST_RETRIES = 5 # attempts for CrossCurve and RPC requests
+
+BACKOFF_BASE = 0.5 # seconds, first backoff delay
+
+BACKOFF_MAX = 30 # seconds, backoff delay cap
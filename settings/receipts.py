@@ -0,0 +1,7 @@
+RECEIPT_POLL_INTERVAL = 2 # seconds between eth_blockNumber checks of a chain with pending transactions
+
+RECEIPT_TIMEOUT = 600 # seconds before a pending transaction is reported as timed out
+
+RECEIPT_BATCH_SIZE = 200 # eth_getTransactionReceipt calls per JSON-RPC batch
+
+RECEIPT_CONFIRMATIONS = 1 # blocks (including the one with the transaction) before it counts as confirmed
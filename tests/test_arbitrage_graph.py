@@ -0,0 +1,23 @@
+from modules.arbitrage_graph import find_arbitrage_cycles
+
+
+def _quote(source: str, target: str, rate: float) -> dict:
+    return {"from_chain": "c", "from_token": source, "to_chain": "c", "to_token": target,
+            "amount_in": 100.0, "amount_out": 100.0 * rate}
+
+
+def _paths(cycles: list) -> list:
+    return [[token for _, token in cycle["path"]] for cycle in cycles]
+
+
+def test_competing_cycles_through_one_token_are_found():
+    quotes = [_quote("A", "B", 1.01), _quote("B", "A", 1.0), _quote("A", "C", 1.02), _quote("C", "A", 0.99),
+              _quote("B", "C", 0.5)]
+    assert _paths(find_arbitrage_cycles(quotes)) == [["A", "B", "A"], ["A", "C", "A"]]
+
+
+def test_hop_limit_and_unprofitable_graph():
+    square = [_quote("A", "B", 1.01), _quote("B", "C", 1.0), _quote("C", "D", 1.0), _quote("D", "A", 1.0)]
+    assert _paths(find_arbitrage_cycles(square, max_hops=4)) == [["A", "B", "C", "D", "A"]]
+    assert find_arbitrage_cycles(square, max_hops=3) == []
+    assert find_arbitrage_cycles([_quote("A", "B", 0.99), _quote("B", "A", 1.0)]) == []
@@ -0,0 +1,76 @@
+import threading
+
+from utils.nonce import NonceManager
+
+CHAIN_ID = 1
+ADDRESS = "0x" + "11" * 20
+
+
+class Node:
+    # Подключение, у которого есть только pending счетчик транзакций
+    def __init__(self, pending: int):
+        self.pending = pending
+        self.calls = 0
+        self.eth = self
+
+    def get_transaction_count(self, address: str, block: str) -> int:
+        self.calls += 1
+        return self.pending
+
+
+def test_failure_does_not_reissue_a_held_nonce():
+    node, manager = Node(5), NonceManager()
+    held, failed = threading.Event(), threading.Event()
+    nonces = {}
+
+    def holder():
+        nonces["holder"] = manager.reserve(node, CHAIN_ID, ADDRESS)
+        held.set()
+        failed.wait()
+        nonces["during"] = manager.reserve(node, CHAIN_ID, ADDRESS)
+        manager.sent(CHAIN_ID, ADDRESS, nonces["holder"])
+
+    def failing():
+        held.wait()
+        manager.fail(node, CHAIN_ID, ADDRESS, nonces["failing"])
+        failed.set()
+
+    nonces["failing"] = manager.reserve(node, CHAIN_ID, ADDRESS)
+    threads = [threading.Thread(target=holder), threading.Thread(target=failing)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert (nonces["failing"], nonces["holder"]) == (5, 6)
+    assert nonces["during"] == 7
+    manager.sent(CHAIN_ID, ADDRESS, nonces["during"])
+    # Все выданные nonce отправлены — отложенный откат заполняет дыру на месте неудачной транзакции
+    assert manager.reserve(node, CHAIN_ID, ADDRESS) == 5
+
+
+def test_last_nonce_is_reused_after_failure():
+    node, manager = Node(3), NonceManager()
+    first = manager.reserve(node, CHAIN_ID, ADDRESS, count=3)
+    manager.sent(CHAIN_ID, ADDRESS, first)
+    manager.fail(node, CHAIN_ID, ADDRESS, first + 1, count=2)
+    assert manager.reserve(node, CHAIN_ID, ADDRESS) == first + 1
+    assert node.calls == 1
+
+
+def test_foreign_nonce_failure_is_ignored():
+    node, manager = Node(0), NonceManager()
+    manager.reserve(node, CHAIN_ID, ADDRESS)
+    manager.fail(node, CHAIN_ID, ADDRESS, 42)
+    assert node.calls == 1
+    assert manager.reserve(node, CHAIN_ID, ADDRESS) == 1
+
+
+def test_gap_check_ignores_unsent_reservations():
+    node, manager = Node(0), NonceManager()
+    nonce = manager.reserve(node, CHAIN_ID, ADDRESS, count=2)
+    assert not manager.detect_gap(node, CHAIN_ID, ADDRESS)
+    manager.sent(CHAIN_ID, ADDRESS, nonce)
+    manager.sent(CHAIN_ID, ADDRESS, nonce + 1)
+    assert manager.detect_gap(node, CHAIN_ID, ADDRESS)
+    assert manager.reserve(node, CHAIN_ID, ADDRESS) == 0
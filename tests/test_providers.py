@@ -0,0 +1,35 @@
+import pytest
+import requests
+from web3 import Web3
+
+from utils.providers import EndpointPool, SessionHTTPProvider
+
+DEAD = ["http://127.0.0.1:9", "http://127.0.0.1:10", "http://127.0.0.1:11"]
+
+
+def _count_attempts(provider: SessionHTTPProvider) -> list:
+    attempts = []
+    post_timed = provider._post_timed
+
+    def counted(url, data):
+        attempts.append(url)
+        return post_timed(url, data)
+
+    provider._post_timed = counted
+    return attempts
+
+
+def test_read_tries_every_dead_endpoint_once():
+    provider = SessionHTTPProvider(EndpointPool(DEAD), requests.Session(), 1, hedge_after=None)
+    attempts = _count_attempts(provider)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        Web3(provider).eth.block_number
+    assert sorted(attempts) == sorted(DEAD)
+
+
+def test_hedged_read_makes_two_attempts():
+    provider = SessionHTTPProvider(EndpointPool(DEAD), requests.Session(), 1, hedge_after=0.5)
+    attempts = _count_attempts(provider)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        Web3(provider).eth.block_number
+    assert len(attempts) == 2
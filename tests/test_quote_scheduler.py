@@ -0,0 +1,56 @@
+from modules.quote_scheduler import QuoteScheduler
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _route(profit: float) -> dict:
+    return {"amount_in": 100.0, "amount_out": 100.0 + profit, "profit": profit}
+
+
+def test_failing_pairs_do_not_take_the_budget():
+    clock = Clock()
+    pairs = list(range(100))
+    failing = set(range(20))
+    scheduler = QuoteScheduler(pairs, lambda pair: pair, quotes_per_minute=120, clock=clock)
+    picked = {pair: 0 for pair in pairs}
+    for _ in range(50):
+        for pair in scheduler.next_batch():
+            picked[pair] += 1
+            scheduler.record(pair, None if pair in failing else _route(pair / 1000))
+        clock.now += scheduler.wait_time(10)
+
+    failed_quotes = sum(picked[pair] for pair in failing)
+    good_quotes = sum(count for pair, count in picked.items() if pair not in failing)
+    assert all(picked[pair] >= 1 for pair in pairs)
+    assert failed_quotes < good_quotes / 4
+
+
+def test_pair_is_not_requoted_within_ttl():
+    clock = Clock()
+    pairs = list(range(30))
+    scheduler = QuoteScheduler(pairs, lambda pair: pair, quotes_per_minute=120, ttl=30, clock=clock)
+    last = {}
+    for _ in range(200):
+        for pair in scheduler.next_batch():
+            assert pair not in last or clock.now - last[pair] >= 30
+            last[pair] = clock.now
+            scheduler.record(pair, _route(pair / 1000))
+        clock.now += max(scheduler.wait_time(10), 0.5)
+    assert scheduler.total_quotes > len(pairs)
+
+
+def test_waits_for_paused_pairs():
+    clock = Clock()
+    scheduler = QuoteScheduler([1, 2], lambda pair: pair, quotes_per_minute=120, ttl=30, backoff=60, clock=clock)
+    for pair in scheduler.next_batch():
+        scheduler.record(pair, None)
+    assert scheduler.next_batch() == []
+    assert scheduler.wait_time(10) == 60
+    clock.now = 60
+    assert sorted(scheduler.next_batch()) == [1, 2]
@@ -0,0 +1,53 @@
+import threading
+from contextlib import nullcontext
+
+from settings.chains import Chain
+
+
+class ConcurrencyLimits:
+    def __init__(self, api_concurrency: int, rpc_concurrency: int):
+        """
+        Набор ограничителей параллельности для сканирования: общий для CrossCurve API
+        и отдельный для RPC каждой сети.
+
+        :param api_concurrency: Максимум одновременных запросов к CrossCurve API.
+        :param rpc_concurrency: Максимум одновременных RPC запросов к одной сети.
+        """
+        self.api_concurrency = api_concurrency
+        self.rpc_concurrency = rpc_concurrency
+        self.api = threading.BoundedSemaphore(api_concurrency)
+        self._rpc = {}
+        self._lock = threading.Lock()
+
+    def rpc(self, chain: Chain) -> threading.BoundedSemaphore:
+        """
+        Возвращает семафор RPC для указанной сети, создавая его при первом обращении.
+
+        :param chain: обьект класса Chain
+        :return: Семафор, ограничивающий параллельные RPC запросы к сети.
+        """
+        with self._lock:
+            semaphore = self._rpc.get(chain.id)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.rpc_concurrency)
+                self._rpc[chain.id] = semaphore
+            return semaphore
+
+
+def api_slot(limits: ConcurrencyLimits = None):
+    """
+    Контекст для одного запроса к CrossCurve API. Без ограничителей ничего не делает.
+
+    :param limits: Ограничители параллельности или None.
+    """
+    return limits.api if limits is not None else nullcontext()
+
+
+def rpc_slot(chain: Chain, limits: ConcurrencyLimits = None):
+    """
+    Контекст для одного RPC запроса к сети. Без ограничителей ничего не делает.
+
+    :param chain: обьект класса Chain
+    :param limits: Ограничители параллельности или None.
+    """
+    return limits.rpc(chain) if limits is not None else nullcontext()
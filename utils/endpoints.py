@@ -0,0 +1,98 @@
+import threading
+import time
+
+from settings.endpoints import (ENDPOINT_COOLDOWN, ENDPOINT_ERROR_PENALTY, ENDPOINT_EWMA_ALPHA,
+                                ENDPOINT_MAX_FAILURES)
+
+
+class EndpointPool:
+    def __init__(self, urls: list, alpha: float = ENDPOINT_EWMA_ALPHA, error_penalty: float = ENDPOINT_ERROR_PENALTY,
+                 max_failures: int = ENDPOINT_MAX_FAILURES, cooldown: float = ENDPOINT_COOLDOWN):
+        """
+        Пул RPC адресов одной сети со скользящей оценкой задержки и доли ошибок каждого адреса.
+
+        :param urls: Список URL RPC.
+        :param alpha: Вес нового замера в скользящем среднем.
+        :param error_penalty: Во сколько раз доля ошибок увеличивает оценку адреса.
+        :param max_failures: Сколько ошибок подряд выводят адрес из ротации.
+        :param cooldown: На сколько секунд адрес выводится из ротации.
+        """
+        if not urls:
+            raise ValueError("Endpoint pool needs at least one URL")
+        self.urls = list(urls)
+        self.alpha = alpha
+        self.error_penalty = error_penalty
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self._stats = {url: {"latency": None, "error_rate": 0.0, "calls": 0, "errors": 0,
+                             "consecutive_errors": 0, "down_until": 0.0} for url in self.urls}
+        self._lock = threading.Lock()
+
+    def _score(self, stats: dict) -> float:
+        # Адреса без замеров получают нулевую оценку, чтобы их попробовали первыми
+        latency = stats["latency"] if stats["latency"] is not None else 0.0
+        return latency * (1 + self.error_penalty * stats["error_rate"])
+
+    def ranked(self) -> list:
+        """
+        Возвращает адреса от лучшего к худшему: сначала работающие по оценке, затем выведенные из ротации.
+
+        :return: Список URL.
+        """
+        now = time.monotonic()
+        with self._lock:
+            healthy = [url for url in self.urls if self._stats[url]["down_until"] <= now]
+            benched = [url for url in self.urls if self._stats[url]["down_until"] > now]
+            healthy.sort(key=lambda url: self._score(self._stats[url]))
+            benched.sort(key=lambda url: self._stats[url]["down_until"])
+        return healthy + benched
+
+    def best(self) -> str:
+        """
+        Возвращает самый быстрый работающий адрес.
+
+        :return: URL RPC.
+        """
+        return self.ranked()[0]
+
+    def record_success(self, url: str, latency: float) -> None:
+        """
+        Учитывает успешный запрос.
+
+        :param url: URL RPC.
+        :param latency: Время запроса в секундах.
+        """
+        with self._lock:
+            stats = self._stats[url]
+            stats["calls"] += 1
+            stats["consecutive_errors"] = 0
+            stats["latency"] = latency if stats["latency"] is None else \
+                self.alpha * latency + (1 - self.alpha) * stats["latency"]
+            stats["error_rate"] *= 1 - self.alpha
+
+    def record_failure(self, url: str) -> None:
+        """
+        Учитывает неудачный запрос. После max_failures ошибок подряд адрес выводится из ротации на cooldown.
+
+        :param url: URL RPC.
+        """
+        with self._lock:
+            stats = self._stats[url]
+            stats["calls"] += 1
+            stats["errors"] += 1
+            stats["consecutive_errors"] += 1
+            stats["error_rate"] = self.alpha + (1 - self.alpha) * stats["error_rate"]
+            if stats["consecutive_errors"] >= self.max_failures:
+                stats["down_until"] = time.monotonic() + self.cooldown
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику выбора адресов.
+
+        :return: Словарь URL -> {"latency", "error_rate", "calls", "errors", "healthy"}.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {url: {"latency": stats["latency"], "error_rate": stats["error_rate"], "calls": stats["calls"],
+                          "errors": stats["errors"], "healthy": stats["down_until"] <= now}
+                    for url, stats in self._stats.items()}
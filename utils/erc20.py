@@ -0,0 +1,81 @@
+from functools import lru_cache
+
+from web3 import Web3
+
+# Селекторы вычисляются один раз при импорте вместо разбора ABI на каждый вызов
+DECIMALS_SELECTOR = bytes(Web3.keccak(text="decimals()")[:4])
+BALANCE_OF_SELECTOR = bytes(Web3.keccak(text="balanceOf(address)")[:4])
+ALLOWANCE_SELECTOR = bytes(Web3.keccak(text="allowance(address,address)")[:4])
+APPROVE_SELECTOR = bytes(Web3.keccak(text="approve(address,uint256)")[:4])
+TRANSFER_SELECTOR = bytes(Web3.keccak(text="transfer(address,uint256)")[:4])
+
+DECIMALS_CALL = "0x" + DECIMALS_SELECTOR.hex()
+
+
+@lru_cache(maxsize=65536)
+def checksum(address: str) -> str:
+    """
+    Web3.to_checksum_address с кешем: keccak адреса считается один раз на процесс.
+
+    :param address: Адрес в любом регистре.
+    :return: Адрес в формате EIP-55.
+    """
+    return Web3.to_checksum_address(address)
+
+
+@lru_cache(maxsize=65536)
+def _address_word(address: str) -> bytes:
+    hex_address = address[2:] if address.startswith(("0x", "0X")) else address
+    if len(hex_address) != 40:
+        raise ValueError(f"Invalid address {address}")
+    return bytes(12) + bytes.fromhex(hex_address)
+
+
+def _uint_word(value: int) -> bytes:
+    if value < 0:
+        raise ValueError(f"uint256 can't be negative: {value}")
+    return value.to_bytes(32, "big")
+
+
+def encode_balance_of(owner: str) -> str:
+    return "0x" + (BALANCE_OF_SELECTOR + _address_word(owner)).hex()
+
+
+def encode_allowance(owner: str, spender: str) -> str:
+    return "0x" + (ALLOWANCE_SELECTOR + _address_word(owner) + _address_word(spender)).hex()
+
+
+def encode_approve(spender: str, amount: int) -> str:
+    return "0x" + (APPROVE_SELECTOR + _address_word(spender) + _uint_word(amount)).hex()
+
+
+def encode_transfer(to: str, amount: int) -> str:
+    return "0x" + (TRANSFER_SELECTOR + _address_word(to) + _uint_word(amount)).hex()
+
+
+def decode_uint(data) -> int:
+    """
+    Декодирует первое uint256 слово ответа eth_call.
+
+    :param data: bytes или hex строка.
+    :return: Число.
+    :raises ValueError: Если ответ короче 32 байт (например, у адреса нет кода).
+    """
+    if isinstance(data, str):
+        data = bytes.fromhex(data[2:] if data.startswith("0x") else data)
+    if len(data) < 32:
+        raise ValueError(f"Expected a 32-byte word, got {len(data)} bytes")
+    return int.from_bytes(data[:32], "big")
+
+
+def call_uint(connection: Web3, token_address: str, data: str, block="latest") -> int:
+    """
+    Выполняет eth_call с готовыми данными и декодирует uint256 результат.
+
+    :param connection: Подключение Web3.
+    :param token_address: Адрес контракта.
+    :param data: calldata из encode_* или DECIMALS_CALL.
+    :param block: Блок.
+    :return: Число.
+    """
+    return decode_uint(connection.eth.call({"to": checksum(token_address), "data": data}, block))
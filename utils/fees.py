@@ -0,0 +1,118 @@
+import logging
+import statistics
+import threading
+import time
+
+from web3 import Web3
+
+from settings.fees import (FEE_BASE_MULTIPLIER, FEE_HISTORY_BLOCKS, FEE_LEGACY_MULTIPLIERS, FEE_PRIORITY_PERCENTILES,
+                           FEE_TTL, FEE_URGENCY)
+from utils.providers import batch_request
+
+logger = logging.getLogger(__name__)
+
+
+def _to_int(value) -> int:
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+class FeeOracle:
+    def __init__(self, ttl: float = FEE_TTL, blocks: int = FEE_HISTORY_BLOCKS,
+                 percentiles: dict = FEE_PRIORITY_PERCENTILES, legacy_multipliers: dict = FEE_LEGACY_MULTIPLIERS,
+                 base_multiplier: float = FEE_BASE_MULTIPLIER):
+        """
+        Общая на процесс оценка комиссий по сетям. Раз в ttl секунд одним batch запросом получает
+        eth_feeHistory, последний блок и eth_gasPrice, а между обновлениями отдает комиссии из памяти
+        всем клиентам сети. В сетях без EIP-1559 (в блоке нет baseFeePerGas) отдает legacy gasPrice.
+
+        :param ttl: Сколько секунд оценка считается актуальной.
+        :param blocks: Сколько последних блоков брать из eth_feeHistory.
+        :param percentiles: Уровень срочности -> перцентиль priority fee в последних блоках.
+        :param legacy_multipliers: Уровень срочности -> множитель eth_gasPrice для legacy сетей.
+        :param base_multiplier: maxFeePerGas = base fee * base_multiplier + priority fee.
+        """
+        self.ttl = ttl
+        self.blocks = blocks
+        self.percentiles = percentiles
+        self.legacy_multipliers = legacy_multipliers
+        self.base_multiplier = base_multiplier
+        self.refreshes = 0
+        self._estimates = {}  # chain id -> оценка из _refresh
+        self._locks = {}  # chain id -> Lock, чтобы сеть обновлял только один поток
+        self._lock = threading.Lock()
+
+    def _chain_lock(self, chain_id: int) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(chain_id, threading.Lock())
+
+    def _refresh(self, connection: Web3, chain_id: int) -> dict:
+        levels = list(self.percentiles)
+        try:
+            history, block, gas_price = batch_request(connection, [
+                ("eth_feeHistory", [hex(self.blocks), "latest", [self.percentiles[level] for level in levels]]),
+                ("eth_getBlockByNumber", ["latest", False]),
+                ("eth_gasPrice", [])
+            ])
+        except ValueError as e:
+            # Нода не знает eth_feeHistory — считаем сеть legacy
+            logger.info(f"Chain {chain_id}: fee history unavailable ({e}), using eth_gasPrice")
+            return {"updated": time.monotonic(), "block": None, "base_fee": None,
+                    "gas_price": _to_int(connection.eth.gas_price), "tips": {}}
+        gas_price = _to_int(gas_price)
+        base_fee = block.get("baseFeePerGas")
+        estimate = {"updated": time.monotonic(), "block": _to_int(block["number"]), "gas_price": gas_price,
+                    "base_fee": None, "tips": {}}
+        if base_fee is None:
+            return estimate
+        # Последний элемент baseFeePerGas — базовая комиссия следующего блока
+        next_base_fees = history.get("baseFeePerGas") or [base_fee]
+        estimate["base_fee"] = _to_int(next_base_fees[-1])
+        rewards = [row for row in history.get("reward") or [] if row]
+        fallback_tip = max(gas_price - estimate["base_fee"], 0)  # eth_gasPrice у geth — base fee + рекомендуемый tip
+        for index, level in enumerate(levels):
+            values = [_to_int(row[index]) for row in rewards if len(row) > index]
+            estimate["tips"][level] = int(statistics.median(values)) if values else fallback_tip
+        return estimate
+
+    def _estimate(self, connection: Web3, chain_id: int) -> dict:
+        estimate = self._estimates.get(chain_id)
+        if estimate is not None and time.monotonic() - estimate["updated"] < self.ttl:
+            return estimate
+        with self._chain_lock(chain_id):
+            estimate = self._estimates.get(chain_id)  # пока ждали блокировку, оценку мог обновить другой поток
+            if estimate is None or time.monotonic() - estimate["updated"] >= self.ttl:
+                estimate = self._refresh(connection, chain_id)
+                self._estimates[chain_id] = estimate
+                self.refreshes += 1
+            return estimate
+
+    def fees(self, connection: Web3, chain_id: int, urgency: str = FEE_URGENCY) -> dict:
+        """
+        Возвращает поля комиссии для транзакции.
+
+        :param connection: Подключение Web3 к сети.
+        :param chain_id: ID сети.
+        :param urgency: Уровень срочности (ключ FEE_PRIORITY_PERCENTILES).
+        :return: {"maxFeePerGas", "maxPriorityFeePerGas"} для EIP-1559 сетей или {"gasPrice"} для legacy.
+        :raises ValueError: Если уровень срочности неизвестен.
+        """
+        if urgency not in self.percentiles:
+            raise ValueError(f"Unknown urgency level {urgency!r}, expected one of {list(self.percentiles)}")
+        estimate = self._estimate(connection, chain_id)
+        if estimate["base_fee"] is None:
+            return {"gasPrice": int(estimate["gas_price"] * self.legacy_multipliers.get(urgency, 1))}
+        tip = estimate["tips"][urgency]
+        return {"maxFeePerGas": int(estimate["base_fee"] * self.base_multiplier) + tip, "maxPriorityFeePerGas": tip}
+
+    def invalidate(self, chain_id: int = None):
+        """
+        Сбрасывает оценку сети (например, после ошибки "underpriced"). None — все сети.
+        """
+        with self._lock:
+            if chain_id is None:
+                self._estimates.clear()
+            else:
+                self._estimates.pop(chain_id, None)
+
+
+fee_oracle = FeeOracle()
@@ -0,0 +1,112 @@
+import hashlib
+import hmac
+
+from eth_account.hdaccount import seed_from_mnemonic
+from eth_keys import keys
+
+ETHEREUM_BASE_PATH = "m/44'/60'/0'/0"  # к нему добавляется индекс аккаунта
+
+SECP256K1_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+HARDENED_OFFSET = 0x80000000
+
+
+def parse_path(path: str) -> tuple:
+    """
+    Разбирает путь BIP32 вида m/44'/60'/0'/0/0 (допускается суффикс ' или H).
+
+    :param path: Путь деривации.
+    :return: Кортеж индексов узлов (для усиленных узлов с добавленным 2**31).
+    :raises ValueError: Если путь некорректен.
+    """
+    parts = path.strip().split("/")
+    if parts[0] not in ("m", "M"):
+        raise ValueError(f'Path is not valid: "{path}". Must start with "m"')
+    nodes = []
+    for part in parts[1:]:
+        hardened = part[-1:] in ("'", "H", "h")
+        index = int(part[:-1] if hardened else part)
+        if not 0 <= index < HARDENED_OFFSET:
+            raise ValueError(f'Path "{path}" has invalid node "{part}"')
+        nodes.append(index + HARDENED_OFFSET if hardened else index)
+    return tuple(nodes)
+
+
+class HDWallet:
+    def __init__(self, mnemonic: str, passphrase: str = ""):
+        """
+        HD кошелек одной мнемонической фразы. Дорогой PBKDF2 (2048 раундов) выполняется один раз,
+        промежуточные узлы BIP32 кешируются, поэтому каждый следующий дочерний ключ стоит
+        одного HMAC-SHA512.
+
+        :param mnemonic: Мнемоническая фраза.
+        :param passphrase: Необязательная парольная фраза BIP39.
+        """
+        seed = seed_from_mnemonic(mnemonic, passphrase)
+        master = hmac.new(b"Bitcoin seed", seed, hashlib.sha512).digest()
+        self._nodes = {(): [master[:32], master[32:], None]}  # путь -> [ключ, chain code, сжатый публичный ключ]
+
+    def _node(self, path: tuple) -> list:
+        node = self._nodes.get(path)
+        if node is None:
+            node = self._child(self._node(path[:-1]), path[-1])
+            self._nodes[path] = node
+        return node
+
+    @staticmethod
+    def _child(parent: list, index: int) -> list:
+        key, chain_code = parent[0], parent[1]
+        while True:
+            if index >= HARDENED_OFFSET:
+                data = b"\x00" + key + index.to_bytes(4, "big")
+            else:
+                if parent[2] is None:  # Публичный ключ родителя считается один раз на всех детей
+                    parent[2] = keys.PrivateKey(key).public_key.to_compressed_bytes()
+                data = parent[2] + index.to_bytes(4, "big")
+            child = hmac.new(chain_code, data, hashlib.sha512).digest()
+            tweak = int.from_bytes(child[:32], "big")
+            child_key = (tweak + int.from_bytes(key, "big")) % SECP256K1_N
+            if tweak < SECP256K1_N and child_key != 0:
+                return [child_key.to_bytes(32, "big"), child[32:], None]
+            index += 1  # Недопустимый ключ (вероятность < 2**-127), берем следующий индекс как в BIP32
+
+    def derive(self, path: str) -> bytes:
+        """
+        Выводит приватный ключ по пути. Родительские узлы пути сохраняются в кеше.
+
+        :param path: Путь деривации, например m/44'/60'/0'/0/5.
+        :return: Приватный ключ (32 байта).
+        """
+        nodes = parse_path(path)
+        if not nodes:
+            return self._nodes[()][0]
+        return self._child(self._node(nodes[:-1]), nodes[-1])[0]
+
+    def derive_range(self, count: int, start: int = 0, base_path: str = ETHEREUM_BASE_PATH) -> list:
+        """
+        Выводит приватные ключи base_path/start .. base_path/(start + count - 1).
+
+        :param count: Количество ключей.
+        :param start: Первый индекс.
+        :param base_path: Родительский путь.
+        :return: Список приватных ключей (32 байта).
+        """
+        parent = self._node(parse_path(base_path))
+        return [self._child(parent, index)[0] for index in range(start, start + count)]
+
+
+def derive_private_keys(memo: str, count: int = 1, base_path: str = ETHEREUM_BASE_PATH, start: int = 0) -> list:
+    """
+    Выводит count приватных ключей из одной мнемонической фразы. Функция верхнего уровня,
+    чтобы ее можно было выполнять в пуле процессов.
+
+    :param memo: Мнемоническая фраза.
+    :param count: Количество ключей.
+    :param base_path: Родительский путь, к нему добавляются индексы.
+    :param start: Первый индекс.
+    :return: Список приватных ключей в hex с префиксом 0x или пустой список, если фраза некорректна.
+    """
+    try:
+        wallet = HDWallet(memo)
+    except Exception:
+        return []
+    return ["0x" + key.hex() for key in wallet.derive_range(count, start, base_path)]
@@ -0,0 +1,28 @@
+import logging
+import threading
+
+from settings.logs import LOG_FILE_MODE, LOG_FILE_PATH, LOG_FORMAT, LOG_LEVEL
+
+_lock = threading.Lock()
+_configured = False
+
+
+def setup_logging(level: str = LOG_LEVEL, path: str = LOG_FILE_PATH, mode: str = LOG_FILE_MODE) -> None:
+    """
+    Настраивает корневой логгер: вывод в консоль и в файл. Вызывается точками входа
+    (пунктами меню, раннером), а не при импорте модулей, поэтому файл лога открывается
+    только когда он действительно нужен. Повторные вызовы ничего не делают.
+
+    :param level: Уровень логирования.
+    :param path: Путь к файлу лога. None — только консоль.
+    :param mode: Режим открытия файла лога ("w" или "a").
+    """
+    global _configured
+    with _lock:
+        if _configured:
+            return
+        handlers = [logging.StreamHandler()]  # Вывод в консоль
+        if path:
+            handlers.append(logging.FileHandler(path, mode=mode))  # Вывод в файл
+        logging.basicConfig(level=level, format=LOG_FORMAT, handlers=handlers)
+        _configured = True
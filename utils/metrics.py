@@ -0,0 +1,173 @@
+import atexit
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from urllib.parse import urlparse
+
+from settings.metrics import METRICS_BUCKETS, METRICS_ENABLED, METRICS_JSON_PATH, METRICS_PROMETHEUS_PATH
+
+_DISABLED_TIMER = nullcontext()
+
+
+def endpoint_label(url: str) -> str:
+    return urlparse(url).netloc or url
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics, name: str, labels: dict):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        if exc_type is not None:
+            self.metrics.inc(f"{self.name.removesuffix('_seconds')}_errors_total", **self.labels)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled: bool = METRICS_ENABLED, buckets: tuple = METRICS_BUCKETS):
+        """
+        Счетчики и гистограммы задержек с метками. Пока сбор выключен, все методы записи
+        возвращаются сразу после проверки флага.
+
+        :param enabled: Включен ли сбор.
+        :param buckets: Верхние границы корзин гистограмм в секундах.
+        """
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._counters = {}  # (имя, метки) -> значение
+        self._histograms = {}  # (имя, метки) -> [счетчики корзин..., сумма, количество]
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            histogram[bisect.bisect_left(self.buckets, seconds)] += 1  # последняя корзина — +Inf
+            histogram[-2] += seconds
+            histogram[-1] += 1
+
+    def timer(self, name: str, **labels):
+        """
+        Контекстный менеджер, записывающий длительность блока в гистограмму name,
+        а исключение — в счетчик <name без _seconds>_errors_total.
+        """
+        if not self.enabled:
+            return _DISABLED_TIMER
+        return _Timer(self, name, labels)
+
+    def timed(self, name: str, **labels):
+        """
+        Декоратор: длительность вызова функции пишется в гистограмму name с меткой method.
+        """
+        def decorator(func):
+            method_labels = dict(labels, method=func.__name__)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Timer(self, name, method_labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> dict:
+        """
+        :return: Словарь {"counters": [...], "histograms": [...]}; у гистограмм накопительные корзины,
+            как в Prometheus.
+        """
+        with self._lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            histograms = []
+            for (name, labels), values in sorted(self._histograms.items()):
+                cumulative, total = {}, 0
+                for bound, count in zip(self.buckets + ("+Inf",), values):
+                    total += count
+                    cumulative[str(bound)] = total
+                histograms.append({"name": name, "labels": dict(labels), "buckets": cumulative,
+                                   "sum": values[-2], "count": values[-1]})
+        return {"time": time.time(), "counters": counters, "histograms": histograms}
+
+    def to_prometheus(self) -> str:
+        """
+        :return: Метрики в текстовом формате Prometheus.
+        """
+        def format_labels(labels: dict, **extra) -> str:
+            pairs = list(labels.items()) + list(extra.items())
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+        snapshot = self.snapshot()
+        lines, typed = [], set()
+        for counter in snapshot["counters"]:
+            if counter["name"] not in typed:
+                typed.add(counter["name"])
+                lines.append(f"# TYPE {counter['name']} counter")
+            lines.append(f"{counter['name']}{format_labels(counter['labels'])} {counter['value']}")
+        for histogram in snapshot["histograms"]:
+            name = histogram["name"]
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            for bound, count in histogram["buckets"].items():
+                lines.append(f"{name}_bucket{format_labels(histogram['labels'], le=bound)} {count}")
+            lines.append(f"{name}_sum{format_labels(histogram['labels'])} {histogram['sum']}")
+            lines.append(f"{name}_count{format_labels(histogram['labels'])} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, prometheus_path: str = METRICS_PROMETHEUS_PATH, json_path: str = METRICS_JSON_PATH):
+        """
+        Сохраняет метрики в файл Prometheus и JSON снимок. Ничего не делает, если сбор выключен.
+        """
+        if not self.enabled:
+            return
+        for path, content in ((prometheus_path, self.to_prometheus()),
+                              (json_path, json.dumps(self.snapshot(), indent=1))):
+            if not path:
+                continue
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"  # атомарная замена, чтобы сборщик не прочитал половину файла
+            with open(tmp_path, "w") as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+
+
+metrics = Metrics()
+atexit.register(metrics.write)
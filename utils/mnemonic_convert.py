@@ -1,21 +1,118 @@
+import hashlib
 import os
-from eth_account import Account
-from utils.other import read_file
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
 
+from settings.accounts import IMPORT_BATCH_SIZE, IMPORT_WORKERS, PK_INDEX_PATH
+from utils.hd_wallet import ETHEREUM_BASE_PATH, derive_private_keys
 
-def mnemonic_to_private_key(mnemonics: list) -> list:
+
+def derive_private_key(memo: str):
+    """
+    Преобразует одну мнемоническую фразу в приватный ключ (путь m/44'/60'/0'/0/0). Функция верхнего уровня,
+    чтобы ее можно было выполнять в пуле процессов.
+
+    :param memo: Мнемоническая фраза.
+    :return: Приватный ключ в hex или None, если фраза некорректна.
+    """
+    private_keys = derive_private_keys(memo)
+    return private_keys[0] if private_keys else None
+
+
+def mnemonic_to_private_key(mnemonics: list, workers: int = IMPORT_WORKERS) -> list:
     """
-    Преобразует список мнемонических фраз в список приватных ключей.
+    Преобразует список мнемонических фраз в список приватных ключей, распределяя работу по процессам.
 
     :param mnemonics: Список мнемонических фраз.
+    :param workers: Количество процессов. None — по числу ядер.
     :return: Список приватных ключей, соответствующих каждой мнемонической фразе.
     """
-    Account.enable_unaudited_hdwallet_features()  # Включаем поддержку неаудированных функций
-    private_key_list = []
-    for memo in mnemonics:
-        account = Account.from_mnemonic(memo)  # Создаем аккаунт на основе мнемонической фразы
-        private_key_list.append(account._private_key.hex())  # Получаем приватный ключ и добавляем в список
-    return private_key_list
+    if len(mnemonics) < 2:
+        return [derive_private_key(memo) for memo in mnemonics]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(derive_private_key, mnemonics, chunksize=max(1, len(mnemonics) // 64)))
+
+
+def iter_file_lines(path: str):
+    """
+    Построчно читает файл, не загружая его в память целиком. Пустые строки пропускаются.
+
+    :param path: Путь к файлу.
+    :return: Генератор строк без переводов строки.
+    :raises FileNotFoundError: Если файл не найден.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"The file '{path}' does not exist.")
+    with open(path, "r") as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                yield line
+
+
+class PrivateKeyIndex:
+    def __init__(self, pk_path: str, index_path: str = PK_INDEX_PATH):
+        """
+        Компактный индекс ключей из pk.txt на диске (SQLite, 16-байтовые хеши ключей).
+        Если pk.txt изменили в обход индекса, индекс перестраивается потоковым чтением файла.
+
+        :param pk_path: Путь к pk.txt.
+        :param index_path: Путь к файлу индекса.
+        """
+        self.pk_path = pk_path
+        directory = os.path.dirname(index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(index_path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS keys (hash BLOB PRIMARY KEY) WITHOUT ROWID")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        if self._stored_size() != self._file_size():
+            self._rebuild()
+
+    @staticmethod
+    def digest(private_key: str) -> bytes:
+        private_key = private_key.strip().lower()
+        if private_key.startswith("0x"):
+            private_key = private_key[2:]
+        return hashlib.blake2b(private_key.encode(), digest_size=16).digest()
+
+    def _file_size(self) -> int:
+        return os.path.getsize(self.pk_path) if os.path.exists(self.pk_path) else 0
+
+    def _stored_size(self):
+        row = self.db.execute("SELECT value FROM meta WHERE name = 'pk_size'").fetchone()
+        return int(row[0]) if row else None
+
+    def _rebuild(self) -> None:
+        self.db.execute("DELETE FROM keys")
+        if os.path.exists(self.pk_path):
+            lines = iter_file_lines(self.pk_path)
+            while batch := list(islice(lines, IMPORT_BATCH_SIZE)):
+                self.db.executemany("INSERT OR IGNORE INTO keys (hash) VALUES (?)",
+                                    [(self.digest(pk),) for pk in batch])
+        self.sync()
+
+    def add(self, private_key: str) -> bool:
+        """
+        Добавляет ключ в индекс.
+
+        :param private_key: Приватный ключ.
+        :return: True, если ключа в индексе еще не было.
+        """
+        return self.db.execute("INSERT OR IGNORE INTO keys (hash) VALUES (?)",
+                               (self.digest(private_key),)).rowcount == 1
+
+    def sync(self) -> None:
+        """
+        Фиксирует изменения и запоминает текущий размер pk.txt.
+        """
+        self.db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('pk_size', ?)", (str(self._file_size()),))
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.close()
 
 
 def ensure_newline_at_end_of_file(path: str) -> None:
@@ -24,6 +121,8 @@ def ensure_newline_at_end_of_file(path: str) -> None:
 
     :param path: Путь к файлу, который нужно проверить.
     """
+    if os.path.getsize(path) == 0:
+        return  # В пустом файле нечего проверять
     with open(path, "rb+") as file:
         file.seek(-1, os.SEEK_END)  # Перемещаем указатель в конец файла
         last_char = file.read(1)
@@ -31,22 +130,44 @@ def ensure_newline_at_end_of_file(path: str) -> None:
             file.write(b"\n")  # Если нет, добавляем новую строку
 
 
-def memo_txt_to_pk_txt() -> None:
+def memo_txt_to_pk_txt(memo_path: str = "settings/mnemonic.txt", path: str = "settings/pk.txt",
+                       batch_size: int = IMPORT_BATCH_SIZE, workers: int = IMPORT_WORKERS,
+                       accounts_per_mnemonic: int = 1, base_path: str = ETHEREUM_BASE_PATH) -> None:
     """
     Преобразует все мнемонические фразы из файла в приватные ключи и добавляет их в файл pk.txt,
-    избегая повторений ключей и следя за корректностью окончания файла.
+    избегая повторений ключей и следя за корректностью окончания файла. Фразы читаются потоково
+    и обрабатываются пачками по batch_size в пуле процессов; повторы проверяются по индексу на диске.
 
+    :param memo_path: Путь к файлу с мнемоническими фразами.
+    :param path: Путь к файлу с приватными ключами.
+    :param batch_size: Размер пачки фраз.
+    :param workers: Количество процессов. None — по числу ядер.
+    :param accounts_per_mnemonic: Сколько аккаунтов (base_path/0 .. base_path/N-1) выводить из каждой фразы.
+    :param base_path: Родительский путь деривации.
     :raises FileNotFoundError: Если файл с мнемоническими фразами или файл для записи ключей не найден.
     """
-    memo = read_file("settings/mnemonic.txt")
-    pk_list = mnemonic_to_private_key(memo)
-    path = "settings/pk.txt"
-    existing_pks = set()
+    mnemonics = iter_file_lines(memo_path)
     if os.path.exists(path):
-        existing_pks = set(read_file(path))
         ensure_newline_at_end_of_file(path)
-    with open(path, "a") as file: # Добавление новых приватников
-        for pk in pk_list:
-            if pk not in existing_pks:  # Проверяем на повторение
-                file.write(pk + "\n")
-                existing_pks.add(pk)
+    index = PrivateKeyIndex(path)
+    derive = partial(derive_private_keys, count=accounts_per_mnemonic, base_path=base_path)
+    processed = added = invalid = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while batch := list(islice(mnemonics, batch_size)):
+                chunksize = max(1, len(batch) // ((workers or os.cpu_count() or 1) * 4))
+                new_keys = []
+                for private_keys in executor.map(derive, batch, chunksize=chunksize):
+                    if not private_keys:
+                        invalid += 1
+                    for pk in private_keys:
+                        if index.add(pk):  # Проверяем на повторение
+                            new_keys.append(pk)
+                with open(path, "a") as file:  # Добавление новых приватников
+                    file.writelines(pk + "\n" for pk in new_keys)
+                index.sync()
+                processed += len(batch)
+                added += len(new_keys)
+                print(f"Обработано {processed} сид фраз, добавлено {added} ключей, некорректных {invalid}")
+    finally:
+        index.close()
@@ -0,0 +1,71 @@
+import logging
+
+from eth_abi import decode, encode
+from eth_abi.exceptions import DecodingError
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+from settings.chains import MULTICALL3_ADDRESS, MULTICALL_CHUNK_SIZE
+from utils.erc20 import BALANCE_OF_SELECTOR
+
+logger = logging.getLogger(__name__)
+
+AGGREGATE3_SELECTOR = Web3.keccak(text="aggregate3((address,bool,bytes)[])")[:4]
+GET_ETH_BALANCE_SELECTOR = Web3.keccak(text="getEthBalance(address)")[:4]
+
+
+def encode_address_call(selector: bytes, address: str) -> bytes:
+    """
+    Кодирует вызов функции с единственным аргументом address.
+
+    :param selector: 4-байтовый селектор функции.
+    :param address: Адрес аргумента.
+    :return: calldata вызова.
+    """
+    return selector + bytes(12) + bytes.fromhex(address[2:] if address.startswith("0x") else address)
+
+
+class Multicall:
+    def __init__(self, connection: Web3, address: str = MULTICALL3_ADDRESS, chunk_size: int = MULTICALL_CHUNK_SIZE):
+        """
+        Обертка над контрактом Multicall3 для объединения множества eth_call в несколько запросов.
+
+        :param connection: Подключение Web3 к сети.
+        :param address: Адрес контракта Multicall3 в сети.
+        :param chunk_size: Максимум вызовов в одном aggregate3.
+        """
+        self.connection = connection
+        self.address = Web3.to_checksum_address(address)
+        self.chunk_size = chunk_size
+
+    def _aggregate3(self, calls: list) -> list:
+        data = AGGREGATE3_SELECTOR + encode(["(address,bool,bytes)[]"],
+                                            [[(target, True, calldata) for target, calldata in calls]])
+        raw = self.connection.eth.call({"to": self.address, "data": data})
+        return decode(["(bool,bytes)[]"], raw)[0]
+
+    def _aggregate_chunk(self, calls: list) -> list:
+        # Делим пачку только при отказе исполнения или слишком большом ответе. Сетевые ошибки
+        # (requests.RequestException) пробрасываются сразу: деление не поможет недоступной ноде
+        try:
+            return self._aggregate3(calls)
+        except (ValueError, ContractLogicError, DecodingError) as e:
+            if len(calls) == 1:
+                logger.warning(f"Multicall call to {calls[0][0]} failed: {e}")
+                return [(False, b"")]
+            # Нода отказала (лимит газа или размера ответа) — делим пачку пополам
+            middle = len(calls) // 2
+            logger.info(f"Multicall chunk of {len(calls)} calls rejected ({e}), splitting")
+            return self._aggregate_chunk(calls[:middle]) + self._aggregate_chunk(calls[middle:])
+
+    def aggregate(self, calls: list) -> list:
+        """
+        Выполняет список вызовов, разбивая его на пачки по chunk_size.
+
+        :param calls: Список пар (адрес контракта, calldata).
+        :return: Список пар (успех, возвращенные байты) в порядке вызовов.
+        """
+        results = []
+        for start in range(0, len(calls), self.chunk_size):
+            results.extend(self._aggregate_chunk(calls[start:start + self.chunk_size]))
+        return results
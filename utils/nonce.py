@@ -0,0 +1,175 @@
+import logging
+import threading
+
+from web3 import Web3
+
+logger = logging.getLogger(__name__)
+
+
+class NonceManager:
+    def __init__(self):
+        """
+        Локальная выдача nonce для пар (chain id, адрес). Счетчик один раз инициализируется
+        количеством транзакций в состоянии pending, дальше nonce выдаются без RPC запросов.
+        Выданные, но еще не отправленные nonce запоминаются: пока они есть, счетчик не откатывается назад,
+        чтобы не выдать занятый nonce повторно, а откат откладывается до следующего reserve.
+        """
+        self._next = {}  # (chain id, адрес) -> следующий свободный nonce
+        self._reserved = {}  # (chain id, адрес) -> выданные, но еще не отправленные nonce
+        self._stale = set()  # ключи, откат которых отложен до отправки всех выданных nonce
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(chain_id: int, address: str) -> tuple:
+        return chain_id, address.lower()
+
+    @staticmethod
+    def _pending_count(connection: Web3, address: str) -> int:
+        return connection.eth.get_transaction_count(Web3.to_checksum_address(address), "pending")
+
+    def _settle(self, key: tuple, pending_count: int) -> None:
+        # Вызывается под self._lock. Пока есть неотправленные nonce, счетчик только растет
+        local = self._next.get(key, pending_count)
+        if self._reserved.get(key):
+            self._next[key] = max(local, pending_count)
+            if pending_count < local:
+                self._stale.add(key)
+            return
+        self._next[key] = pending_count
+        self._stale.discard(key)
+
+    def is_seeded(self, chain_id: int, address: str) -> bool:
+        """
+        Проверяет, инициализирован ли счетчик для аккаунта.
+
+        :param chain_id: ID сети.
+        :param address: Адрес аккаунта.
+        :return: True, если счетчик уже инициализирован.
+        """
+        with self._lock:
+            return self._key(chain_id, address) in self._next
+
+    def seed(self, chain_id: int, address: str, pending_count: int) -> None:
+        """
+        Инициализирует счетчик уже полученным количеством pending транзакций.
+        Если счетчик уже инициализирован, ничего не делает.
+
+        :param chain_id: ID сети.
+        :param address: Адрес аккаунта.
+        :param pending_count: Результат eth_getTransactionCount(address, "pending").
+        """
+        with self._lock:
+            self._next.setdefault(self._key(chain_id, address), pending_count)
+
+    def reserve(self, connection: Web3, chain_id: int, address: str, count: int = 1) -> int:
+        """
+        Выдает подряд идущие nonce для count транзакций.
+
+        :param connection: Подключение к сети, используется только для первичной инициализации.
+        :param chain_id: ID сети.
+        :param address: Адрес аккаунта.
+        :param count: Количество nonce.
+        :return: Первый выданный nonce.
+        """
+        key = self._key(chain_id, address)
+        if not self.is_seeded(chain_id, address):
+            self.seed(chain_id, address, self._pending_count(connection, address))
+        with self._lock:
+            stale = key in self._stale and not self._reserved.get(key)
+        if stale:
+            self.resync(connection, chain_id, address)
+        with self._lock:
+            nonce = self._next[key]
+            self._next[key] = nonce + count
+            self._reserved.setdefault(key, set()).update(range(nonce, nonce + count))
+            return nonce
+
+    def is_reserved(self, chain_id: int, address: str, nonce: int) -> bool:
+        """
+        :param chain_id: ID сети.
+        :param address: Адрес аккаунта.
+        :param nonce: nonce транзакции.
+        :return: True, если nonce выдан этим менеджером и еще не отправлен.
+        """
+        with self._lock:
+            return nonce in self._reserved.get(self._key(chain_id, address), ())
+
+    def sent(self, chain_id: int, address: str, nonce: int) -> None:
+        """
+        Сообщает, что транзакция с выданным nonce отправлена в сеть.
+
+        :param chain_id: ID сети.
+        :param address: Адрес аккаунта.
+        :param nonce: nonce отправленной транзакции.
+        """
+        with self._lock:
+            self._reserved.get(self._key(chain_id, address), set()).discard(nonce)
+
+    def resync(self, connection: Web3, chain_id: int, address: str) -> int:
+        """
+        Перечитывает счетчик из сети (pending). Используется после сбоев отправки.
+        Пока у аккаунта есть выданные и еще не отправленные nonce, счетчик не уменьшается.
+
+        :param connection: Подключение к сети.
+        :param chain_id: ID сети.
+        :param address: Адрес аккаунта.
+        :return: Новый следующий nonce.
+        """
+        pending_count = self._pending_count(connection, address)
+        with self._lock:
+            key = self._key(chain_id, address)
+            self._settle(key, pending_count)
+            return self._next[key]
+
+    def fail(self, connection: Web3, chain_id: int, address: str, nonce: int, count: int = 1) -> None:
+        """
+        Сообщает, что транзакции с nonce по nonce + count - 1 не были отправлены. Nonce, которые этот
+        менеджер не выдавал (или которые уже отправлены), игнорируются. Если это последние выданные nonce,
+        они возвращаются в оборот, иначе образовалась дыра и счетчик пересинхронизируется.
+
+        :param connection: Подключение к сети.
+        :param chain_id: ID сети.
+        :param address: Адрес аккаунта.
+        :param nonce: nonce первой неудачной транзакции.
+        :param count: Количество неудачных транзакций подряд.
+        """
+        with self._lock:
+            key = self._key(chain_id, address)
+            reserved = self._reserved.get(key, set())
+            failed = reserved.intersection(range(nonce, nonce + count))
+            if not failed:
+                return
+            reserved.difference_update(failed)
+            if self._next.get(key) == max(failed) + 1 and len(failed) == count:
+                self._next[key] = nonce
+                return
+        logger.warning(f"Nonce gap for {address} on chain {chain_id} at {nonce}, resyncing")
+        self.resync(connection, chain_id, address)
+
+    def detect_gap(self, connection: Web3, chain_id: int, address: str) -> bool:
+        """
+        Сравнивает локальный счетчик с pending счетчиком сети. Если сеть отстает не только на
+        выданные, но еще не отправленные nonce, часть транзакций была потеряна и счетчик
+        откатывается к значению сети (сразу или, если есть неотправленные nonce, при следующем reserve).
+
+        :param connection: Подключение к сети.
+        :param chain_id: ID сети.
+        :param address: Адрес аккаунта.
+        :return: True, если найдена дыра и счетчик был пересинхронизирован.
+        """
+        pending_count = self._pending_count(connection, address)
+        with self._lock:
+            key = self._key(chain_id, address)
+            local = self._next.get(key)
+            # Выданные, но еще не отправленные nonce сеть и не должна знать — это не дыра
+            sent_up_to = min(self._reserved.get(key) or [local]) if local is not None else None
+            gap = sent_up_to is not None and pending_count < sent_up_to
+            if gap or local is None or pending_count > local:
+                self._settle(key, pending_count)
+        if gap:
+            logger.warning(f"Dropped transactions for {address} on chain {chain_id}: "
+                           f"node has {pending_count}, sent up to {sent_up_to}")
+        return gap
+
+
+nonce_manager = NonceManager()
@@ -0,0 +1,258 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import Web3
+
+from settings.chains import Chain, RPC_BATCH_SIZE, RPC_POOL_SIZE, RPC_TIMEOUT
+from settings.endpoints import HEDGE_AFTER
+from settings.rate_limit import REQUEST_RETRIES
+from utils.endpoints import EndpointPool
+from utils.metrics import endpoint_label, metrics
+from utils.rate_limit import backoff_delay, parse_retry_after, rate_limiter
+
+
+# Методы только для чтения: их можно дублировать на второй RPC без побочных эффектов
+READ_METHODS = frozenset({
+    "eth_blockNumber", "eth_call", "eth_chainId", "eth_estimateGas", "eth_feeHistory", "eth_gasPrice",
+    "eth_getBalance", "eth_getBlockByNumber", "eth_getCode", "eth_getLogs", "eth_getTransactionByHash",
+    "eth_getTransactionCount", "eth_getTransactionReceipt", "eth_maxPriorityFeePerGas", "net_version",
+    "web3_clientVersion"
+})
+
+
+class SessionHTTPProvider(Web3.HTTPProvider):
+    # Повторы делает сам провайдер (пул адресов и REQUEST_RETRIES на 429); унаследованная от web3
+    # http_retry_request middleware повторяла бы каждый проход по пулу еще 5 раз
+    _middlewares = ()
+
+    def __init__(self, endpoints: EndpointPool, session: requests.Session, timeout: float,
+                 hedge_after: float = HEDGE_AFTER):
+        """
+        HTTP провайдер, отправляющий все запросы через переданную keep-alive сессию на самый быстрый
+        работающий адрес из пула. При ошибке запрос повторяется на следующем адресе.
+
+        :param endpoints: Пул RPC адресов сети.
+        :param session: Сессия requests с пулом соединений.
+        :param timeout: Таймаут одного запроса в секундах.
+        :param hedge_after: Через сколько секунд дублировать медленный запрос на чтение на второй адрес.
+            None — не дублировать.
+        """
+        super().__init__(endpoints.urls[0], request_kwargs={"timeout": timeout})
+        self.endpoints = endpoints
+        self.session = session
+        self.hedge_after = hedge_after
+        self._hedge_executor = None
+        self._hedge_lock = threading.Lock()
+
+    def _post_to(self, url: str, data) -> requests.Response:
+        # Все запросы к RPC проходят через общий ограничитель частоты; на 429 — экспоненциальная пауза
+        for attempt in range(REQUEST_RETRIES):
+            rate_limiter.acquire(url)
+            response = self.session.post(url, data=data, **self.get_request_kwargs())
+            if response.status_code != 429:
+                response.raise_for_status()
+                rate_limiter.on_success(url)
+                return response
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            rate_limiter.on_throttle(url, retry_after)
+            metrics.inc("rpc_throttled_total", endpoint=endpoint_label(url))
+            time.sleep(max(retry_after or 0, backoff_delay(attempt)))
+        response.raise_for_status()
+
+    def _post_timed(self, url: str, data) -> requests.Response:
+        start = time.monotonic()
+        try:
+            response = self._post_to(url, data)
+        except requests.exceptions.RequestException:
+            self.endpoints.record_failure(url)
+            metrics.inc("rpc_errors_total", endpoint=endpoint_label(url))
+            raise
+        elapsed = time.monotonic() - start
+        self.endpoints.record_success(url, elapsed)
+        metrics.observe("rpc_request_seconds", elapsed, endpoint=endpoint_label(url))
+        self.endpoint_uri = url  # последний использованный адрес, для логов
+        return response
+
+    def _post(self, data) -> requests.Response:
+        # Перебираем адреса от лучшего к худшему, пока один из них не ответит
+        last_error = None
+        for url in self.endpoints.ranked():
+            try:
+                return self._post_timed(url, data)
+            except requests.exceptions.RequestException as e:
+                last_error = e
+        raise last_error
+
+    def _post_hedged(self, data) -> requests.Response:
+        ranked = self.endpoints.ranked()
+        if self.hedge_after is None or len(ranked) < 2:
+            return self._post(data)
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rpc-hedge")
+        primary = self._hedge_executor.submit(self._post_timed, ranked[0], data)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done and primary.exception() is None:
+            return primary.result()
+        # Основной адрес медленный или упал — дублируем запрос на второй и берем первый успешный ответ
+        secondary = self._hedge_executor.submit(self._post_timed, ranked[1], data)
+        last_error = None
+        for future in as_completed([primary, secondary]):
+            if future.exception() is None:
+                return future.result()
+            last_error = future.exception()
+        # Оба адреса отказали — не повторяем полный перебор адресов, это свело бы хеджирование на нет
+        raise last_error
+
+    def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+        with metrics.timer("rpc_call_seconds", method=method):
+            response = self._post_hedged(request_data) if method in READ_METHODS else self._post(request_data)
+        return self.decode_rpc_response(response.content)
+
+    def make_batch_request(self, calls: list) -> list:
+        """
+        Отправляет несколько JSON-RPC запросов одним HTTP запросом (JSON-RPC batch).
+
+        :param calls: Список пар (метод, параметры).
+        :return: Список ответов в порядке запросов.
+        """
+        first_id = next(self.request_counter)
+        payload = [{"jsonrpc": "2.0", "method": method, "params": params, "id": first_id + i}
+                   for i, (method, params) in enumerate(calls)]
+        with metrics.timer("rpc_call_seconds", method="batch"):
+            response = self._post(Web3.to_json(payload))
+        metrics.inc("rpc_batched_calls_total", len(calls))
+        responses = self.decode_rpc_response(response.content)
+        if not isinstance(responses, list):  # Нода не поддерживает batch и вернула одну ошибку
+            raise ValueError(f"Batch request rejected by {self.endpoint_uri}: {responses}")
+        # Порядок ответов в batch не гарантирован — сопоставляем по id. У ошибки разбора id равен null,
+        # такая ошибка достается всем запросам, на которые нода не ответила
+        by_id = {item.get("id"): item for item in responses}
+        missing = by_id.get(None, {"error": "no response"})
+        return [by_id.get(request["id"], {"id": request["id"], "error": missing.get("error")}) for request in payload]
+
+
+class ProviderRegistry:
+    def __init__(self, pool_size: int = RPC_POOL_SIZE, timeout: float = RPC_TIMEOUT):
+        """
+        Общий на процесс реестр подключений к сетям: одно подключение Web3 и одна
+        keep-alive сессия на каждую сеть.
+
+        :param pool_size: Максимум keep-alive соединений с RPC одной сети.
+        :param timeout: Таймаут одного RPC запроса в секундах.
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._entries = {}  # Chain -> {"endpoints", "session", "connection", "checked"}
+        self._lock = threading.Lock()
+
+    def _create_session(self, hosts: int) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=hosts, pool_maxsize=self.pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _entry(self, chain: Chain) -> dict:
+        with self._lock:
+            entry = self._entries.get(chain)
+            if entry is None or entry["endpoints"] is not chain.endpoints:  # RPC сменили через set_rpc_url
+                if entry is not None:
+                    entry["session"].close()
+                session = self._create_session(len(chain.endpoints.urls))
+                entry = {
+                    "endpoints": chain.endpoints,
+                    "session": session,
+                    "connection": Web3(SessionHTTPProvider(chain.endpoints, session, self.timeout)),
+                    "checked": False
+                }
+                self._entries[chain] = entry
+            return entry
+
+    def get(self, chain: Chain, check: bool = True) -> Web3:
+        """
+        Возвращает общее подключение к сети. Проверка соединения выполняется один раз на сеть.
+
+        :param chain: обьект класса Chain
+        :param check: Проверять ли подключение (только при первом обращении).
+        :return: Объект Web3, подключенный к RPC сети.
+        :raises ConnectionError: Если не удается подключиться к RPC.
+        """
+        entry = self._entry(chain)
+        if check and not entry["checked"]:
+            if not entry["connection"].is_connected():
+                raise ConnectionError(f"Failed to connect to the RPC at {', '.join(entry['endpoints'].urls)}")
+            entry["checked"] = True
+        return entry["connection"]
+
+    def register(self, chain: Chain, connection: Web3) -> None:
+        """
+        Подставляет готовое подключение для сети (например, локальный EthereumTesterProvider).
+
+        :param chain: обьект класса Chain
+        :param connection: Подключение Web3.
+        """
+        with self._lock:
+            self._entries[chain] = {"endpoints": chain.endpoints, "session": requests.Session(),
+                                    "connection": connection, "checked": True}
+
+    def endpoint_stats(self) -> dict:
+        """
+        Возвращает статистику выбора RPC адресов по всем сетям, к которым были подключения.
+
+        :return: Словарь имя сети -> статистика EndpointPool.
+        """
+        with self._lock:
+            return {chain.name: entry["endpoints"].stats() for chain, entry in self._entries.items()}
+
+    def close(self) -> None:
+        """
+        Закрывает все сессии и очищает реестр.
+        """
+        with self._lock:
+            for entry in self._entries.values():
+                entry["session"].close()
+            self._entries.clear()
+
+
+providers = ProviderRegistry()
+
+
+def batch_request(connection: Web3, calls: list, batch_size: int = RPC_BATCH_SIZE) -> list:
+    """
+    Выполняет несколько независимых RPC запросов за один HTTP запрос (или несколько, если запросов
+    больше batch_size). Для провайдеров без поддержки batch запросы выполняются последовательно.
+
+    :param connection: Подключение Web3.
+    :param calls: Список пар (метод, параметры) в формате JSON-RPC.
+    :param batch_size: Максимум запросов в одном batch.
+    :return: Список результатов в порядке запросов.
+    :raises ValueError: Если хотя бы один запрос вернул ошибку.
+    """
+    if not calls:
+        return []
+    if not hasattr(connection.provider, "make_batch_request"):
+        return [connection.manager.request_blocking(method, params) for method, params in calls]
+    results = []
+    for start in range(0, len(calls), batch_size):
+        chunk = calls[start:start + batch_size]
+        for (method, _), response in zip(chunk, connection.provider.make_batch_request(chunk)):
+            if "error" in response:
+                raise ValueError(f"{method} failed: {response['error']}")
+            results.append(response["result"])
+    return results
+
+
+def get_connection(chain: Chain, check: bool = True) -> Web3:
+    """
+    Возвращает общее подключение к сети из реестра провайдеров.
+
+    :param chain: обьект класса Chain
+    :param check: Проверять ли подключение (только при первом обращении).
+    :return: Объект Web3, подключенный к RPC сети.
+    """
+    return providers.get(chain, check)
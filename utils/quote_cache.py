@@ -0,0 +1,133 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from settings.cache import QUOTE_AMOUNT_BUCKET, QUOTE_CACHE_PATH, QUOTE_CACHE_SIZE, QUOTE_CACHE_TTL
+
+
+class QuoteCache:
+    def __init__(self, ttl: float = QUOTE_CACHE_TTL, max_size: int = QUOTE_CACHE_SIZE,
+                 bucket: float = QUOTE_AMOUNT_BUCKET, path: str = QUOTE_CACHE_PATH):
+        """
+        Кеш котировок CrossCurve с временем жизни и ограничением размера (LRU).
+        Суммы, отличающиеся меньше чем на bucket (относительно), попадают в одну корзину.
+
+        :param ttl: Время жизни котировки в секундах.
+        :param max_size: Максимум котировок в памяти.
+        :param bucket: Относительная ширина корзины сумм (0.01 = 1%). 0 — только точное совпадение.
+        :param path: Путь к общему SQLite файлу для обмена котировками между процессами. None — только память.
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.bucket = bucket
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # ключ -> (время записи, значение)
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Вызывается под self._lock
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS quotes (key TEXT PRIMARY KEY, created REAL, value TEXT)")
+        return self._db
+
+    def key(self, chain_id_in: int, token_in: str, chain_id_out: int, token_out: str, amount: float,
+            slippage: float) -> str:
+        """
+        Строит ключ кеша для запроса котировки.
+
+        :return: Строковый ключ.
+        """
+        if self.bucket > 0 and amount > 0:
+            amount_key = str(math.floor(math.log(amount) / math.log1p(self.bucket)))
+        else:
+            amount_key = repr(amount)
+        return f"{chain_id_in}:{token_in.lower()}:{chain_id_out}:{token_out.lower()}:{amount_key}:{slippage}"
+
+    def get(self, key: str):
+        """
+        Возвращает сохраненную котировку, если она не устарела.
+
+        :param key: Ключ из key().
+        :return: Сохраненное значение или None.
+        """
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and now - item[0] <= self.ttl:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            if item is not None:
+                del self._data[key]
+            if self.path:
+                row = self._connect().execute("SELECT created, value FROM quotes WHERE key = ?", (key,)).fetchone()
+                if row is not None and now - row[0] <= self.ttl:
+                    value = json.loads(row[1])
+                    self._store(key, row[0], value)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def _store(self, key: str, created: float, value) -> None:
+        # Вызывается под self._lock
+        self._data[key] = (created, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def set(self, key: str, value) -> None:
+        """
+        Сохраняет котировку.
+
+        :param key: Ключ из key().
+        :param value: JSON-сериализуемое значение.
+        """
+        now = time.time()
+        with self._lock:
+            self._store(key, now, value)
+            if self.path:
+                db = self._connect()
+                db.execute("INSERT OR REPLACE INTO quotes (key, created, value) VALUES (?, ?, ?)",
+                           (key, now, json.dumps(value)))
+                db.execute("DELETE FROM quotes WHERE created < ?", (now - self.ttl,))
+                db.commit()
+
+    def clear(self) -> None:
+        """
+        Удаляет все сохраненные котировки и сбрасывает статистику.
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            if self.path:
+                db = self._connect()
+                db.execute("DELETE FROM quotes")
+                db.commit()
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику кеша.
+
+        :return: Словарь с hits, misses, size и hit_rate.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data),
+                    "hit_rate": self.hits / total if total else 0.0}
+
+
+quote_cache = QuoteCache()
@@ -0,0 +1,134 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from urllib.parse import urlparse
+
+from settings.rate_limit import (BACKOFF_BASE, BACKOFF_MAX, RATE_LIMIT_BURST, RATE_LIMIT_INITIAL, RATE_LIMIT_MAX,
+                                 RATE_LIMIT_MIN, RATE_LIMIT_STEP)
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_MAX) -> float:
+    """
+    Экспоненциальная задержка со случайным разбросом (full jitter).
+
+    :param attempt: Номер попытки, начиная с 0.
+    :param base: Базовая задержка в секундах.
+    :param cap: Максимальная задержка в секундах.
+    :return: Задержка в секундах.
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Разбирает заголовок Retry-After (секунды или HTTP дата).
+
+    :param value: Значение заголовка или None.
+    :return: Задержка в секундах или None.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, initial_rate: float = RATE_LIMIT_INITIAL, min_rate: float = RATE_LIMIT_MIN,
+                 max_rate: float = RATE_LIMIT_MAX, burst: float = RATE_LIMIT_BURST, step: float = RATE_LIMIT_STEP):
+        """
+        Общий ограничитель частоты запросов: отдельное ведро токенов на каждый хост.
+        Пока запросы успешны, скорость растет примерно на step в секунду, после ответа 429 — уменьшается вдвое.
+
+        :param initial_rate: Начальная скорость, запросов в секунду.
+        :param min_rate: Минимальная скорость.
+        :param max_rate: Максимальная скорость.
+        :param burst: Емкость ведра (сколько запросов можно отправить сразу).
+        :param step: Прирост скорости за секунду успешных запросов.
+        """
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.step = step
+        self._buckets = {}  # хост -> {"rate", "tokens", "updated", "blocked_until", "throttled"}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host(url: str) -> str:
+        return urlparse(url).netloc or url
+
+    def _bucket(self, host: str) -> dict:
+        # Вызывается под self._lock
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = {"rate": self.initial_rate, "tokens": self.burst, "updated": time.monotonic(),
+                      "blocked_until": 0.0, "throttled": 0}
+            self._buckets[host] = bucket
+        return bucket
+
+    def acquire(self, host: str) -> None:
+        """
+        Ждет, пока для хоста появится свободный токен, и забирает его.
+
+        :param host: Хост (или URL) запроса.
+        """
+        host = self.host(host)
+        while True:
+            with self._lock:
+                bucket = self._bucket(host)
+                now = time.monotonic()
+                bucket["tokens"] = min(self.burst, bucket["tokens"] + (now - bucket["updated"]) * bucket["rate"])
+                bucket["updated"] = now
+                if now >= bucket["blocked_until"] and bucket["tokens"] >= 1:
+                    bucket["tokens"] -= 1
+                    return
+                wait = max(bucket["blocked_until"] - now, (1 - bucket["tokens"]) / bucket["rate"])
+            time.sleep(wait)
+
+    def on_success(self, host: str) -> None:
+        """
+        Сообщает об успешном запросе: скорость хоста растет на step / rate,
+        то есть примерно на step за секунду работы без ошибок.
+
+        :param host: Хост (или URL) запроса.
+        """
+        with self._lock:
+            bucket = self._bucket(self.host(host))
+            bucket["rate"] = min(self.max_rate, bucket["rate"] + self.step / bucket["rate"])
+
+    def on_throttle(self, host: str, retry_after: float = None) -> None:
+        """
+        Сообщает об ответе 429: скорость хоста уменьшается вдвое, а при наличии Retry-After
+        хост блокируется на указанное время.
+
+        :param host: Хост (или URL) запроса.
+        :param retry_after: Значение Retry-After в секундах или None.
+        """
+        with self._lock:
+            bucket = self._bucket(self.host(host))
+            bucket["rate"] = max(self.min_rate, bucket["rate"] / 2)
+            bucket["tokens"] = 0
+            bucket["throttled"] += 1
+            if retry_after:
+                bucket["blocked_until"] = max(bucket["blocked_until"], time.monotonic() + retry_after)
+
+    def stats(self) -> dict:
+        """
+        Возвращает текущую скорость и количество 429 по каждому хосту.
+
+        :return: Словарь хост -> {"rate", "throttled"}.
+        """
+        with self._lock:
+            return {host: {"rate": bucket["rate"], "throttled": bucket["throttled"]}
+                    for host, bucket in self._buckets.items()}
+
+
+rate_limiter = AdaptiveRateLimiter()
@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from hexbytes import HexBytes
+
+from settings.chains import Chain
+from settings.receipts import RECEIPT_BATCH_SIZE, RECEIPT_CONFIRMATIONS, RECEIPT_POLL_INTERVAL, RECEIPT_TIMEOUT
+from utils.nonce import nonce_manager
+from utils.providers import batch_request, get_connection
+
+logger = logging.getLogger(__name__)
+
+CONFIRMED = "confirmed"
+FAILED = "failed"
+TIMEOUT = "timeout"
+
+# Поля квитанции, которые batch ответ отдает hex строками
+_RECEIPT_INT_FIELDS = ("status", "blockNumber", "gasUsed", "cumulativeGasUsed", "effectiveGasPrice",
+                       "transactionIndex", "type")
+
+
+def _to_int(value) -> int:
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def _normalize_receipt(receipt) -> dict:
+    receipt = dict(receipt)
+    for field in _RECEIPT_INT_FIELDS:
+        if receipt.get(field) is not None:
+            receipt[field] = _to_int(receipt[field])
+    return receipt
+
+
+class _Pending:
+    __slots__ = ("tx_hash", "future", "deadline", "address")
+
+    def __init__(self, tx_hash: str, future: Future, deadline: float, address: str = None):
+        self.tx_hash = tx_hash
+        self.future = future
+        self.deadline = deadline
+        self.address = address
+
+
+class ReceiptTracker:
+    def __init__(self, poll_interval: float = RECEIPT_POLL_INTERVAL, timeout: float = RECEIPT_TIMEOUT,
+                 batch_size: int = RECEIPT_BATCH_SIZE, confirmations: int = RECEIPT_CONFIRMATIONS):
+        """
+        Отслеживание подтверждения транзакций. На каждую сеть с ожидающими транзакциями работает
+        один поток: раз в poll_interval он запрашивает номер блока и, если появился новый блок,
+        запрашивает квитанции всех ожидающих транзакций batch запросами по batch_size.
+        Поток завершается, когда ожидающих транзакций не остается.
+
+        :param poll_interval: Пауза между проверками номера блока, с.
+        :param timeout: Сколько секунд ждать квитанцию по умолчанию.
+        :param batch_size: Квитанций в одном batch запросе.
+        :param confirmations: Сколько блоков (включая блок транзакции) должно быть в сети для подтверждения.
+        """
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.confirmations = confirmations
+        self.requests = 0  # HTTP запросов, отправленных потоками опроса
+        self._pending = {}  # Chain -> {хеш: _Pending}
+        self._threads = {}  # Chain -> поток опроса
+        self._lock = threading.Lock()
+
+    def track(self, chain: Chain, tx_hash, callback=None, timeout: float = None, address: str = None) -> Future:
+        """
+        Ставит транзакцию на отслеживание.
+
+        :param chain: обьект класса Chain
+        :param tx_hash: Хеш транзакции (HexBytes или hex строка).
+        :param callback: Функция, которая вызывается с результатом, когда транзакция подтвердится,
+            упадет или истечет таймаут.
+        :param timeout: Таймаут ожидания, с. По умолчанию — значение трекера.
+        :param address: Адрес отправителя. Если указан, при таймауте счетчик nonce отправителя
+            сверяется с сетью: выпавшие из mempool транзакции оставляют дыру, и счетчик пересинхронизируется.
+        :return: Future, результат которого — словарь {"tx_hash", "status", "receipt", "nonce_gap"}, где status —
+            "confirmed", "failed" (status квитанции 0) или "timeout" (receipt None); nonce_gap — True,
+            если после таймаута найдена и исправлена дыра в nonce.
+        """
+        tx_hash = HexBytes(tx_hash).hex()
+        if not tx_hash.startswith("0x"):
+            tx_hash = "0x" + tx_hash
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(lambda done: callback(done.result()))
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._lock:
+            self._pending.setdefault(chain, {})[tx_hash] = _Pending(tx_hash, future, deadline, address)
+            thread = self._threads.get(chain)
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._poll, args=(chain,), daemon=True,
+                                          name=f"receipts-{chain.name}")
+                self._threads[chain] = thread
+                thread.start()
+        return future
+
+    def pending_count(self, chain: Chain = None) -> int:
+        with self._lock:
+            if chain is not None:
+                return len(self._pending.get(chain, {}))
+            return sum(len(pending) for pending in self._pending.values())
+
+    def _resolve(self, chain: Chain, item: _Pending, status: str, receipt: dict = None, nonce_gap: bool = False):
+        with self._lock:
+            self._pending.get(chain, {}).pop(item.tx_hash, None)
+        item.future.set_result({"tx_hash": item.tx_hash, "status": status, "receipt": receipt,
+                                "nonce_gap": nonce_gap})
+
+    @staticmethod
+    def _check_gaps(chain: Chain, connection, expired: list) -> set:
+        # Одна проверка pending счетчика на отправителя, даже если у него истекло несколько транзакций
+        gaps = set()
+        for address in {item.address.lower() for item in expired if item.address}:
+            try:
+                if nonce_manager.detect_gap(connection, chain.id, address):
+                    gaps.add(address)
+            except Exception as e:
+                logger.warning(f"Nonce gap check for {address} on {chain.name} failed: {e}")
+        return gaps
+
+    def _check(self, chain: Chain, connection, block: int):
+        with self._lock:
+            pending = list(self._pending.get(chain, {}).values())
+        for start in range(0, len(pending), self.batch_size):
+            chunk = pending[start:start + self.batch_size]
+            receipts = batch_request(connection, [("eth_getTransactionReceipt", [item.tx_hash]) for item in chunk])
+            self.requests += 1
+            for item, receipt in zip(chunk, receipts):
+                if receipt is None:
+                    continue  # еще не в блоке
+                receipt = _normalize_receipt(receipt)
+                if receipt["blockNumber"] + self.confirmations - 1 > block:
+                    continue  # в блоке, но подтверждений пока мало
+                self._resolve(chain, item, CONFIRMED if receipt.get("status", 1) == 1 else FAILED, receipt)
+
+    def _poll(self, chain: Chain):
+        connection = get_connection(chain, check=False)
+        last_block = None
+        while True:
+            with self._lock:
+                if not self._pending.get(chain):
+                    self._threads.pop(chain, None)
+                    return
+            try:
+                block = _to_int(batch_request(connection, [("eth_blockNumber", [])])[0])
+                self.requests += 1
+                if block != last_block:  # квитанции запрашиваем только когда появился новый блок
+                    self._check(chain, connection, block)
+                    last_block = block
+            except Exception as e:
+                logger.warning(f"Receipt polling on {chain.name} failed: {e}")
+            now = time.monotonic()
+            with self._lock:
+                expired = [item for item in self._pending.get(chain, {}).values() if item.deadline <= now]
+            gaps = self._check_gaps(chain, connection, expired) if expired else set()
+            for item in expired:
+                self._resolve(chain, item, TIMEOUT, nonce_gap=(item.address or "").lower() in gaps)
+            time.sleep(self.poll_interval)
+
+
+receipt_tracker = ReceiptTracker()
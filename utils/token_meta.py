@@ -0,0 +1,83 @@
+import json
+import os
+import threading
+from typing import Callable, Optional
+
+from settings.cache import TOKEN_CACHE_PATH
+
+
+class TokenMetadataCache:
+    def __init__(self, path: str = TOKEN_CACHE_PATH):
+        """
+        Двухуровневый кеш метаданных токенов (decimals): в памяти и в JSON файле на диске.
+        Ключ — пара (chain id, адрес токена в нижнем регистре).
+
+        :param path: Путь к файлу кеша. None — только кеш в памяти.
+        """
+        self.path = path
+        self._data = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    @staticmethod
+    def _key(chain_id: int, address: str) -> str:
+        return f"{chain_id}:{address.lower()}"
+
+    def _load(self) -> None:
+        # Вызывается под self._lock
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as file:
+                    self._data.update(json.load(file))
+            except (OSError, ValueError):
+                pass  # Поврежденный кеш просто перестраивается заново
+
+    def _save(self) -> None:
+        # Вызывается под self._lock; запись через временный файл, чтобы не оставить битый JSON
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self._data, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def get(self, chain_id: int, address: str) -> Optional[dict]:
+        """
+        Возвращает сохраненные метаданные токена без обращения к сети.
+
+        :param chain_id: ID сети.
+        :param address: Адрес смарт-контракта токена.
+        :return: Словарь метаданных или None, если токен еще не известен.
+        """
+        with self._lock:
+            self._load()
+            return self._data.get(self._key(chain_id, address))
+
+    def get_decimals(self, chain_id: int, address: str, loader: Callable[[], Optional[int]]) -> Optional[int]:
+        """
+        Возвращает decimals токена. При промахе вызывает loader (RPC запрос) и сохраняет результат.
+
+        :param chain_id: ID сети.
+        :param address: Адрес смарт-контракта токена.
+        :param loader: Функция без аргументов, получающая decimals из сети.
+        :return: decimals токена или None, если loader не смог его получить.
+        """
+        meta = self.get(chain_id, address)
+        if meta is not None and "decimals" in meta:
+            return meta["decimals"]
+        decimals = loader()
+        if decimals is None:
+            return None  # Неудачи не кешируем
+        with self._lock:
+            self._data.setdefault(self._key(chain_id, address), {})["decimals"] = int(decimals)
+            self._save()
+        return int(decimals)
+
+
+token_metadata = TokenMetadataCache()
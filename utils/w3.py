@@ -1,22 +1,167 @@
-from settings.chains import chains
-from classes.client import Client
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from settings.chains import chains, NATIVE_BALANCE_BATCH_SIZE
+from settings.crosscurve import tokens
+from classes.account import AccountStore
+from utils.erc20 import DECIMALS_CALL, call_uint, checksum
+from utils.multicall import Multicall, GET_ETH_BALANCE_SELECTOR, BALANCE_OF_SELECTOR, encode_address_call
+from utils.providers import batch_request, get_connection
+from utils.token_meta import token_metadata
+
+logger = logging.getLogger(__name__)
+
+
+class BalanceTable:
+    __slots__ = ("accounts", "assets", "values", "errors")
+
+    def __init__(self, accounts: list):
+        """
+        Компактная таблица балансов аккаунт × сеть × актив. Для каждой сети хранится
+        плоский список значений длиной len(accounts) * len(assets[chain]).
+
+        :param accounts: Список адресов аккаунтов.
+        """
+        self.accounts = accounts
+        self.assets = {}  # имя сети -> список активов (нативный токен первым)
+        self.values = {}  # имя сети -> плоский список балансов (None — не удалось получить)
+        self.errors = {}  # имя сети -> текст ошибки, если балансы сети получить не удалось
+
+    def get(self, address: str, chain_name: str, asset: str):
+        """
+        Возвращает баланс актива аккаунта в сети.
+
+        :param address: Адрес аккаунта.
+        :param chain_name: Имя сети (ключ settings.chains.chains).
+        :param asset: Тикер актива.
+        :return: Баланс в виде float или None.
+        """
+        assets = self.assets[chain_name]
+        return self.values[chain_name][self.accounts.index(address) * len(assets) + assets.index(asset)]
+
+    def rows(self):
+        """
+        Перебирает таблицу построчно.
+
+        :return: Генератор кортежей (адрес, сеть, актив, баланс).
+        """
+        for chain_name, assets in self.assets.items():
+            values = self.values[chain_name]
+            for i, address in enumerate(self.accounts):
+                for j, asset in enumerate(assets):
+                    yield address, chain_name, asset, values[i * len(assets) + j]
+
+
+def _scan_chain(chain_name: str, addresses: list, chain_tokens: list) -> tuple:
+    chain = chains[chain_name]
+    connection = get_connection(chain, check=False)
+    decimals = []
+    for token in chain_tokens:
+        decimals.append(token_metadata.get_decimals(
+            chain.id, token["checksum"], lambda: call_uint(connection, token["checksum"], DECIMALS_CALL)))
+
+    multicall = Multicall(connection)
+    calls = []
+    for address in addresses:
+        calls.append((multicall.address, encode_address_call(GET_ETH_BALANCE_SELECTOR, address)))
+        for token in chain_tokens:
+            calls.append((token["checksum"], encode_address_call(BALANCE_OF_SELECTOR, address)))
+
+    values = []
+    for index, (success, data) in enumerate(multicall.aggregate(calls)):
+        if not success or len(data) < 32:
+            values.append(None)
+            continue
+        position = index % (len(chain_tokens) + 1)
+        scale = 18 if position == 0 else decimals[position - 1]
+        values.append(int.from_bytes(data[:32], "big") / (10 ** scale))
+    return values
+
+
+def get_balances_multicall(acc_list: list, chain_names: list = None, token_list: list = None) -> BalanceTable:
+    """
+    Получает нативные балансы и балансы токенов из settings.crosscurve.tokens для всех аккаунтов
+    во всех сетях через Multicall3 — несколько запросов на сеть вместо одного на кошелек.
+
+    :param acc_list: Список приватных ключей.
+    :param chain_names: Имена сетей для проверки. Если не указаны, проверяются все сети.
+    :param token_list: Список токенов. Если не указан, берется settings.crosscurve.tokens.
+    :return: Таблица балансов BalanceTable.
+    """
+    addresses = AccountStore.from_private_keys(acc_list).addresses
+    table = BalanceTable(addresses)
+    chain_tokens = {}
+    for chain_name in chain_names or list(chains):
+        chain_tokens[chain_name] = [dict(token, checksum=checksum(token["address"]))
+                                    for token in (token_list or tokens) if token["chain"].lower() == chain_name]
+        table.assets[chain_name] = [chains[chain_name].native_token] + [token["ticker"]
+                                                                        for token in chain_tokens[chain_name]]
+
+    with ThreadPoolExecutor(max_workers=len(chain_tokens)) as executor:
+        futures = {chain_name: executor.submit(_scan_chain, chain_name, addresses, chain_tokens[chain_name])
+                   for chain_name in chain_tokens}
+        for chain_name, future in futures.items():
+            try:
+                table.values[chain_name] = future.result()
+            except Exception as e:
+                logger.error(f"{chain_name}: failed to get balances ({e})")
+                table.errors[chain_name] = str(e)
+                table.values[chain_name] = [None] * (len(addresses) * len(table.assets[chain_name]))
+    return table
+
+
+def print_balances_multicall(acc_list: list):
+    table = get_balances_multicall(acc_list)
+    for i, address in enumerate(table.accounts):
+        print("--------------------------------")
+        print(f"Адрес: {address}")
+        for chain_name, assets in table.assets.items():
+            values = table.values[chain_name][i * len(assets):(i + 1) * len(assets)]
+            print(f"{chain_name}: " + ", ".join(f"{asset} {value}" for asset, value in zip(assets, values)))
+
+
+def get_native_balances(chain, addresses: list, batch_size: int = NATIVE_BALANCE_BATCH_SIZE) -> list:
+    """
+    Получает нативные балансы адресов в одной сети через общее подключение, пачками JSON-RPC batch.
+
+    :param chain: обьект класса Chain
+    :param addresses: Список адресов.
+    :param batch_size: Сколько eth_getBalance отправлять в одном HTTP запросе.
+    :return: Список балансов в ETH (None — не удалось получить) в порядке адресов.
+    """
+    try:
+        connection = get_connection(chain)
+    except ConnectionError as e:
+        logger.error(f"{chain.name}: {e}")
+        return [None] * len(addresses)
+    balances = []
+    for start in range(0, len(addresses), batch_size):
+        chunk = addresses[start:start + batch_size]
+        try:
+            results = batch_request(connection, [("eth_getBalance", [address, "latest"]) for address in chunk])
+        except Exception as e:
+            logger.error(f"{chain.name}: failed to get balances ({e})")
+            balances.extend([None] * len(chunk))
+            continue
+        balances.extend(connection.from_wei(int(result, 16) if isinstance(result, str) else result, 'ether')
+                        for result in results)
+    return balances
 
 
 def get_balance_in_all_network(acc_list: list):
-    obj_acc_list = []
-    for acc in acc_list:
-        account = Client(chains["ethereum"], acc)
-        obj_acc_list.append(account)
-    for acc in obj_acc_list:
+    # Аккаунты выводятся один раз, подключение создается одно на сеть, а не на аккаунт
+    store = AccountStore.from_private_keys(acc_list)
+    with ThreadPoolExecutor(max_workers=len(chains)) as executor:
+        balances = dict(zip(chains, executor.map(lambda chain_name: get_native_balances(chains[chain_name],
+                                                                                         store.addresses), chains)))
+    for index, address in enumerate(store.addresses):
         print("--------------------------------")
-        print(f"Адрес: {acc.public_key}")
+        print(f"Адрес: {address}")
         for chain_name in chains:
-            chain_obj = chains[chain_name]
-            acc.switch_network(chain_obj)
-            print(f"{chain_name}: {acc.get_balance()}")
+            print(f"{chain_name}: {balances[chain_name][index]}")
 
 
-async def get_balance_in_one_network(acc_list: list):
+def get_balance_in_one_network(acc_list: list):
     print("Выберите сеть")
     counter = 1
     for i in chains:
@@ -26,8 +171,8 @@ async def get_balance_in_one_network(acc_list: list):
     chains_list = list(chains)
     selected_chain = chains_list[choice - 1]
     print("--------------------------------")
-    for i in acc_list:
-        account = Client(chains.get(selected_chain), i)
-        print(account.public_key)
-        print(account.get_balance())
+    store = AccountStore.from_private_keys(acc_list)
+    for address, balance in zip(store.addresses, get_native_balances(chains.get(selected_chain), store.addresses)):
+        print(address)
+        print(balance)
         print("--------------------------------")